@@ -2,6 +2,8 @@
 Flask Application Initialization
 """
 
+import os
+
 from flask import Flask, jsonify
 from flask_cors import CORS
 
@@ -11,18 +13,63 @@ def create_app():
     app = Flask(__name__)
     CORS(app)
     
+    # Compact, unsorted JSON through orjson when installed - FOODIE_JSON_ENCODER=json forces the stdlib
+    from app.services.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    
+    from app.models import data_store
+    from app.services import order_feed, rate_limit
+    
+    # Storage backend - SQLite when FOODIE_DB_PATH is set, in-memory otherwise:
+    # partitioned by record id across FOODIE_SHARDS shards when that is set,
+    # logged and snapshotted to FOODIE_DATA_DIR when that is
+    db_path = os.environ.get('FOODIE_DB_PATH')
+    shards = os.environ.get('FOODIE_SHARDS')
+    data_dir = os.environ.get('FOODIE_DATA_DIR')
+    if db_path:
+        from app.models.storage import SQLiteBackend
+        data_store.configure_backend(SQLiteBackend(db_path))
+    elif shards:
+        from app.models.storage import ShardedMemoryBackend
+        data_store.configure_backend(ShardedMemoryBackend(int(shards)))
+    elif data_dir:
+        from app.models.storage import DEFAULT_SNAPSHOT_SECONDS, DurableMemoryBackend
+        data_store.configure_backend(DurableMemoryBackend(
+            data_dir,
+            sync=os.environ.get('FOODIE_WAL_SYNC', 'group'),
+            snapshot_seconds=float(os.environ.get('FOODIE_SNAPSHOT_SECONDS', DEFAULT_SNAPSHOT_SECONDS))
+        ))
+    
+    # Purge soft-deleted restaurants in the background
+    from app.services import compaction
+    compaction.start()
+    
+    @app.before_request
+    def sync_data_store():
+        data_store.sync()
+    
+    @app.teardown_request
+    def flush_data_store(error):
+        data_store.flush()
+    
+    # Per-route latency, byte and data store metrics at /metrics
+    from app.services import metrics
+    metrics.init_app(app)
+    
     # Register blueprints
     from app.routes.restaurant_routes import restaurant_bp
     from app.routes.dish_routes import dish_bp
     from app.routes.admin_routes import admin_bp
     from app.routes.user_routes import user_bp
     from app.routes.order_routes import order_bp
+    from app.routes.catalog_routes import catalog_bp
     
     app.register_blueprint(restaurant_bp)
     app.register_blueprint(dish_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(user_bp)
     app.register_blueprint(order_bp)
+    app.register_blueprint(catalog_bp)
     
     # Error handlers
     @app.errorhandler(404)
@@ -33,6 +80,13 @@ def create_app():
     def internal_error(error):
         return jsonify({"error": "Internal server error"}), 500
     
+    # Another worker took the same restaurant name or user email first
+    from app.models.storage import DuplicateKey
+    
+    @app.errorhandler(DuplicateKey)
+    def duplicate_key(error):
+        return jsonify({"error": str(error)}), 409
+    
     # Health check endpoint
     @app.route('/health', methods=['GET'])
     def health_check():
@@ -41,8 +95,9 @@ def create_app():
     # Reset endpoint for testing
     @app.route('/reset', methods=['POST'])
     def reset_data_endpoint():
-        from app.models.data_store import reset_data
-        reset_data()
+        data_store.reset_data()
+        order_feed.reset()
+        rate_limit.reset()
         return jsonify({"message": "Data reset successfully"}), 200
     
     return app
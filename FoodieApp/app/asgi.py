@@ -0,0 +1,219 @@
+"""
+ASGI adapter - serves the Flask app from an ASGI server such as uvicorn
+
+Connections and request bodies are handled by the event loop. Flask
+views run on a bounded thread pool (FOODIE_ASGI_THREADS, default 32), so
+a slow request never stalls the loop and at most that many handlers run
+at once. Responses with a Content-Length are collected in the worker
+thread and sent in one message; streamed ones (NDJSON, exports) are
+pulled from the thread pool chunk by chunk.
+
+The order feed endpoints are served on the loop itself: a waiting
+long-poll or SSE subscriber is a pending future rather than a blocked
+thread, so thousands of idle dashboards cost neither threads nor CPU.
+These two bypass Flask, so they carry their own CORS header and do not
+show up in /metrics.
+"""
+
+import asyncio
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import parse_qs
+
+from app.models import data_store
+from app.services import order_feed
+
+DEFAULT_THREADS = 32
+FEED_PATH = re.compile(r'/api/v1/restaurants/(\d+)/orders/(feed|stream)')
+CORS_HEADER = (b'access-control-allow-origin', b'*')
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _environ(scope, body):
+    """WSGI environ for an ASGI http scope"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin1')
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+def _asgi_headers(headers):
+    return [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+
+
+class FoodieASGI:
+    """ASGI application wrapping the Flask app"""
+
+    def __init__(self, flask_app, threads=None):
+        self.flask_app = flask_app
+        threads = threads or int(os.environ.get('FOODIE_ASGI_THREADS', DEFAULT_THREADS))
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='foodie-asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        match = FEED_PATH.fullmatch(scope['path'])
+        if match and scope['method'] == 'GET':
+            await self._feed(scope, receive, send, int(match.group(1)), match.group(2))
+        else:
+            await self._wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _run_wsgi(self, environ):
+        """Run the Flask app in a worker thread - returns (status, headers, body, chunks)
+
+        body is the whole response when it has a Content-Length; otherwise
+        chunks is the open response iterable to stream from.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = headers
+
+        result = self.flask_app(environ, start_response)
+        if any(name.lower() == 'content-length' for name, _ in started['headers']):
+            try:
+                body = b''.join(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            return started['status'], started['headers'], body, None
+        return started['status'], started['headers'], None, result
+
+    async def _wsgi(self, scope, receive, send):
+        body = await _read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        status, headers, body, chunks = await loop.run_in_executor(
+            self.executor, self._run_wsgi, _environ(scope, body))
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': _asgi_headers(headers)})
+        if chunks is None:
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        iterator = iter(chunks)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(chunks, 'close'):
+                await loop.run_in_executor(self.executor, chunks.close)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def _send_json(self, send, status, data):
+        """A JSON response encoded by the Flask app's JSON provider"""
+        body = self.flask_app.json.dumps_bytes(data)
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+                                CORS_HEADER]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def _restaurant_exists(self, restaurant_id):
+        data_store.sync()
+        return restaurant_id in data_store.restaurants
+
+    async def _feed(self, scope, receive, send, restaurant_id, kind):
+        """Order feed long-poll and SSE endpoints, without holding a thread while waiting"""
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(self.executor, self._restaurant_exists, restaurant_id):
+            await self._send_json(send, 404, {"error": "Restaurant not found"})
+            return
+
+        query = {key: values[-1] for key, values in parse_qs(scope['query_string'].decode('latin1')).items()}
+        headers = dict(scope['headers'])
+        last_event_id = headers.get(b'last-event-id')
+        since, error_msg = order_feed.parse_cursor(
+            query.get('since'), last_event_id.decode('latin1') if last_event_id else None)
+        if error_msg:
+            await self._send_json(send, 400, {"error": error_msg})
+            return
+        feed = order_feed.channel(restaurant_id)
+
+        if kind == 'feed':
+            result = await feed.wait_async(since, order_feed.parse_timeout(query.get('timeout')))
+            await self._send_json(send, 200, order_feed.poll_result(since, *result))
+            return
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+            CORS_HEADER]})
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        try:
+            while not disconnected.done():
+                waiting = asyncio.ensure_future(feed.wait_async(since, order_feed.HEARTBEAT_SECONDS))
+                await asyncio.wait({waiting, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    waiting.cancel()
+                    break
+                message, since = order_feed.sse_messages(since, *waiting.result(), self.flask_app.json.dumps)
+                await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+        finally:
+            disconnected.cancel()
+
+    async def _wait_for_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+
+def create_asgi_app(flask_app=None):
+    """ASGI application for create_app(), or for the given Flask app"""
+    if flask_app is None:
+        from app import create_app
+        flask_app = create_app()
+    return FoodieASGI(flask_app)
@@ -0,0 +1,122 @@
+"""
+Concurrency Module - Thread-safe building blocks for the data store
+
+Under a threaded WSGI server several requests write at once, so id
+allocation and uniqueness checks must not be a separate read and write.
+"""
+
+import itertools
+import threading
+
+
+class AtomicCounter:
+    """Monotonic id counter
+
+    next() on an itertools.count runs entirely in C under the GIL, so two
+    threads can never be handed the same value.
+    """
+
+    def __init__(self, start=1):
+        self._count = itertools.count(start)
+
+    def next(self):
+        return next(self._count)
+
+    def reset(self, start=1):
+        self._count = itertools.count(start)
+
+
+def _check_key(key):
+    """Unique keys are non-empty strings - routes validate them first, this keeps a bad one out of the index"""
+    if not isinstance(key, str) or not key:
+        raise ValueError(f"unique key must be a non-empty string, not {key!r}")
+
+
+class UniqueIndex:
+    """Unique key -> record id map with atomic check-and-insert
+
+    Replaces the full scan for duplicate restaurant names and user emails.
+    Keys are only unique within one process: the SQLite backend enforces
+    them across workers with UNIQUE indexes, and data_store.sync() applies
+    other workers' changes here through set() and release().
+    """
+
+    def __init__(self):
+        self._ids = {}
+        # record id -> its key, so set() can drop a record's old key
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key, allocate_id):
+        """Reserve key for the id returned by allocate_id(), or return None if it is taken"""
+        _check_key(key)
+        with self._lock:
+            if key in self._ids:
+                return None
+            record_id = allocate_id()
+            self._ids[key] = record_id
+            self._keys[record_id] = key
+            return record_id
+
+    def claim_many(self, keys, allocate_id):
+        """Reserve every key or none of them
+
+        Returns (ids, taken): the ids allocated for keys in order, or an
+        empty list and the keys that are already in use.
+        """
+        for key in keys:
+            _check_key(key)
+        with self._lock:
+            taken = [key for key in keys if key in self._ids]
+            if taken:
+                return [], taken
+            ids = []
+            for key in keys:
+                record_id = allocate_id()
+                self._ids[key] = record_id
+                self._keys[record_id] = key
+                ids.append(record_id)
+            return ids, []
+
+    def add(self, key, record_id):
+        """Record an existing key - the first record keeps it"""
+        with self._lock:
+            if self._ids.setdefault(key, record_id) == record_id:
+                self._keys[record_id] = key
+
+    def set(self, key, record_id):
+        """Point key at record_id, dropping the record's previous key - for changes already made elsewhere"""
+        with self._lock:
+            old_key = self._keys.get(record_id)
+            if old_key is not None and self._ids.get(old_key) == record_id:
+                del self._ids[old_key]
+            self._ids[key] = record_id
+            self._keys[record_id] = key
+
+    def rename(self, old_key, new_key, record_id):
+        """Move record_id from old_key to new_key, or return False if new_key belongs to another record"""
+        _check_key(new_key)
+        with self._lock:
+            owner = self._ids.get(new_key)
+            if owner is not None and owner != record_id:
+                return False
+            if self._ids.get(old_key) == record_id:
+                del self._ids[old_key]
+            self._ids[new_key] = record_id
+            self._keys[record_id] = new_key
+            return True
+
+    def release(self, key, record_id):
+        """Free key if record_id still holds it"""
+        with self._lock:
+            if self._ids.get(key) == record_id:
+                del self._ids[key]
+                self._keys.pop(record_id, None)
+
+    def owner(self, key):
+        return self._ids.get(key)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self._keys.clear()
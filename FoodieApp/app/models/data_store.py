@@ -1,72 +1,509 @@
 """
-Data Store Module - In-memory data storage for Foodie App
+Data Store Module - Data storage for Foodie App
 """
 
-# In-memory data stores
-restaurants = {}
-dishes = {}
-users = {}
-orders = {}
-ratings = {}
-feedback = []
+import threading
+from functools import wraps
 
-# ID counters
-restaurant_id_counter = 1
-dish_id_counter = 1
-user_id_counter = 1
-order_id_counter = 1
-rating_id_counter = 1
+from app.models import (geo_index, order_index, price_tables, rating_aggregates, search_cards, search_index,
+                        storage, text_index)
+from app.models.concurrency import UniqueIndex
+
+# Active storage backend - in-memory unless configure_backend() is called
+backend = storage.MemoryBackend()
+
+# Data stores, provided by the backend
+restaurants = backend.table('restaurants')
+dishes = backend.table('dishes')
+users = backend.table('users')
+orders = backend.table('orders')
+ratings = backend.table('ratings')
+feedback = backend.feedback_log()
+
+# Soft-deleted restaurants awaiting compaction: restaurant_id -> {"restaurant", "dishes", "orders", "ratings"}
+trash = backend.trash()
+
+# Unique keys with atomic check-and-insert
+restaurant_names = UniqueIndex()
+user_emails = UniqueIndex()
+
+# Latest ratings shown on each detailed search result
+SEARCH_RECENT_RATINGS = 5
+
+# Bumped by every write that can change a restaurant read endpoint - response caches key on it
+catalog_version = 0
+_catalog_version_lock = threading.Lock()
+
+
+# Calls per write operation, reported by /metrics
+_operation_counts = {}
+_operation_lock = threading.Lock()
+
+
+def _counted(func):
+    """Count every call of a data store operation"""
+    name = func.__name__
+    
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _operation_lock:
+            _operation_counts[name] = _operation_counts.get(name, 0) + 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def get_operation_counts():
+    with _operation_lock:
+        return dict(_operation_counts)
+
+
+def bump_catalog_version():
+    global catalog_version
+    with _catalog_version_lock:
+        catalog_version += 1
+
+
+def configure_backend(new_backend):
+    """Switch every data store to new_backend and rebuild the indexes from it"""
+    global backend, restaurants, dishes, users, orders, ratings, feedback, trash
+    
+    backend = new_backend
+    restaurants = backend.table('restaurants')
+    dishes = backend.table('dishes')
+    users = backend.table('users')
+    orders = backend.table('orders')
+    ratings = backend.table('ratings')
+    feedback = backend.feedback_log()
+    trash = backend.trash()
+    rebuild_indexes()
+
+
+@_counted
+def rebuild_indexes():
+    """Recompute every in-memory index from the backend"""
+    bump_catalog_version()
+    search_index.reset()
+    text_index.reset()
+    geo_index.reset()
+    rating_aggregates.reset()
+    order_index.reset()
+    price_tables.reset()
+    search_cards.reset()
+    restaurant_names.clear()
+    user_emails.clear()
+    
+    for restaurant in restaurants.values():
+        search_index.index_restaurant(restaurant)
+        text_index.index_restaurant(restaurant)
+        geo_index.index_restaurant(restaurant)
+        restaurant_names.add(restaurant.name, restaurant.id)
+    for user in users.values():
+        user_emails.add(user.email, user.id)
+    for dish in dishes.values():
+        search_index.index_dish(dish)
+        text_index.index_dish(dish)
+    
+    orders_by_id = {}
+    for order in orders.values():
+        order_index.index_order(order)
+        orders_by_id[order.id] = order
+    for rating in ratings.values():
+        order = orders_by_id.get(rating.order_id)
+        if order is not None:
+            _index_rating(rating, order)
+
+
+def sync():
+    """Bring the indexes up to date with what other worker processes changed in the store"""
+    changes = backend.external_changes()
+    if changes is None:
+        rebuild_indexes()
+    elif changes:
+        apply_changes(changes)
+
+
+@_counted
+def apply_changes(changes):
+    """Update the indexes for other workers' changes, as (table, id, operation, deleted record) tuples
+
+    Costs O(changed rows) where rebuild_indexes() costs O(every row).
+    Updated records are read back in one batch per table; a record gone
+    by then is skipped, as its delete follows later in changes.
+    """
+    updated = {}
+    for name, record_id, operation, _ in changes:
+        if operation == 's':
+            updated.setdefault(name, set()).add(record_id)
+    current = {name: {record.id: record for record in backend.get_many(name, sorted(ids))}
+               for name, ids in updated.items()}
+    
+    for name, record_id, operation, deleted in changes:
+        record = current.get(name, {}).get(record_id) if operation == 's' else None
+        if operation == 's' and record is None:
+            continue
+        if name == 'restaurants':
+            if record is not None:
+                search_index.index_restaurant(record)
+                text_index.index_restaurant(record)
+                geo_index.index_restaurant(record)
+                restaurant_names.set(record.name, record_id)
+            else:
+                # Its dishes, orders and ratings have their own deletes in changes
+                search_index.unindex_restaurant(record_id)
+                text_index.unindex_restaurant(record_id)
+                geo_index.unindex_restaurant(record_id)
+                rating_aggregates.remove_restaurant(record_id)
+                restaurant_names.release(deleted.name, record_id)
+            price_tables.invalidate(record_id)
+            search_cards.invalidate(record_id)
+        elif name == 'dishes':
+            dish = record or deleted
+            if record is not None:
+                search_index.index_dish(record)
+                text_index.index_dish(record)
+            else:
+                search_index.unindex_dish(deleted)
+                text_index.unindex_dish(deleted)
+            price_tables.invalidate(dish.restaurant_id)
+            search_cards.invalidate(dish.restaurant_id)
+        elif name == 'users':
+            if record is not None:
+                user_emails.set(record.email, record_id)
+            else:
+                user_emails.release(deleted.email, record_id)
+        elif name == 'orders':
+            if record is not None:
+                order_index.index_order(record)
+            else:
+                order_index.unindex_order(deleted)
+        elif name == 'ratings' and record is not None:
+            # Ratings are never updated, only re-inserted by a restore - index each once
+            order = orders.get(record.order_id)
+            if order is not None and record_id not in order_index.get_order_rating_ids(order.id):
+                _index_rating(record, order)
+                search_cards.invalidate(order.restaurant_id)
+        # Deleted ratings go with their restaurant, whose delete already dropped their aggregates
+    bump_catalog_version()
+
+
+def flush():
+    """Commit pending writes - called at the end of every request"""
+    backend.flush()
+
+
+def transaction():
+    """Context manager grouping many writes into one backend transaction"""
+    return backend.transaction()
+
+
+def feedback_page(after_id, limit):
+    """Up to limit feedback entries after after_id, skipping those of soft-deleted restaurants"""
+    entries = []
+    while len(entries) < limit:
+        wanted = limit - len(entries)
+        page = feedback.page(after_id, wanted)
+        hidden = trash.hidden(entry.rating_id for entry in page)
+        entries.extend(entry for entry in page if entry.rating_id not in hidden)
+        if len(page) < wanted:
+            break
+        after_id = page[-1].rating_id
+    return entries
+
+
+def record_ids(name):
+    """Ids in a table as of one moment, for walking it while writes go on (e.g. an export)"""
+    return backend.ids(name)
+
+
+def get_orders(order_ids):
+    """Orders for ids in the order given - one batched read, gathered across shards by the sharded backend"""
+    return backend.get_many('orders', order_ids)
 
 
 def get_next_restaurant_id():
-    global restaurant_id_counter
-    current = restaurant_id_counter
-    restaurant_id_counter += 1
-    return current
+    return backend.next_id('restaurants')
 
 
 def get_next_dish_id():
-    global dish_id_counter
-    current = dish_id_counter
-    dish_id_counter += 1
-    return current
+    return backend.next_id('dishes')
 
 
 def get_next_user_id():
-    global user_id_counter
-    current = user_id_counter
-    user_id_counter += 1
-    return current
+    return backend.next_id('users')
 
 
 def get_next_order_id():
-    global order_id_counter
-    current = order_id_counter
-    order_id_counter += 1
-    return current
+    return backend.next_id('orders')
 
 
 def get_next_rating_id():
-    global rating_id_counter
-    current = rating_id_counter
-    rating_id_counter += 1
-    return current
+    return backend.next_id('ratings')
+
+
+@_counted
+def save_restaurant(restaurant):
+    """Insert or update a restaurant and refresh its index entries"""
+    try:
+        restaurants[restaurant.id] = restaurant
+    except storage.DuplicateKey:
+        # Another worker holds the name - the shared store has the final say
+        restaurant_names.release(restaurant.name, restaurant.id)
+        raise
+    search_index.index_restaurant(restaurant)
+    text_index.index_restaurant(restaurant)
+    geo_index.index_restaurant(restaurant)
+    search_cards.invalidate(restaurant.id)
+    bump_catalog_version()
+    return restaurant
 
 
+def forget_restaurants(claimed):
+    """Drop the index entries and name claims of (restaurant_id, name) pairs whose writes were rolled back"""
+    for restaurant_id, name in claimed:
+        search_index.unindex_restaurant(restaurant_id)
+        text_index.unindex_restaurant(restaurant_id)
+        geo_index.unindex_restaurant(restaurant_id)
+        search_cards.invalidate(restaurant_id)
+        restaurant_names.release(name, restaurant_id)
+    bump_catalog_version()
+
+
+@_counted
+def delete_restaurant(restaurant_id):
+    """Soft-delete a restaurant together with its dishes, orders and ratings
+
+    The dependent rows are found through the reverse indexes (restaurant
+    -> dishes, restaurant -> orders, order -> ratings), so a delete costs
+    O(related rows). They leave the tables and every index at once and
+    wait in the backend's trash, in the same transaction, until compact()
+    purges them for good along with their feedback entries; until then
+    restore_restaurant() can bring them back, from any worker.
+    """
+    order_ids = list(order_index.get_restaurant_order_ids(restaurant_id))
+    rating_ids = [rating_id for order_id in order_ids for rating_id in order_index.get_order_rating_ids(order_id)]
+    with transaction():
+        restaurant = restaurants.pop(restaurant_id)
+        deleted = {
+            "restaurant": restaurant,
+            "dishes": [dishes.pop(dish_id) for dish_id in search_index.get_dish_ids(restaurant_id) if dish_id in dishes],
+            "orders": [orders.pop(order_id) for order_id in order_ids if order_id in orders],
+            "ratings": [ratings.pop(rating_id) for rating_id in rating_ids if rating_id in ratings]
+        }
+        
+        search_index.unindex_restaurant(restaurant_id)
+        text_index.unindex_restaurant(restaurant_id)
+        geo_index.unindex_restaurant(restaurant_id)
+        order_index.unindex_restaurant_orders(restaurant_id, deleted['orders'])
+        rating_aggregates.remove_restaurant(restaurant_id)
+        price_tables.invalidate(restaurant_id)
+        search_cards.invalidate(restaurant_id)
+        restaurant_names.release(restaurant.name, restaurant_id)
+        # Trashed last, so a restore never finds it before it has left the indexes
+        trash.put(restaurant_id, deleted)
+    bump_catalog_version()
+    return restaurant
+
+
+@_counted
+def restore_restaurant(restaurant_id):
+    """Bring back a soft-deleted restaurant and its rows before compaction purges them
+
+    Returns the restaurant, or None if it is not in trash or its name was
+    taken by another restaurant in the meantime.
+    """
+    deleted = trash.take(restaurant_id)
+    if deleted is None:
+        return None
+    if restaurant_names.claim(deleted['restaurant'].name, lambda: restaurant_id) is None:
+        trash.put(restaurant_id, deleted)
+        return None
+    
+    # The SQLite backend commits the take with the rows it restores
+    with transaction():
+        save_restaurant(deleted['restaurant'])
+        for dish in deleted['dishes']:
+            save_dish(dish)
+        for order in deleted['orders']:
+            save_order(order)
+        for rating in deleted['ratings']:
+            save_rating(rating)
+    trash.release_ratings(rating.id for rating in deleted['ratings'])
+    return deleted['restaurant']
+
+
+@_counted
+def compact():
+    """Purge every soft-deleted restaurant's rows and feedback for good, freeing their memory
+
+    Returns how many restaurants and rows were purged.
+    """
+    with transaction():
+        purged = trash.take_all()
+        rating_ids = {rating.id for deleted in purged for rating in deleted['ratings']}
+        if rating_ids:
+            feedback.purge(rating_ids)
+            trash.release_ratings(rating_ids)
+    return {
+        "restaurants": len(purged),
+        "dishes": sum(len(deleted['dishes']) for deleted in purged),
+        "orders": sum(len(deleted['orders']) for deleted in purged),
+        "ratings": len(rating_ids)
+    }
+
+
+def get_trash_counts():
+    """Soft-deleted restaurants and ratings waiting for compaction"""
+    return trash.counts()
+
+
+@_counted
+def save_dish(dish):
+    """Insert or update a dish and link it to its restaurant"""
+    dishes[dish.id] = dish
+    search_index.index_dish(dish)
+    text_index.index_dish(dish)
+    price_tables.invalidate(dish.restaurant_id)
+    search_cards.invalidate(dish.restaurant_id)
+    bump_catalog_version()
+    return dish
+
+
+@_counted
+def delete_dish(dish_id):
+    """Remove a dish and unlink it from its restaurant"""
+    dish = dishes.pop(dish_id)
+    search_index.unindex_dish(dish)
+    text_index.unindex_dish(dish)
+    price_tables.invalidate(dish.restaurant_id)
+    search_cards.invalidate(dish.restaurant_id)
+    bump_catalog_version()
+    return dish
+
+
+def _build_price_table(restaurant_id):
+    table = {}
+    for dish_id in search_index.get_dish_ids(restaurant_id):
+        dish = dishes.get(dish_id)
+        if dish is not None:
+            price = dish.price if isinstance(dish.price, (int, float)) and not isinstance(dish.price, bool) else None
+            table[dish_id] = (dish.name, price, dish.enabled)
+    return table
+
+
+def get_price_table(restaurant_id):
+    """dish_id -> (name, price, enabled) for every dish of a restaurant, cached until its dishes change
+
+    price is None when the stored price is not a number.
+    """
+    return price_tables.get(restaurant_id, _build_price_table)
+
+
+def _build_search_card(restaurant_id):
+    restaurant = restaurants[restaurant_id]
+    restaurant_dishes = [dishes[dish_id] for dish_id in search_index.get_dish_ids(restaurant_id)]
+    return {
+        "id": restaurant.id,
+        "name": restaurant.name,
+        "category": restaurant.category,
+        "location": restaurant.location,
+        "contact": restaurant.contact,
+        "images": restaurant.images,
+        "enabled": restaurant.enabled,
+        "approved": restaurant.approved,
+        "lat": restaurant.lat,
+        "lon": restaurant.lon,
+        "average_rating": round(rating_aggregates.get_average(restaurant_id), 2),
+        "total_ratings": rating_aggregates.get_count(restaurant_id),
+        "dishes": [
+            {
+                "id": d.id,
+                "name": d.name,
+                "type": d.type,
+                "price": d.price,
+                "available_time": d.available_time,
+                "image": d.image,
+                "enabled": d.enabled
+            }
+            for d in restaurant_dishes
+        ],
+        "total_dishes": len(restaurant_dishes),
+        "recent_ratings": [
+            {
+                "rating": r["rating"],
+                "comment": r["comment"]
+            }
+            for r in rating_aggregates.get_recent(restaurant_id, SEARCH_RECENT_RATINGS)
+        ]
+    }
+
+
+def get_search_card(restaurant_id):
+    """A restaurant's detailed search result as JSON bytes, cached until it, its dishes or its ratings change"""
+    return search_cards.get(restaurant_id, _build_search_card)
+
+
+@_counted
+def save_user(user):
+    """Insert or update a user"""
+    try:
+        users[user.id] = user
+    except storage.DuplicateKey:
+        user_emails.release(user.email, user.id)
+        raise
+    return user
+
+
+@_counted
+def save_order(order):
+    """Insert or update an order and add it to the order lists"""
+    orders[order.id] = order
+    order_index.index_order(order)
+    return order
+
+
+def _index_rating(rating, order):
+    search_index.index_rating(rating.id, order.restaurant_id)
+    order_index.index_rating(order.id, rating.id)
+    rating_aggregates.add_rating(order.restaurant_id, rating.rating)
+    rating_aggregates.add_recent(order.restaurant_id, {
+        "rating_id": rating.id,
+        "order_id": order.id,
+        "user_id": order.user_id,
+        "rating": rating.rating,
+        "comment": rating.comment
+    })
+
+
+@_counted
+def save_rating(rating):
+    """Insert a rating and fold it into its restaurant's indexes and aggregates"""
+    ratings[rating.id] = rating
+    order = orders.get(rating.order_id)
+    if order is not None:
+        _index_rating(rating, order)
+        search_cards.invalidate(order.restaurant_id)
+    bump_catalog_version()
+    return rating
+
+
+@_counted
+def add_feedback(entry):
+    """Append a customer feedback entry"""
+    feedback.append(entry)
+    return entry
+
+
+@_counted
 def reset_data():
     """Reset all data stores - used for testing"""
-    global restaurants, dishes, users, orders, ratings, feedback
-    global restaurant_id_counter, dish_id_counter, user_id_counter, order_id_counter, rating_id_counter
-    
-    restaurants.clear()
-    dishes.clear()
-    users.clear()
-    orders.clear()
-    ratings.clear()
-    feedback.clear()
-    
-    restaurant_id_counter = 1
-    dish_id_counter = 1
-    user_id_counter = 1
-    order_id_counter = 1
-    rating_id_counter = 1
+    backend.clear()
+    search_index.reset()
+    text_index.reset()
+    geo_index.reset()
+    rating_aggregates.reset()
+    order_index.reset()
+    price_tables.reset()
+    search_cards.reset()
+    restaurant_names.clear()
+    user_emails.clear()
+    bump_catalog_version()
@@ -0,0 +1,121 @@
+"""
+Geo Index Module - Grid index of restaurant coordinates for proximity search
+
+The globe is cut into CELL_DEGREES x CELL_DEGREES cells and every
+restaurant with a lat/lon is bucketed into the cell holding it. A radius
+query only visits the cells overlapping the circle's bounding box and
+measures the exact (haversine) distance to the restaurants in them,
+instead of measuring the distance to every restaurant.
+
+Writers serialize on a lock. Readers copy each cell's id set, a
+C-level operation that is atomic under the GIL.
+"""
+
+import math
+import threading
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# About 5.5 km of latitude per cell
+CELL_DEGREES = 0.05
+LON_CELLS = round(360 / CELL_DEGREES)
+
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 100
+
+# (lat cell, lon cell) -> set of restaurant ids
+cells = {}
+
+# restaurant_id -> (lat, lon)
+positions = {}
+
+# Guards every index mutation
+_lock = threading.Lock()
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _lat_cell(lat):
+    return math.floor(lat / CELL_DEGREES)
+
+
+def _lon_cell(lon):
+    return math.floor((lon + 180) / CELL_DEGREES) % LON_CELLS
+
+
+def _remove(restaurant_id):
+    position = positions.pop(restaurant_id, None)
+    if position is None:
+        return
+    key = (_lat_cell(position[0]), _lon_cell(position[1]))
+    ids = cells.get(key)
+    if ids is not None:
+        ids.discard(restaurant_id)
+        if not ids:
+            del cells[key]
+
+
+def index_restaurant(restaurant):
+    """Add, move or drop a restaurant's point - restaurants without coordinates are not indexed"""
+    with _lock:
+        _remove(restaurant.id)
+        if restaurant.lat is None or restaurant.lon is None:
+            return
+        positions[restaurant.id] = (restaurant.lat, restaurant.lon)
+        cells.setdefault((_lat_cell(restaurant.lat), _lon_cell(restaurant.lon)), set()).add(restaurant.id)
+
+
+def unindex_restaurant(restaurant_id):
+    """Remove a restaurant's point"""
+    with _lock:
+        _remove(restaurant_id)
+
+
+def _cell_keys(lat, lon, radius_km):
+    """Keys of every cell overlapping the bounding box of the circle"""
+    lat_span = radius_km / KM_PER_DEGREE
+    lat_cells = range(_lat_cell(max(-90.0, lat - lat_span)), _lat_cell(min(90.0, lat + lat_span)) + 1)
+
+    # Degrees of longitude shrink towards the poles - near one, take whole rows
+    widest = max(abs(lat) + lat_span, 0)
+    lon_cells = range(LON_CELLS)
+    if widest < 89.9:
+        lon_span = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+        first = math.floor((lon - lon_span + 180) / CELL_DEGREES)
+        last = math.floor((lon + lon_span + 180) / CELL_DEGREES)
+        # A span reaching all the way round would wrap onto its own first cells and visit them twice
+        if last - first + 1 < LON_CELLS:
+            lon_cells = [cell % LON_CELLS for cell in range(first, last + 1)]
+
+    return [(lat_cell, lon_cell) for lat_cell in lat_cells for lon_cell in lon_cells]
+
+
+def near(lat, lon, radius_km):
+    """(restaurant_id, distance_km) for every restaurant within radius_km of a point, nearest first"""
+    found = []
+    for key in _cell_keys(lat, lon, radius_km):
+        ids = cells.get(key)
+        if not ids:
+            continue
+        for restaurant_id in list(ids):
+            position = positions.get(restaurant_id)
+            if position is None:
+                continue
+            distance = distance_km(lat, lon, position[0], position[1])
+            if distance <= radius_km:
+                found.append((distance, restaurant_id))
+    found.sort()
+    return [(restaurant_id, distance) for distance, restaurant_id in found]
+
+
+def reset():
+    """Clear the index - called from data_store.reset_data"""
+    with _lock:
+        cells.clear()
+        positions.clear()
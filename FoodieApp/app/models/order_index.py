@@ -0,0 +1,159 @@
+"""
+Order Index Module - Sorted order id lists for the order views
+
+Keeps every order id, and the ids per restaurant and per user, in
+ascending order so list endpoints can page with a bisect instead of
+filtering the whole orders table.
+
+Orders that are still in progress also sit in a per-restaurant queue for
+their status, ordered by creation time, so a restaurant's active orders
+are read in O(active) however many orders it has ever had.
+
+Ratings are linked to the order they rate, so deleting a restaurant finds
+every dependent row through these lists instead of scanning the tables.
+"""
+
+import threading
+from bisect import bisect_left, insort
+
+from app.models.records import ACTIVE_ORDER_STATUSES
+
+# Removing more orders than this at once rebuilds the global id list instead
+REBUILD_THRESHOLD = 64
+
+# Every order id, ascending
+all_order_ids = []
+
+# restaurant_id / user_id -> ascending list of order ids
+restaurant_orders = {}
+user_orders = {}
+
+# order_id -> list of rating ids given for it
+order_ratings = {}
+
+# (restaurant_id, status) -> [(created_at, order_id)] ascending, active statuses only
+status_queues = {}
+
+# order_id -> (status_queues key, entry) for every queued order
+_queued = {}
+
+# Guards every index mutation
+_lock = threading.Lock()
+
+
+def _insert(ids, order_id):
+    """Insert keeping the list sorted - ids arrive almost in order, so this is nearly an append"""
+    position = bisect_left(ids, order_id)
+    if position == len(ids) or ids[position] != order_id:
+        ids.insert(position, order_id)
+
+
+def _remove(ids, order_id):
+    position = bisect_left(ids, order_id)
+    if position < len(ids) and ids[position] == order_id:
+        del ids[position]
+
+
+def _remove_keyed(lists, key, order_id):
+    """_remove from lists[key], dropping the list once it is empty"""
+    ids = lists.get(key)
+    if ids is not None:
+        _remove(ids, order_id)
+        if not ids:
+            del lists[key]
+
+
+def index_order(order):
+    """Add an order to the global, per-restaurant and per-user lists"""
+    with _lock:
+        _insert(all_order_ids, order.id)
+        _insert(restaurant_orders.setdefault(order.restaurant_id, []), order.id)
+        _insert(user_orders.setdefault(order.user_id, []), order.id)
+        _dequeue(order)
+        if order.status in ACTIVE_ORDER_STATUSES:
+            key = (order.restaurant_id, order.status)
+            entry = (order.created_at, order.id)
+            insort(status_queues.setdefault(key, []), entry)
+            _queued[order.id] = (key, entry)
+
+
+def unindex_order(order):
+    """Remove an order from every list"""
+    with _lock:
+        _remove(all_order_ids, order.id)
+        _remove_keyed(restaurant_orders, order.restaurant_id, order.id)
+        _remove_keyed(user_orders, order.user_id, order.id)
+        order_ratings.pop(order.id, None)
+        _dequeue(order)
+
+
+def unindex_restaurant_orders(restaurant_id, orders):
+    """Remove every order of a deleted restaurant
+
+    Past REBUILD_THRESHOLD orders, the global list is rebuilt in one pass
+    rather than shifted once per removed order.
+    """
+    with _lock:
+        restaurant_orders.pop(restaurant_id, None)
+        if len(orders) > REBUILD_THRESHOLD:
+            doomed = {order.id for order in orders}
+            all_order_ids[:] = [order_id for order_id in all_order_ids if order_id not in doomed]
+        else:
+            for order in orders:
+                _remove(all_order_ids, order.id)
+        for order in orders:
+            _remove_keyed(user_orders, order.user_id, order.id)
+            order_ratings.pop(order.id, None)
+            _dequeue(order)
+
+
+def index_rating(order_id, rating_id):
+    """Link a rating to the order it rates"""
+    with _lock:
+        order_ratings.setdefault(order_id, []).append(rating_id)
+
+
+def get_order_rating_ids(order_id):
+    """Ids of the ratings given for an order"""
+    return order_ratings.get(order_id, [])
+
+
+def _dequeue(order):
+    """Take an order out of the status queue it is in, if any"""
+    queued = _queued.pop(order.id, None)
+    if queued is None:
+        return
+    key, entry = queued
+    queue = status_queues[key]
+    del queue[bisect_left(queue, entry)]
+    if not queue:
+        del status_queues[key]
+
+
+def get_all_order_ids():
+    return all_order_ids
+
+
+def get_restaurant_order_ids(restaurant_id):
+    return restaurant_orders.get(restaurant_id, [])
+
+
+def get_user_order_ids(user_id):
+    return user_orders.get(user_id, [])
+
+
+def get_queued_order_ids(restaurant_id, status):
+    """Ids of a restaurant's orders in an active status, oldest first"""
+    with _lock:
+        return [order_id for _, order_id in status_queues.get((restaurant_id, status), ())]
+
+
+def reset():
+    """Clear every list - called from data_store.reset_data"""
+    with _lock:
+        all_order_ids.clear()
+        restaurant_orders.clear()
+        user_orders.clear()
+        order_ratings.clear()
+        status_queues.clear()
+        _queued.clear()
@@ -0,0 +1,53 @@
+"""
+Price Tables - Cached per-restaurant dish price lookups for order pricing
+
+A restaurant's table maps dish_id -> (name, price, enabled) for every
+dish it offers. Tables are built on first use and dropped whenever one of
+the restaurant's dishes changes (data_store calls invalidate()).
+"""
+
+import threading
+from contextlib import ExitStack
+
+tables = {}
+
+# Locks and generations are striped by restaurant id, so writes to
+# different restaurants never wait on one another
+STRIPES = 16
+_locks = [threading.Lock() for _ in range(STRIPES)]
+
+# Each bumped by every invalidation in its stripe, so a table built from
+# data that changed while it was being built is never cached
+_generations = [0] * STRIPES
+
+
+def get(restaurant_id, build):
+    """The restaurant's price table, calling build(restaurant_id) on a miss"""
+    stripe = restaurant_id % STRIPES
+    with _locks[stripe]:
+        table = tables.get(restaurant_id)
+        if table is not None:
+            return table
+        generation = _generations[stripe]
+
+    table = build(restaurant_id)
+    with _locks[stripe]:
+        if generation == _generations[stripe]:
+            tables[restaurant_id] = table
+    return table
+
+
+def invalidate(restaurant_id):
+    """Drop a restaurant's table after its dishes changed"""
+    stripe = restaurant_id % STRIPES
+    with _locks[stripe]:
+        tables.pop(restaurant_id, None)
+        _generations[stripe] += 1
+
+
+def reset():
+    with ExitStack() as stack:
+        for lock in _locks:
+            stack.enter_context(lock)
+        tables.clear()
+        _generations[:] = [generation + 1 for generation in _generations]
@@ -0,0 +1,142 @@
+"""
+Rating Aggregates Module - Running rating statistics per restaurant
+
+data_store.save_rating folds each new rating into its restaurant's
+aggregate in O(1), so search and the rating summary endpoint never have
+to recompute averages from the full ratings table. The latest
+RECENT_RATINGS ratings of each restaurant are kept in a ring buffer, so
+recent feedback is read without scanning every rating.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+from itertools import islice
+
+HISTOGRAM_BUCKETS = (1, 2, 3, 4, 5)
+RECENT_RATINGS = 20
+
+# restaurant_id -> {"count", "sum", "min", "max", "histogram"}
+aggregates = {}
+
+# restaurant_id -> deque of the latest RECENT_RATINGS ratings, oldest first
+recent = {}
+
+# (average_rating, restaurant_id) pairs kept sorted for min-rating filters
+_by_average = []
+
+# Guards aggregate updates and the sorted list
+_lock = threading.Lock()
+
+
+def _average(aggregate):
+    return aggregate['sum'] / aggregate['count']
+
+
+def _bucket(value):
+    """Histogram bucket for a rating - whole stars, so 4.5 counts as 4"""
+    return str(min(max(int(value), HISTOGRAM_BUCKETS[0]), HISTOGRAM_BUCKETS[-1]))
+
+
+def _unsort(restaurant_id, aggregate):
+    """Drop a restaurant's current entry from the sorted average list"""
+    entry = (_average(aggregate), restaurant_id)
+    position = bisect_left(_by_average, entry)
+    if position < len(_by_average) and _by_average[position] == entry:
+        del _by_average[position]
+
+
+def add_rating(restaurant_id, value):
+    """Fold a new rating into the restaurant's aggregate"""
+    with _lock:
+        aggregate = aggregates.get(restaurant_id)
+        if aggregate is None:
+            aggregate = {
+                "count": 0,
+                "sum": 0,
+                "min": value,
+                "max": value,
+                "histogram": {str(bucket): 0 for bucket in HISTOGRAM_BUCKETS}
+            }
+            aggregates[restaurant_id] = aggregate
+        else:
+            _unsort(restaurant_id, aggregate)
+
+        aggregate['count'] += 1
+        aggregate['sum'] += value
+        aggregate['min'] = min(aggregate['min'], value)
+        aggregate['max'] = max(aggregate['max'], value)
+        aggregate['histogram'][_bucket(value)] += 1
+        insort(_by_average, (_average(aggregate), restaurant_id))
+
+
+def add_recent(restaurant_id, entry):
+    """Push a rating entry into the restaurant's ring buffer, dropping the oldest once full"""
+    with _lock:
+        ratings = recent.get(restaurant_id)
+        if ratings is None:
+            ratings = recent[restaurant_id] = deque(maxlen=RECENT_RATINGS)
+        ratings.append(entry)
+
+
+def remove_restaurant(restaurant_id):
+    """Forget a restaurant's aggregate and recent ratings"""
+    with _lock:
+        recent.pop(restaurant_id, None)
+        aggregate = aggregates.pop(restaurant_id, None)
+        if aggregate is not None:
+            _unsort(restaurant_id, aggregate)
+
+
+def get_average(restaurant_id):
+    """Average rating, or 0 for restaurants nobody has rated yet"""
+    aggregate = aggregates.get(restaurant_id)
+    return _average(aggregate) if aggregate else 0
+
+
+def get_count(restaurant_id):
+    aggregate = aggregates.get(restaurant_id)
+    return aggregate['count'] if aggregate else 0
+
+
+def get_summary(restaurant_id):
+    """Rating summary for a restaurant"""
+    aggregate = aggregates.get(restaurant_id)
+    if aggregate is None:
+        return {
+            "restaurant_id": restaurant_id,
+            "average_rating": 0,
+            "total_ratings": 0,
+            "min_rating": None,
+            "max_rating": None,
+            "histogram": {str(bucket): 0 for bucket in HISTOGRAM_BUCKETS}
+        }
+    return {
+        "restaurant_id": restaurant_id,
+        "average_rating": round(_average(aggregate), 2),
+        "total_ratings": aggregate['count'],
+        "min_rating": aggregate['min'],
+        "max_rating": aggregate['max'],
+        "histogram": dict(aggregate['histogram'])
+    }
+
+
+def get_recent(restaurant_id, limit=RECENT_RATINGS):
+    """Up to limit of the restaurant's latest rating entries, newest first"""
+    with _lock:
+        ratings = recent.get(restaurant_id)
+        return list(islice(reversed(ratings), limit)) if ratings else []
+
+
+def restaurants_rated_at_least(min_rating):
+    """Ids of rated restaurants whose average is at least min_rating"""
+    position = bisect_left(_by_average, (min_rating, float('-inf')))
+    return {restaurant_id for _, restaurant_id in _by_average[position:]}
+
+
+def reset():
+    """Clear every aggregate - called from data_store.reset_data"""
+    with _lock:
+        aggregates.clear()
+        recent.clear()
+        _by_average.clear()
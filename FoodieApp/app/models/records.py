@@ -0,0 +1,141 @@
+"""
+Records Module - Compact record types for every stored entity
+
+Each entity is a dataclass with __slots__, so an instance keeps its
+fields in a fixed-size array instead of a per-object __dict__ - roughly
+a third of the memory of the equivalent dict. to_dict() turns a record
+into a JSON-ready dict for responses and storage; from_dict() rebuilds a
+record, ignoring unknown keys. A list field declared with
+field(metadata={'items': SomeRecord}) holds records of that type and is
+converted item by item.
+"""
+
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
+
+# record type -> (field names, attrgetter over all of them, {list field: item record type})
+_serializers = {}
+
+
+def _record(cls):
+    """Make cls a slotted dataclass and register its serializer"""
+    cls = dataclass(slots=True)(cls)
+    names = tuple(f.name for f in fields(cls))
+    nested = {f.name: f.metadata['items'] for f in fields(cls) if 'items' in f.metadata}
+    _serializers[cls] = (names, attrgetter(*names), nested)
+    return cls
+
+
+@_record
+class Restaurant:
+    id: int
+    name: str
+    category: str
+    location: str
+    contact: str
+    images: list = field(default_factory=list)
+    enabled: bool = True
+    approved: bool = False
+    lat: float = None
+    lon: float = None
+
+
+@_record
+class Dish:
+    id: int
+    restaurant_id: int
+    name: str
+    type: str
+    price: float
+    available_time: str = 'All day'
+    image: str = ''
+    enabled: bool = True
+
+
+@_record
+class User:
+    id: int
+    name: str
+    email: str
+    password: str
+
+
+@_record
+class OrderLine:
+    dish_id: int
+    quantity: int = 1
+    name: str = ''
+    unit_price: float = 0
+    line_total: float = 0
+
+
+# Order lifecycle - status -> statuses it may move to next
+ORDER_TRANSITIONS = {
+    'pending': ('accepted', 'cancelled'),
+    'accepted': ('preparing', 'cancelled'),
+    'preparing': ('dispatched', 'cancelled'),
+    'dispatched': ('delivered',),
+    'delivered': (),
+    'cancelled': (),
+}
+ORDER_STATUSES = tuple(ORDER_TRANSITIONS)
+ACTIVE_ORDER_STATUSES = tuple(status for status, following in ORDER_TRANSITIONS.items() if following)
+
+
+@_record
+class Order:
+    id: int
+    user_id: int
+    restaurant_id: int
+    dishes: list = field(metadata={'items': OrderLine})
+    status: str = 'pending'
+    total: float = 0
+    created_at: float = 0
+    updated_at: float = 0
+
+
+@_record
+class Rating:
+    id: int
+    order_id: int
+    rating: float
+    comment: str = ''
+
+
+@_record
+class Feedback:
+    rating_id: int
+    user_id: int
+    restaurant_id: int
+    rating: float
+    comment: str = ''
+
+
+# Record type stored in each data store table
+TABLE_TYPES = {
+    'restaurants': Restaurant,
+    'dishes': Dish,
+    'users': User,
+    'orders': Order,
+    'ratings': Rating,
+    'feedback': Feedback,
+}
+
+
+def to_dict(record):
+    """JSON-ready dict of a record's fields, in declaration order"""
+    names, getter, nested = _serializers[type(record)]
+    data = dict(zip(names, getter(record)))
+    for name in nested:
+        data[name] = [to_dict(item) for item in data[name]]
+    return data
+
+
+def from_dict(record_type, data):
+    """Build a record_type from a dict, ignoring keys it has no field for"""
+    names, _, nested = _serializers[record_type]
+    values = {name: data[name] for name in names if name in data}
+    for name, item_type in nested.items():
+        if name in values:
+            values[name] = [from_dict(item_type, item) for item in values[name]]
+    return record_type(**values)
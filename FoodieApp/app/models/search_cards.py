@@ -0,0 +1,85 @@
+"""
+Search Cards - Materialized per-restaurant entries of the detailed search
+
+A card is everything the detailed search returns for one restaurant -
+its fields, dishes, rating summary and recent ratings - stored already
+serialized as a JSON fragment. Search responses are built by joining
+fragments instead of rebuilding and re-encoding the nested dicts for
+every match on every request.
+
+Cards are built on first use and dropped whenever the restaurant, one
+of its dishes or one of its ratings changes (data_store calls
+invalidate()), so a write only costs the next search one card rebuild.
+"""
+
+import json
+import threading
+from contextlib import ExitStack
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+cards = {}
+
+# Locks and generations are striped by restaurant id, so writes to
+# different restaurants never wait on one another
+STRIPES = 16
+_locks = [threading.Lock() for _ in range(STRIPES)]
+
+# Each bumped by every invalidation in its stripe, so a card built from
+# data that changed while it was being built is never cached
+_generations = [0] * STRIPES
+
+
+def encode(data):
+    """Compact JSON bytes, keys unsorted like the app's JSON provider"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def get(restaurant_id, build):
+    """The restaurant's card as JSON bytes, calling build(restaurant_id) for its dict on a miss"""
+    stripe = restaurant_id % STRIPES
+    with _locks[stripe]:
+        card = cards.get(restaurant_id)
+        if card is not None:
+            return card
+        generation = _generations[stripe]
+
+    card = encode(build(restaurant_id))
+    with _locks[stripe]:
+        if generation == _generations[stripe]:
+            cards[restaurant_id] = card
+    return card
+
+
+def with_fields(card, fields):
+    """A card with per-request fields (distance, score) appended"""
+    return card[:-1] + b',' + encode(fields)[1:]
+
+
+def response_body(cards_list):
+    """The search response JSON for a list of cards"""
+    return b'{"count":%d,"restaurants":[%b]}' % (len(cards_list), b','.join(cards_list))
+
+
+def invalidate(restaurant_id):
+    """Drop a restaurant's card after it, its dishes or its ratings changed"""
+    stripe = restaurant_id % STRIPES
+    with _locks[stripe]:
+        cards.pop(restaurant_id, None)
+        _generations[stripe] += 1
+
+
+def reset():
+    with ExitStack() as stack:
+        for lock in _locks:
+            stack.enter_context(lock)
+        cards.clear()
+        _generations[:] = [generation + 1 for generation in _generations]
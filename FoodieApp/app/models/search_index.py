@@ -0,0 +1,188 @@
+"""
+Search Index Module - Secondary indexes kept in sync with the data store
+
+Every write made through data_store updates these indexes, so search only
+visits candidate restaurants instead of scanning every restaurant, dish and
+rating on each request.
+
+Writers serialize on a single lock. Readers take no lock: they only use
+C-level set copies and intersections, which are atomic under the GIL.
+"""
+
+import threading
+
+NGRAM_SIZE = 3
+TEXT_FIELDS = ('name', 'location', 'category')
+
+# restaurant_id -> set of dish ids
+restaurant_dishes = {}
+
+# restaurant_id -> list of rating ids, in the order they were given
+restaurant_ratings = {}
+
+# field -> n-gram -> set of restaurant ids
+ngram_index = {field: {} for field in TEXT_FIELDS}
+
+# restaurant_id -> {field: lowercased text} as currently indexed
+indexed_text = {}
+
+# Guards every index mutation
+_lock = threading.Lock()
+
+# Flag indexes
+all_restaurant_ids = set()
+enabled_restaurant_ids = set()
+approved_restaurant_ids = set()
+
+
+def _ngrams(text):
+    """Split lowercased text into its distinct n-grams"""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def _remove_text(restaurant_id):
+    """Drop a restaurant from the n-gram postings"""
+    old_text = indexed_text.pop(restaurant_id, None)
+    if not old_text:
+        return
+    for field, text in old_text.items():
+        postings = ngram_index[field]
+        for gram in _ngrams(text):
+            ids = postings.get(gram)
+            if ids is not None:
+                ids.discard(restaurant_id)
+                if not ids:
+                    del postings[gram]
+
+
+def index_restaurant(restaurant):
+    """Add or refresh a restaurant in the text and flag indexes"""
+    restaurant_id = restaurant.id
+    text = {field: str(getattr(restaurant, field)).lower() for field in TEXT_FIELDS}
+
+    with _lock:
+        _remove_text(restaurant_id)
+        for field, value in text.items():
+            postings = ngram_index[field]
+            for gram in _ngrams(value):
+                postings.setdefault(gram, set()).add(restaurant_id)
+        indexed_text[restaurant_id] = text
+
+        all_restaurant_ids.add(restaurant_id)
+        if restaurant.enabled:
+            enabled_restaurant_ids.add(restaurant_id)
+        else:
+            enabled_restaurant_ids.discard(restaurant_id)
+        if restaurant.approved:
+            approved_restaurant_ids.add(restaurant_id)
+        else:
+            approved_restaurant_ids.discard(restaurant_id)
+
+
+def unindex_restaurant(restaurant_id):
+    """Remove a restaurant from the text and flag indexes and drop its dish and rating links"""
+    with _lock:
+        _remove_text(restaurant_id)
+        restaurant_dishes.pop(restaurant_id, None)
+        restaurant_ratings.pop(restaurant_id, None)
+        all_restaurant_ids.discard(restaurant_id)
+        enabled_restaurant_ids.discard(restaurant_id)
+        approved_restaurant_ids.discard(restaurant_id)
+
+
+def index_dish(dish):
+    """Link a dish to its restaurant"""
+    with _lock:
+        restaurant_dishes.setdefault(dish.restaurant_id, set()).add(dish.id)
+
+
+def unindex_dish(dish):
+    """Unlink a dish from its restaurant"""
+    with _lock:
+        dish_ids = restaurant_dishes.get(dish.restaurant_id)
+        if dish_ids is not None:
+            dish_ids.discard(dish.id)
+            if not dish_ids:
+                del restaurant_dishes[dish.restaurant_id]
+
+
+def index_rating(rating_id, restaurant_id):
+    """Link a rating to the restaurant its order was placed with"""
+    with _lock:
+        restaurant_ratings.setdefault(restaurant_id, []).append(rating_id)
+
+
+def get_dish_ids(restaurant_id):
+    """Dish ids for a restaurant, in id order"""
+    return sorted(restaurant_dishes.get(restaurant_id, ()))
+
+
+def get_rating_ids(restaurant_id):
+    """Rating ids for a restaurant, oldest first"""
+    return restaurant_ratings.get(restaurant_id, [])
+
+
+def _text_candidates(field, query):
+    """Restaurants whose field may contain query, or None if the query is too short to use the index"""
+    if len(query) < NGRAM_SIZE:
+        return None
+    postings = ngram_index[field]
+    grams = sorted((postings.get(gram, set()) for gram in _ngrams(query)), key=len)
+    if not grams[0]:
+        return set()
+    candidates = set(grams[0])
+    for ids in grams[1:]:
+        candidates &= ids
+        if not candidates:
+            break
+    return candidates
+
+
+def search(name='', location='', category='', enabled_only=False, approved_only=False, within=None):
+    """Return ids of restaurants matching every given substring query, in id order
+
+    Queries must already be lowercased. The n-gram postings narrow the
+    candidate set and each candidate is then checked against its indexed
+    text, so the result is exactly what a full substring scan would return.
+    within optionally restricts the result to a precomputed set of ids.
+    """
+    queries = {field: query for field, query in
+               (('name', name), ('location', location), ('category', category)) if query}
+
+    candidate_sets = []
+    if within is not None:
+        candidate_sets.append(within & all_restaurant_ids)
+    if enabled_only:
+        candidate_sets.append(enabled_restaurant_ids)
+    if approved_only:
+        candidate_sets.append(approved_restaurant_ids)
+    for field, query in queries.items():
+        ids = _text_candidates(field, query)
+        if ids is not None:
+            candidate_sets.append(ids)
+
+    if not candidate_sets:
+        candidates = set(all_restaurant_ids)
+    else:
+        candidate_sets.sort(key=len)
+        candidates = set(candidate_sets[0])
+        for ids in candidate_sets[1:]:
+            candidates &= ids
+
+    return sorted(
+        restaurant_id for restaurant_id in candidates
+        if all(query in indexed_text[restaurant_id][field] for field, query in queries.items())
+    )
+
+
+def reset():
+    """Clear every index - called from data_store.reset_data"""
+    with _lock:
+        restaurant_dishes.clear()
+        restaurant_ratings.clear()
+        for postings in ngram_index.values():
+            postings.clear()
+        indexed_text.clear()
+        all_restaurant_ids.clear()
+        enabled_restaurant_ids.clear()
+        approved_restaurant_ids.clear()
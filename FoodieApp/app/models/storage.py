@@ -0,0 +1,941 @@
+"""
+Storage Module - Pluggable storage backends for the data store
+
+data_store keeps its tables in whichever backend is configured. The
+in-memory backend (plain dicts) is the default and what the tests use;
+the SQLite backend lets several worker processes share one store, e.g.
+
+    FOODIE_DB_PATH=foodie.db gunicorn -w 4 run:app
+
+the sharded backend partitions the in-memory tables by record id so
+writes to different records take different locks:
+
+    FOODIE_SHARDS=16 python run.py
+
+and the durable memory backend keeps the dicts but logs every change to
+a write-ahead log with periodic snapshots, recovering them on restart:
+
+    FOODIE_DATA_DIR=data python run.py
+"""
+
+import heapq
+import json
+import os
+import secrets
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+from app.models import wal
+from app.models.concurrency import AtomicCounter
+from app.models.records import TABLE_TYPES, Feedback, from_dict, to_dict
+
+TABLES = ('restaurants', 'dishes', 'users', 'orders', 'ratings')
+
+# Tables the sharded backend partitions by record id - users stay in one table
+SHARDED_TABLES = ('restaurants', 'dishes', 'orders', 'ratings')
+DEFAULT_SHARDS = 16
+
+# Seconds between snapshots of the durable memory backend
+DEFAULT_SNAPSHOT_SECONDS = 300
+
+# Most ids bound into one SQLite IN (...) query
+SQLITE_BATCH_IDS = 500
+
+# Rows kept in the SQLite change log - a worker further behind rebuilds its indexes
+CHANGE_LOG_ROWS = 100000
+
+# Commits between trims of the change log
+CHANGE_LOG_TRIM_EVERY = 1000
+
+# More changes than this since a worker last looked and it rebuilds instead of applying them
+MAX_SYNC_CHANGES = 10000
+
+# Foreign key columns pulled out of each record so they can be indexed
+INDEXED_COLUMNS = {
+    'restaurants': (),
+    'dishes': ('restaurant_id',),
+    'users': (),
+    'orders': ('restaurant_id', 'user_id'),
+    'ratings': ('order_id',),
+    'feedback': ('rating_id', 'restaurant_id', 'user_id'),
+}
+
+# Text column of each table that must be unique across every worker
+UNIQUE_COLUMNS = {
+    'restaurants': 'name',
+    'users': 'email',
+}
+
+
+class DuplicateKey(Exception):
+    """A write would give a second record the same unique name or email"""
+
+    def __init__(self, name):
+        column = UNIQUE_COLUMNS[name]
+        super().__init__(f"{TABLE_TYPES[name].__name__} with this {column} already exists")
+        self.table = name
+        self.column = column
+
+
+class StorageBackend:
+    """Interface every storage backend implements"""
+
+    def table(self, name):
+        """Mutable mapping of id -> record for one of TABLES"""
+        raise NotImplementedError
+
+    def feedback_log(self):
+        """Sequence of feedback entries with append(entry), page(after_id, limit) by rating_id
+        and purge(rating_ids)"""
+        raise NotImplementedError
+
+    def trash(self):
+        """Soft-deleted restaurants awaiting compaction, by restaurant id, with put(restaurant_id,
+        deleted), take(restaurant_id), take_all(), release_ratings(rating_ids), hidden(rating_ids)
+        and counts()"""
+        raise NotImplementedError
+
+    def next_id(self, name):
+        """Allocate the next id for a table"""
+        raise NotImplementedError
+
+    def get_many(self, name, ids):
+        """Records of a table for ids, in the order given, skipping missing ones"""
+        table = self.table(name)
+        return [record for record in map(table.get, ids) if record is not None]
+
+    def ids(self, name):
+        """Ids of a table's records as of one moment - safe to walk while other requests write"""
+        return list(self.table(name))
+
+    def shard_stats(self):
+        """Per-shard record and write counts - empty for unsharded backends"""
+        return []
+
+    def flush(self):
+        """Make pending writes durable and visible to other workers"""
+
+    @contextmanager
+    def transaction(self):
+        """Group many writes so they become visible together"""
+        yield
+
+    def external_changes(self):
+        """Changes other processes committed since we last looked, oldest first
+
+        A list of (table, id, operation, record) with operation 's' for an
+        insert or update and 'd' for a delete (record is the deleted
+        record, None for 's'), or None when too much changed to replay and
+        the caller should rebuild from scratch.
+        """
+        return []
+
+    def clear(self):
+        """Drop every record and restart id counters at 1"""
+        raise NotImplementedError
+
+
+class MemoryFeedbackLog(list):
+    """Feedback entries kept in rating_id order"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def append(self, entry):
+        with self._lock:
+            position = bisect_right(self, entry.rating_id, key=lambda e: e.rating_id)
+            self.insert(position, entry)
+
+    def page(self, after_id, limit):
+        start = bisect_right(self, after_id, key=lambda e: e.rating_id)
+        return self[start:start + limit]
+
+    def purge(self, rating_ids):
+        """Drop the entries of the given ratings
+
+        Each is found by binary search, so the other entries are never
+        looked at - only copied past in one slice each when any match.
+        """
+        with self._lock:
+            spans = []
+            for rating_id in sorted(rating_ids):
+                start = bisect_left(self, rating_id, key=lambda e: e.rating_id)
+                end = bisect_right(self, rating_id, lo=start, key=lambda e: e.rating_id)
+                if start < end:
+                    spans.append((start, end))
+            if not spans:
+                return
+            kept = []
+            position = 0
+            for start, end in spans:
+                kept.extend(self[position:start])
+                position = end
+            kept.extend(self[position:])
+            self[:] = kept
+
+
+class MemoryTrash:
+    """Soft-deleted restaurants kept in this process
+
+    Each entry is {"restaurant", "dishes", "orders", "ratings"} - the
+    restaurant and the rows deleted with it. Its ratings' feedback stays
+    hidden from put() until release_ratings(), so taking an entry to
+    restore or purge it never shows that feedback early.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._rating_ids = set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, restaurant_id):
+        return restaurant_id in self._entries
+
+    def put(self, restaurant_id, deleted):
+        with self._lock:
+            self._entries[restaurant_id] = deleted
+            self._rating_ids.update(rating.id for rating in deleted['ratings'])
+
+    def take(self, restaurant_id):
+        """Remove and return one restaurant's entry, or None if another caller took it first"""
+        with self._lock:
+            return self._entries.pop(restaurant_id, None)
+
+    def take_all(self):
+        with self._lock:
+            taken = list(self._entries.values())
+            self._entries.clear()
+            return taken
+
+    def release_ratings(self, rating_ids):
+        with self._lock:
+            self._rating_ids.difference_update(rating_ids)
+
+    def hidden(self, rating_ids):
+        """Those of rating_ids whose feedback is hidden"""
+        return {rating_id for rating_id in rating_ids if rating_id in self._rating_ids}
+
+    def counts(self):
+        with self._lock:
+            return {"restaurants": len(self._entries), "ratings": len(self._rating_ids)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rating_ids.clear()
+
+
+class MemoryBackend(StorageBackend):
+    """Plain dicts in this process - fast, but lost on restart"""
+
+    def __init__(self):
+        self._tables = {name: {} for name in TABLES}
+        self._feedback = MemoryFeedbackLog()
+        self._trash = MemoryTrash()
+        self._counters = {name: AtomicCounter() for name in TABLES}
+
+    def table(self, name):
+        return self._tables[name]
+
+    def feedback_log(self):
+        return self._feedback
+
+    def trash(self):
+        return self._trash
+
+    def next_id(self, name):
+        return self._counters[name].next()
+
+    def ids(self, name):
+        # dict.copy() copies under the dict's own lock in one step, so a
+        # concurrent insert can neither be half seen nor break the walk
+        return list(dict.copy(self._tables[name]))
+
+    def clear(self):
+        for records in self._tables.values():
+            records.clear()
+        self._feedback.clear()
+        self._trash.clear()
+        for counter in self._counters.values():
+            counter.reset()
+
+
+class LoggedTable(dict):
+    """dict that logs every change to its backend's write-ahead log once applied
+
+    A change and its log append happen under one lock, so two writes to
+    the same key reach the log in the order they reached the dict and a
+    replay rebuilds exactly the live state.
+    """
+
+    __slots__ = ('_backend', '_name', '_lock')
+
+    def __init__(self, backend, name):
+        super().__init__()
+        self._backend = backend
+        self._name = name
+        self._lock = threading.Lock()
+
+    def __setitem__(self, key, record):
+        # Encoded outside the lock - only the change and the append are ordered
+        entry = ('s', self._name, key, to_dict(record))
+        with self._lock:
+            dict.__setitem__(self, key, record)
+            self._backend.log_set(self._name, key, entry)
+
+    def __delitem__(self, key):
+        with self._lock:
+            dict.__delitem__(self, key)
+            self._backend.log(('d', self._name, key))
+
+    def pop(self, key, *default):
+        with self._lock:
+            if key not in self:
+                return dict.pop(self, key, *default)
+            record = dict.pop(self, key)
+            self._backend.log(('d', self._name, key))
+            return record
+
+
+class LoggedFeedbackLog(MemoryFeedbackLog):
+    """Feedback entries whose appends and purges are logged"""
+
+    def __init__(self, backend):
+        super().__init__()
+        self._backend = backend
+        # Orders each change with its log append, as in LoggedTable
+        self._log_lock = threading.Lock()
+
+    def append(self, entry):
+        logged = ('f', to_dict(entry))
+        with self._log_lock:
+            super().append(entry)
+            self._backend.log(logged)
+
+    def purge(self, rating_ids):
+        logged = ('p', sorted(rating_ids))
+        with self._log_lock:
+            super().purge(rating_ids)
+            self._backend.log(logged)
+
+    def has_rating(self, rating_id):
+        position = bisect_right(self, rating_id, key=lambda e: e.rating_id)
+        return position > 0 and self[position - 1].rating_id == rating_id
+
+
+class DurableMemoryBackend(MemoryBackend):
+    """Plain dicts in this process, made durable by a write-ahead log and snapshots
+
+    Every table change is applied to the dict, then appended to the log
+    (app/models/wal.py); flush() - run at the end of each request - waits
+    for the group commit that puts the request's changes on disk. Every
+    snapshot_seconds the tables are pickled and the log segments before
+    the snapshot deleted. On startup the snapshot is loaded and the log
+    written since replayed. clear() truncates both.
+    """
+
+    def __init__(self, directory, sync='group', snapshot_seconds=DEFAULT_SNAPSHOT_SECONDS):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._tables = {name: LoggedTable(self, name) for name in TABLES}
+        self._feedback = LoggedFeedbackLog(self)
+        self._max_ids = {name: 0 for name in TABLES}
+        self._local = threading.local()
+        self._snapshot_lock = threading.Lock()
+        self.wal = None
+        self.recover()
+        self.wal = wal.WriteAheadLog(directory, sync)
+
+        self._stop = threading.Event()
+        self._snapshotter = None
+        if snapshot_seconds > 0:
+            self._snapshotter = threading.Thread(target=self._snapshot_loop, args=(snapshot_seconds,),
+                                                 name='foodie-snapshot', daemon=True)
+            self._snapshotter.start()
+
+    def log(self, entry):
+        if self.wal is not None:
+            self._local.seq = self.wal.append(entry)
+
+    def log_set(self, name, key, entry):
+        """Log an ('s', name, key, data) entry, remembering the highest id each table has used"""
+        if key > self._max_ids[name]:
+            self._max_ids[name] = key
+        self.log(entry)
+
+    def _apply(self, entry):
+        """Replay one log entry onto the tables without logging it again"""
+        operation = entry[0]
+        if operation == 's':
+            _, name, key, data = entry
+            dict.__setitem__(self._tables[name], key, from_dict(TABLE_TYPES[name], data))
+            if key > self._max_ids[name]:
+                self._max_ids[name] = key
+        elif operation == 'd':
+            dict.pop(self._tables[entry[1]], entry[2], None)
+        elif operation == 'f':
+            feedback = from_dict(Feedback, entry[1])
+            # A snapshot may already hold entries appended while it was being taken
+            if not self._feedback.has_rating(feedback.rating_id):
+                MemoryFeedbackLog.append(self._feedback, feedback)
+        elif operation == 'p':
+            MemoryFeedbackLog.purge(self._feedback, set(entry[1]))
+
+    def recover(self):
+        """Load the last snapshot and replay the log written after it - returns the entries replayed"""
+        state = wal.read_snapshot(self.directory)
+        from_segment = 1
+        if state is not None:
+            for name, records in state['tables'].items():
+                dict.update(self._tables[name], records)
+            list.extend(self._feedback, state['feedback'])
+            self._max_ids.update(state['max_ids'])
+            from_segment = state['segment']
+        replayed = 0
+        for entry in wal.replay(self.directory, from_segment):
+            self._apply(entry)
+            replayed += 1
+        # Restaurants still soft-deleted at shutdown are gone from the
+        # tables; their feedback goes too, as compaction would have done
+        orphaned = {entry.rating_id for entry in self._feedback if entry.rating_id not in self._tables['ratings']}
+        if orphaned:
+            MemoryFeedbackLog.purge(self._feedback, orphaned)
+        for name, counter in self._counters.items():
+            # max_ids also remembers deleted ids, so they are never handed out again
+            self._max_ids[name] = max(self._max_ids[name], max(self._tables[name], default=0))
+            counter.reset(self._max_ids[name] + 1)
+        return replayed
+
+    def snapshot(self):
+        """Pickle every table to disk and drop the log segments it covers"""
+        with self._snapshot_lock:
+            # Changes made from here on go to the new segment - replaying
+            # one the copy below already holds is harmless
+            segment = self.wal.rotate()
+            state = {
+                "segment": segment,
+                "tables": {name: dict(records) for name, records in self._tables.items()},
+                "feedback": list(self._feedback),
+                "max_ids": dict(self._max_ids)
+            }
+            wal.write_snapshot(self.directory, state)
+            self.wal.remove_segments_before(segment)
+
+    def _snapshot_loop(self, interval):
+        while not self._stop.wait(interval):
+            if self.wal.appended_since_snapshot:
+                self.snapshot()
+
+    def flush(self):
+        self.wal.wait(getattr(self._local, 'seq', 0))
+
+    def clear(self):
+        with self._snapshot_lock:
+            super().clear()
+            self._max_ids = {name: 0 for name in TABLES}
+            self.wal.truncate()
+
+    def close(self):
+        """Stop snapshotting and write out the log"""
+        self._stop.set()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        self.wal.close()
+
+
+class Shard:
+    """One partition of the sharded backend - its records, write lock and counters"""
+
+    def __init__(self):
+        self.tables = {name: {} for name in SHARDED_TABLES}
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.deletes = 0
+
+
+class ShardedTable(MutableMapping):
+    """Dict-like view over one table spread across the shards
+
+    Each record is stored in the shard its id hashes to, under that
+    shard's lock. The shard is computed from the key, so nothing is
+    shared between shards: reads by id go straight to one shard's dict
+    without a lock, and iteration gathers every shard and merges them in
+    id order.
+    """
+
+    def __init__(self, backend, name):
+        self._backend = backend
+        self._name = name
+
+    def shard_index(self, key):
+        """Index of the shard a record id belongs in"""
+        return self._backend.shard_of(key)
+
+    def _records(self, key):
+        return self._backend.shards[self._backend.shard_of(key)].tables[self._name]
+
+    def __getitem__(self, key):
+        return self._records(key)[key]
+
+    def __setitem__(self, key, record):
+        shard = self._backend.shards[self._backend.shard_of(key)]
+        with shard.lock:
+            shard.tables[self._name][key] = record
+            shard.writes += 1
+
+    def __delitem__(self, key):
+        shard = self._backend.shards[self._backend.shard_of(key)]
+        with shard.lock:
+            del shard.tables[self._name][key]
+            shard.deletes += 1
+
+    def __contains__(self, key):
+        return key in self._records(key)
+
+    def __iter__(self):
+        return (key for key, _ in self.items())
+
+    def __len__(self):
+        return sum(len(shard.tables[self._name]) for shard in self._backend.shards)
+
+    def items(self):
+        """(id, record) pairs gathered from every shard, in id order"""
+        parts = self._backend.scatter_gather(lambda shard: sorted(shard.tables[self._name].items()))
+        return list(heapq.merge(*parts))
+
+    def values(self):
+        return [record for _, record in self.items()]
+
+    def clear(self):
+        for shard in self._backend.shards:
+            with shard.lock:
+                shard.tables[self._name].clear()
+
+
+class ShardedMemoryBackend(MemoryBackend):
+    """In-memory tables partitioned by record id across shard_count shards
+
+    A restaurant, dish, order or rating lives in shard hash(id) %
+    shard_count, each shard with its own lock and write counters, so
+    consecutive ids land in different shards and writes to them never
+    wait on one another. Ids still come from one lock-free counter per
+    table, as they must grow in creation order for after_id cursors.
+    Users and feedback stay unsharded. Reads spanning shards go through
+    scatter_gather(), which asks every shard and returns their answers
+    for the caller to merge.
+    """
+
+    def __init__(self, shard_count=DEFAULT_SHARDS):
+        super().__init__()
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        self.shards = [Shard() for _ in range(shard_count)]
+        for name in SHARDED_TABLES:
+            self._tables[name] = ShardedTable(self, name)
+
+    def shard_of(self, key):
+        return hash(key) % len(self.shards)
+
+    def scatter_gather(self, func):
+        """func(shard) for every shard, in shard order"""
+        return [func(shard) for shard in self.shards]
+
+    def ids(self, name):
+        """Each shard's ids copied under its lock, merged in id order"""
+        if name not in SHARDED_TABLES:
+            return super().ids(name)
+
+        def shard_ids(shard):
+            with shard.lock:
+                return sorted(shard.tables[name])
+        return list(heapq.merge(*self.scatter_gather(shard_ids)))
+
+    def get_many(self, name, ids):
+        """Group ids by shard, read each shard's records at once and restore the order given"""
+        if name not in SHARDED_TABLES:
+            return super().get_many(name, ids)
+        by_shard = {}
+        for record_id in ids:
+            by_shard.setdefault(self.shard_of(record_id), []).append(record_id)
+        found = {}
+        for index, shard_ids in by_shard.items():
+            records = self.shards[index].tables[name]
+            for record_id in shard_ids:
+                record = records.get(record_id)
+                if record is not None:
+                    found[record_id] = record
+        return [found[record_id] for record_id in ids if record_id in found]
+
+    def shard_stats(self):
+        return [{
+            "shard": index,
+            "records": sum(len(records) for records in shard.tables.values()),
+            "writes": shard.writes,
+            "deletes": shard.deletes
+        } for index, shard in enumerate(self.shards)]
+
+
+class SQLiteTable(MutableMapping):
+    """Dict-like view over one SQLite table of JSON records
+
+    Records are rebuilt from their JSON on every read, so callers must
+    write a record back (data_store.save_*) after changing it.
+    """
+
+    def __init__(self, backend, name):
+        self._backend = backend
+        self._name = name
+        self._type = TABLE_TYPES[name]
+        columns = INDEXED_COLUMNS[name] + ((UNIQUE_COLUMNS[name],) if name in UNIQUE_COLUMNS else ())
+        placeholders = ', '.join('?' * (len(columns) + 2))
+        self._columns = columns
+        self._select = f"SELECT data FROM {name} WHERE id = ?"
+        self._exists = f"SELECT 1 FROM {name} WHERE id = ?"
+        # Not INSERT OR REPLACE, which would silently delete a record holding the same unique key
+        self._upsert = (f"INSERT INTO {name} (id, {''.join(c + ', ' for c in columns)}data) VALUES ({placeholders}) "
+                        f"ON CONFLICT (id) DO UPDATE SET {''.join(f'{c} = excluded.{c}, ' for c in columns)}"
+                        f"data = excluded.data")
+        self._delete = f"DELETE FROM {name} WHERE id = ? RETURNING data"
+        self._keys = f"SELECT id FROM {name} ORDER BY id"
+        self._values = f"SELECT data FROM {name} ORDER BY id"
+        self._items = f"SELECT id, data FROM {name} ORDER BY id"
+        self._count = f"SELECT COUNT(*) FROM {name}"
+        self._clear = f"DELETE FROM {name}"
+
+    def _execute(self, sql, params=()):
+        return self._backend.connection().execute(sql, params)
+
+    def __getitem__(self, key):
+        row = self._execute(self._select, (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return from_dict(self._type, json.loads(row[0]))
+
+    def __setitem__(self, key, record):
+        params = (key, *(getattr(record, column) for column in self._columns), json.dumps(to_dict(record)))
+        try:
+            self._execute(self._upsert, params)
+        except sqlite3.IntegrityError as error:
+            raise DuplicateKey(self._name) from error
+        self._backend.log_change(self._name, key, 's')
+        self._backend.wrote()
+
+    def __delitem__(self, key):
+        row = self._execute(self._delete, (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        # Other workers need the deleted record to unindex it
+        self._backend.log_change(self._name, key, 'd', row[0])
+        self._backend.wrote()
+
+    def __contains__(self, key):
+        return self._execute(self._exists, (key,)).fetchone() is not None
+
+    def __iter__(self):
+        return (row[0] for row in self._execute(self._keys).fetchall())
+
+    def __len__(self):
+        return self._execute(self._count).fetchone()[0]
+
+    def values(self):
+        return [from_dict(self._type, json.loads(row[0])) for row in self._execute(self._values).fetchall()]
+
+    def items(self):
+        return [(row[0], from_dict(self._type, json.loads(row[1]))) for row in self._execute(self._items).fetchall()]
+
+    def clear(self):
+        self._execute(self._clear)
+        self._backend.wrote()
+
+
+class SQLiteFeedbackLog:
+    """Append-only feedback entries stored in SQLite"""
+
+    def __init__(self, backend):
+        self._backend = backend
+        columns = INDEXED_COLUMNS['feedback']
+        self._columns = columns
+        self._insert = f"INSERT INTO feedback ({', '.join(columns)}, data) VALUES ({', '.join('?' * (len(columns) + 1))})"
+
+    def append(self, entry):
+        params = (*(getattr(entry, column) for column in self._columns), json.dumps(to_dict(entry)))
+        self._backend.connection().execute(self._insert, params)
+        self._backend.wrote()
+
+    def page(self, after_id, limit):
+        rows = self._backend.connection().execute(
+            "SELECT data FROM feedback WHERE rating_id > ? ORDER BY rating_id LIMIT ?", (after_id, limit)).fetchall()
+        return [from_dict(Feedback, json.loads(row[0])) for row in rows]
+
+    def purge(self, rating_ids):
+        rating_ids = list(rating_ids)
+        for start in range(0, len(rating_ids), SQLITE_BATCH_IDS):
+            batch = rating_ids[start:start + SQLITE_BATCH_IDS]
+            self._backend.connection().execute(
+                f"DELETE FROM feedback WHERE rating_id IN ({', '.join('?' * len(batch))})", batch)
+            self._backend.wrote()
+
+    def __iter__(self):
+        rows = self._backend.connection().execute("SELECT data FROM feedback ORDER BY rating_id").fetchall()
+        return (from_dict(Feedback, json.loads(row[0])) for row in rows)
+
+    def __len__(self):
+        return self._backend.connection().execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+
+    def clear(self):
+        self._backend.connection().execute("DELETE FROM feedback")
+        self._backend.wrote()
+
+
+class SQLiteTrash:
+    """Soft-deleted restaurants stored in SQLite, so any worker can restore or purge them
+
+    An entry is one trash row holding the restaurant and its deleted rows
+    as JSON, plus a trashed_ratings row per rating hiding its feedback.
+    take() deletes the row it returns, so two workers can never both
+    restore or purge the same restaurant.
+    """
+
+    # The rows deleted with a restaurant, keyed by their table
+    PARTS = ('dishes', 'orders', 'ratings')
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def _execute(self, sql, params=()):
+        return self._backend.connection().execute(sql, params)
+
+    def _decode(self, data):
+        entry = json.loads(data)
+        deleted = {"restaurant": from_dict(TABLE_TYPES['restaurants'], entry['restaurant'])}
+        for name in self.PARTS:
+            deleted[name] = [from_dict(TABLE_TYPES[name], record) for record in entry[name]]
+        return deleted
+
+    def __contains__(self, restaurant_id):
+        return self._execute("SELECT 1 FROM trash WHERE restaurant_id = ?", (restaurant_id,)).fetchone() is not None
+
+    def put(self, restaurant_id, deleted):
+        entry = {"restaurant": to_dict(deleted['restaurant'])}
+        for name in self.PARTS:
+            entry[name] = [to_dict(record) for record in deleted[name]]
+        self._execute("INSERT OR REPLACE INTO trash (restaurant_id, data) VALUES (?, ?)",
+                      (restaurant_id, json.dumps(entry)))
+        self._backend.connection().executemany(
+            "INSERT OR IGNORE INTO trashed_ratings (rating_id, restaurant_id) VALUES (?, ?)",
+            [(rating.id, restaurant_id) for rating in deleted['ratings']])
+        self._backend.wrote()
+
+    def take(self, restaurant_id):
+        row = self._execute("DELETE FROM trash WHERE restaurant_id = ? RETURNING data", (restaurant_id,)).fetchone()
+        self._backend.wrote()
+        return self._decode(row[0]) if row is not None else None
+
+    def take_all(self):
+        rows = self._execute("DELETE FROM trash RETURNING data").fetchall()
+        self._backend.wrote()
+        return [self._decode(data) for data, in rows]
+
+    def release_ratings(self, rating_ids):
+        rating_ids = list(rating_ids)
+        for start in range(0, len(rating_ids), SQLITE_BATCH_IDS):
+            batch = rating_ids[start:start + SQLITE_BATCH_IDS]
+            self._execute(f"DELETE FROM trashed_ratings WHERE rating_id IN ({', '.join('?' * len(batch))})", batch)
+            self._backend.wrote()
+
+    def hidden(self, rating_ids):
+        rating_ids = list(rating_ids)
+        found = set()
+        for start in range(0, len(rating_ids), SQLITE_BATCH_IDS):
+            batch = rating_ids[start:start + SQLITE_BATCH_IDS]
+            rows = self._execute(
+                f"SELECT rating_id FROM trashed_ratings WHERE rating_id IN ({', '.join('?' * len(batch))})", batch)
+            found.update(rating_id for rating_id, in rows.fetchall())
+        return found
+
+    def counts(self):
+        restaurants, ratings = self._execute(
+            "SELECT (SELECT COUNT(*) FROM trash), (SELECT COUNT(*) FROM trashed_ratings)").fetchone()
+        return {"restaurants": restaurants, "ratings": ratings}
+
+    def clear(self):
+        self._execute("DELETE FROM trash")
+        self._execute("DELETE FROM trashed_ratings")
+        self._backend.wrote()
+
+
+class SQLiteBackend(StorageBackend):
+    """Embedded SQLite store shared by every worker process
+
+    The database runs in WAL mode so readers never block the writer. Each
+    thread gets its own connection; writes accumulate in one transaction
+    until batch_size statements have run or flush() is called (data_store
+    flushes at the end of every request). Restaurant names and user
+    emails have UNIQUE indexes, so two workers can never both create the
+    same one - the second write raises DuplicateKey.
+
+    Every table write also appends a row to a change log, tagged with the
+    backend's origin, so each worker can replay the other workers' changes
+    onto its in-memory indexes (external_changes()) rather than rebuilding
+    them all. The log keeps the last CHANGE_LOG_ROWS changes.
+    """
+
+    def __init__(self, path, batch_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        # Tags this backend's own changes, which it never needs to replay
+        self.origin = secrets.token_hex(8)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._commits = 0
+        self._create_schema()
+        self._seen_seq = self._last_seq()
+        self._tables = {name: SQLiteTable(self, name) for name in TABLES}
+        self._feedback = SQLiteFeedbackLog(self)
+        self._trash = SQLiteTrash(self)
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pending = 0
+        return conn
+
+    def _create_schema(self):
+        conn = self.connection()
+        for name in TABLES:
+            columns = ''.join(f"{column} INTEGER, " for column in INDEXED_COLUMNS[name])
+            if name in UNIQUE_COLUMNS:
+                columns += f"{UNIQUE_COLUMNS[name]} TEXT, "
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {name} (id INTEGER PRIMARY KEY, {columns}data TEXT NOT NULL)")
+        for name, column in UNIQUE_COLUMNS.items():
+            # Databases created before the unique columns existed get them filled in from the records
+            if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({name})")}:
+                conn.execute(f"ALTER TABLE {name} ADD COLUMN {column} TEXT")
+                conn.execute(f"UPDATE {name} SET {column} = json_extract(data, '$.{column}')")
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS uniq_{name}_{column} ON {name} ({column})")
+        conn.execute("CREATE TABLE IF NOT EXISTS feedback (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "rating_id INTEGER, restaurant_id INTEGER, user_id INTEGER, data TEXT NOT NULL)")
+        for name, columns in INDEXED_COLUMNS.items():
+            for column in columns:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_{column} ON {name} ({column})")
+        # Soft-deleted restaurants, shared by every worker until compaction purges them
+        conn.execute("CREATE TABLE IF NOT EXISTS trash (restaurant_id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS trashed_ratings (rating_id INTEGER PRIMARY KEY, "
+                     "restaurant_id INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.executemany("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 1)", [(name,) for name in TABLES])
+        # op is 's' (insert or update), 'd' (delete, with the deleted record) or 'c' (every table cleared)
+        conn.execute("CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "origin TEXT NOT NULL, tbl TEXT NOT NULL, id INTEGER, op TEXT NOT NULL, data TEXT)")
+        conn.commit()
+
+    def _last_seq(self):
+        return self.connection().execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def table(self, name):
+        return self._tables[name]
+
+    def feedback_log(self):
+        return self._feedback
+
+    def trash(self):
+        return self._trash
+
+    def get_many(self, name, ids):
+        """One IN (...) query per SQLITE_BATCH_IDS ids instead of a query per record"""
+        record_type = TABLE_TYPES[name]
+        found = {}
+        for start in range(0, len(ids), SQLITE_BATCH_IDS):
+            batch = ids[start:start + SQLITE_BATCH_IDS]
+            rows = self.connection().execute(
+                f"SELECT id, data FROM {name} WHERE id IN ({', '.join('?' * len(batch))})", batch).fetchall()
+            for record_id, data in rows:
+                found[record_id] = from_dict(record_type, json.loads(data))
+        return [found[record_id] for record_id in ids if record_id in found]
+
+    def next_id(self, name):
+        conn = self.connection()
+        conn.execute("UPDATE counters SET value = value + 1 WHERE name = ?", (name,))
+        current = conn.execute("SELECT value - 1 FROM counters WHERE name = ?", (name,)).fetchone()[0]
+        self.wrote()
+        return current
+
+    def log_change(self, name, key, op, data=None):
+        """Append a change to the log, in the same transaction as the write itself"""
+        self.connection().execute("INSERT INTO changes (origin, tbl, id, op, data) VALUES (?, ?, ?, ?, ?)",
+                                  (self.origin, name, key, op, data))
+
+    def wrote(self):
+        """Count a write statement and commit once the batch is full"""
+        self._local.pending += 1
+        if self._local.pending >= self.batch_size and not getattr(self._local, 'in_transaction', False):
+            self.flush()
+
+    def flush(self):
+        conn = self.connection()
+        if not conn.in_transaction:
+            return
+        conn.commit()
+        self._local.pending = 0
+        with self._lock:
+            self._commits += 1
+            trim = self._commits % CHANGE_LOG_TRIM_EVERY == 0
+        if trim:
+            conn.execute("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?", (CHANGE_LOG_ROWS,))
+            conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """Hold every write in one SQLite transaction - committed on success, rolled back on error"""
+        self.connection()
+        self._local.in_transaction = True
+        try:
+            yield
+        except Exception:
+            self.connection().rollback()
+            self._local.pending = 0
+            raise
+        finally:
+            self._local.in_transaction = False
+        self.flush()
+
+    def external_changes(self):
+        """Other workers' changes since the last call - one indexed range query when there are none
+
+        Seqs are handed out under SQLite's single write lock, so changes
+        commit in seq order and a gap means the log was trimmed past us.
+        """
+        with self._lock:
+            rows = self.connection().execute(
+                "SELECT seq, origin, tbl, id, op, data FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (self._seen_seq, MAX_SYNC_CHANGES + 1)).fetchall()
+            if not rows:
+                return []
+            trimmed = rows[0][0] != self._seen_seq + 1
+            self._seen_seq = rows[-1][0]
+            if len(rows) > MAX_SYNC_CHANGES:
+                self._seen_seq = self._last_seq()
+                return None
+            if trimmed or any(op == 'c' and origin != self.origin for _, origin, _, _, op, _ in rows):
+                return None
+        return [(name, key, op, from_dict(TABLE_TYPES[name], json.loads(data)) if data is not None else None)
+                for _, origin, name, key, op, data in rows if origin != self.origin]
+
+    def clear(self):
+        conn = self.connection()
+        for name in TABLES:
+            self._tables[name].clear()
+        self._feedback.clear()
+        self._trash.clear()
+        conn.execute("UPDATE counters SET value = 1")
+        self.log_change('*', None, 'c')
+        self.flush()
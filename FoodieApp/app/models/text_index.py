@@ -0,0 +1,358 @@
+"""
+Text Index Module - Ranked, typo-tolerant full-text search over restaurants
+
+Every restaurant is one document made of its name, location and category
+plus the names of its dishes. An inverted index maps each term to the
+restaurants containing it, with a weighted term frequency (name terms
+count more than dish names). Queries are scored with BM25 over the
+restaurants containing every query term (relaxed when too few do) and
+the best ones picked with a bounded heap, so nothing is fully sorted.
+Per-term BM25 impacts are cached until the term's postings change.
+
+Query terms missing from the vocabulary are matched fuzzily: every term
+is also indexed by its character trigrams, and the known terms sharing
+enough trigrams with the typo ("biryni" -> "biryani") stand in for it,
+weighted by their similarity.
+
+Like search_index, writers serialize on a lock; readers only take it to
+look up cached impacts.
+"""
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from functools import partial, reduce
+from itertools import compress, repeat
+from operator import add, le, mul, neg
+
+FIELD_WEIGHTS = {'name': 3.0, 'location': 1.5, 'category': 1.5}
+DISH_WEIGHT = 1.0
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+FUZZY_MIN_SIMILARITY = 0.5
+MAX_EXPANSIONS = 3
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Cached impacts are recomputed once the average document length drifts by this factor
+RESCORE_DRIFT = 1.1
+
+_TOKEN = re.compile(r'\w+')
+
+# term -> {restaurant_id: weighted term frequency}
+postings = {}
+
+# restaurant_id -> weighted document length
+doc_lengths = {}
+
+# trigram -> set of terms in the vocabulary
+term_trigrams = {}
+
+_term_gram_counts = {}
+_restaurant_terms = {}
+_dish_terms = {}
+_restaurant_dishes = {}
+_doc_terms = {}
+_total_length = 0.0
+
+# term -> [average length, {restaurant_id: impact}, ranked impacts], built on first use
+_impact_cache = {}
+
+# Bumped by every write, so impacts built from data that changed while
+# it was being built is never cached
+_generation = 0
+
+# Guards every index mutation
+_lock = threading.Lock()
+
+
+def tokenize(text):
+    """Lowercased word tokens of text"""
+    return _TOKEN.findall(str(text).lower())
+
+
+def _weighted_terms(text, weight):
+    terms = Counter()
+    for token in tokenize(text):
+        terms[token] += weight
+    return terms
+
+
+def _trigrams(term):
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _add_term(term):
+    grams = _trigrams(term)
+    _term_gram_counts[term] = len(grams)
+    for gram in grams:
+        term_trigrams.setdefault(gram, set()).add(term)
+
+
+def _remove_term(term):
+    del _term_gram_counts[term]
+    for gram in _trigrams(term):
+        terms = term_trigrams.get(gram)
+        if terms is not None:
+            terms.discard(term)
+            if not terms:
+                del term_trigrams[gram]
+
+
+def _unlink_dish(restaurant_id, dish_id):
+    """Drop a dish from its restaurant's set, and the set once it is empty - caller holds the lock"""
+    dish_ids = _restaurant_dishes.get(restaurant_id)
+    if dish_ids is not None:
+        dish_ids.discard(dish_id)
+        if not dish_ids:
+            del _restaurant_dishes[restaurant_id]
+
+
+def _reindex(restaurant_id):
+    """Rebuild a restaurant's document from its own and its dishes' terms - caller holds the lock"""
+    global _total_length, _generation
+    _generation += 1
+    terms = Counter()
+    restaurant_terms = _restaurant_terms.get(restaurant_id)
+    if restaurant_terms is not None:
+        terms.update(restaurant_terms)
+        for dish_id in _restaurant_dishes.get(restaurant_id, ()):
+            terms.update(_dish_terms[dish_id][1])
+
+    old_terms = _doc_terms.pop(restaurant_id, None)
+    if old_terms:
+        for term in old_terms:
+            if term in terms:
+                continue
+            _impact_cache.pop(term, None)
+            docs = postings[term]
+            del docs[restaurant_id]
+            if not docs:
+                del postings[term]
+                _remove_term(term)
+        _total_length -= doc_lengths.pop(restaurant_id)
+
+    if terms:
+        for term, frequency in terms.items():
+            _impact_cache.pop(term, None)
+            docs = postings.get(term)
+            if docs is None:
+                docs = postings[term] = {}
+                _add_term(term)
+            docs[restaurant_id] = frequency
+        _doc_terms[restaurant_id] = terms
+        doc_lengths[restaurant_id] = length = sum(terms.values())
+        _total_length += length
+
+
+def index_restaurant(restaurant):
+    """Add or refresh a restaurant's name, location and category"""
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        terms.update(_weighted_terms(getattr(restaurant, field), weight))
+    with _lock:
+        _restaurant_terms[restaurant.id] = terms
+        _reindex(restaurant.id)
+
+
+def unindex_restaurant(restaurant_id):
+    """Remove a restaurant from search results, dish names included"""
+    with _lock:
+        _restaurant_terms.pop(restaurant_id, None)
+        for dish_id in _restaurant_dishes.pop(restaurant_id, ()):
+            _dish_terms.pop(dish_id, None)
+        _reindex(restaurant_id)
+
+
+def index_dish(dish):
+    """Add or refresh a dish name in its restaurant's document"""
+    terms = _weighted_terms(dish.name, DISH_WEIGHT)
+    with _lock:
+        previous = _dish_terms.get(dish.id)
+        _dish_terms[dish.id] = (dish.restaurant_id, terms)
+        _restaurant_dishes.setdefault(dish.restaurant_id, set()).add(dish.id)
+        if previous is not None and previous[0] != dish.restaurant_id:
+            _unlink_dish(previous[0], dish.id)
+            _reindex(previous[0])
+        _reindex(dish.restaurant_id)
+
+
+def unindex_dish(dish):
+    """Remove a dish name from its restaurant's document"""
+    with _lock:
+        previous = _dish_terms.pop(dish.id, None)
+        if previous is not None:
+            _unlink_dish(previous[0], dish.id)
+            _reindex(previous[0])
+
+
+def _expand(token):
+    """(similarity, term, postings) for the vocabulary terms standing in for a query token"""
+    docs = postings.get(token)
+    if docs is not None:
+        return [(1.0, token, docs)]
+
+    grams = _trigrams(token)
+    shared = Counter()
+    for gram in grams:
+        shared.update(term_trigrams.get(gram, ()))
+    similar = []
+    for term, count in shared.items():
+        similarity = 2 * count / (len(grams) + _term_gram_counts.get(term, count))
+        if similarity >= FUZZY_MIN_SIMILARITY:
+            similar.append((similarity, term))
+    variants = []
+    for similarity, term in heapq.nlargest(MAX_EXPANSIONS, similar):
+        docs = postings.get(term)
+        if docs:
+            variants.append((similarity, term, docs))
+    return variants
+
+
+def _scored_postings(term, docs, average_length):
+    """[average_length, impacts, ranked] for a term, cached until its postings change
+
+    impacts maps restaurant_id -> BM25 term frequency saturation; ranked
+    is the same pairs best first, sorted on first use by a single-term
+    query. Impacts depend on the average document length, so they are
+    recomputed once it has drifted by more than RESCORE_DRIFT.
+    """
+    with _lock:
+        cached = _impact_cache.get(term)
+        generation = _generation
+    if cached is not None and 1 / RESCORE_DRIFT <= average_length / cached[0] <= RESCORE_DRIFT:
+        return cached
+
+    length_factor = K1 * B / average_length
+    impacts = {restaurant_id: frequency * (K1 + 1) / (frequency + K1 * (1 - B) +
+                                                      length_factor * doc_lengths.get(restaurant_id, average_length))
+               for restaurant_id, frequency in list(docs.items())}
+    cached = [average_length, impacts, None]
+    with _lock:
+        if generation == _generation:
+            _impact_cache[term] = cached
+    return cached
+
+
+def _matching(variants, within=None):
+    """Restaurants containing any of a query token's terms, optionally only those in within
+
+    A token with a single term and no within gives that term's live key
+    view - set operations on it build only their (smaller) result.
+    """
+    if len(variants) == 1:
+        keys = variants[0][2].keys()
+        return keys if within is None else within & keys
+    matched = set()
+    for _, _, docs in variants:
+        matched |= within & docs.keys() if within is not None else docs.keys()
+    return matched
+
+
+def search(query, limit=DEFAULT_LIMIT, restrict=(), keep=None):
+    """Rank restaurants against a free-text query, best first, as up to limit (restaurant_id, score) pairs
+
+    Restaurants containing every query token are ranked; when fewer than
+    limit of them pass the filters, those missing one token join them,
+    and then those containing any token.
+    restrict is a sequence of id sets the results must belong to, keep an
+    optional predicate on restaurant ids.
+    """
+    document_count = len(doc_lengths)
+    if not document_count:
+        return []
+    average_length = _total_length / document_count
+
+    # Per query token: (weight, term, postings) for each vocabulary term matching it.
+    # The weight is the inverse document frequency, scaled by how close the term is to what was typed.
+    terms = []
+    for token in dict.fromkeys(tokenize(query)):
+        variants = _expand(token)
+        if variants:
+            terms.append([(similarity * math.log(1 + (document_count - len(docs) + 0.5) / (len(docs) + 0.5)), term, docs)
+                          for similarity, term, docs in variants])
+    if not terms:
+        return []
+    terms.sort(key=lambda variants: sum(len(docs) for _, _, docs in variants))
+
+    def allowed(restaurant_id):
+        return all(restaurant_id in ids for ids in restrict) and (keep is None or keep(restaurant_id))
+
+    if len(terms) == 1 and len(terms[0]) == 1:
+        # One term - its postings ranked by impact already are the result order
+        weight, term, docs = terms[0][0]
+        scored = _scored_postings(term, docs, average_length)
+        if scored[2] is None:
+            scored[2] = sorted(scored[1].items(), key=lambda item: (-item[1], item[0]))
+        top = []
+        for restaurant_id, impact in scored[2]:
+            if allowed(restaurant_id):
+                top.append((restaurant_id, weight * impact))
+                if len(top) == limit:
+                    break
+        return top
+
+    def filtered(candidates):
+        for ids in restrict:
+            candidates &= ids
+        if keep is not None:
+            candidates = set(filter(keep, list(candidates)))
+        return candidates
+
+    def containing_all(token_terms):
+        candidates = _matching(token_terms[0])
+        for variants in token_terms[1:]:
+            candidates = _matching(variants, candidates)
+        return filtered(candidates)
+
+    candidates = containing_all(terms)
+    if len(candidates) < limit and len(terms) > 2:
+        # Relax to restaurants missing at most one token
+        for skipped in range(len(terms)):
+            candidates |= containing_all(terms[:skipped] + terms[skipped + 1:])
+    if len(candidates) < limit and len(terms) > 1:
+        candidates = set()
+        for variants in terms:
+            candidates |= _matching(variants)
+        candidates = filtered(candidates)
+    if not candidates:
+        return []
+
+    # Score every candidate with C-level map() passes, one per term, instead of a Python loop per restaurant
+    candidates = list(candidates)
+    columns = []
+    for variants in terms:
+        scores = [map(mul, repeat(weight), map(_scored_postings(term, docs, average_length)[1].get, candidates, repeat(0.0)))
+                  for weight, term, docs in variants]
+        columns.append(scores[0] if len(scores) == 1 else map(max, *scores))
+    scores = list(reduce(partial(map, add), columns))
+
+    # Bounded heap of the best limit scores first, then only restaurants scoring at least
+    # the lowest of them go into the final heap - ties go to the older restaurant
+    cutoff = heapq.nlargest(limit, scores)[-1]
+    above = list(map(le, repeat(cutoff), scores))
+    top = heapq.nlargest(limit, zip(compress(scores, above), map(neg, compress(candidates, above))))
+    return [(-negated_id, score) for score, negated_id in top]
+
+
+def reset():
+    """Clear the index - called from data_store.reset_data"""
+    global _total_length, _generation
+    with _lock:
+        _generation += 1
+        _impact_cache.clear()
+        postings.clear()
+        doc_lengths.clear()
+        term_trigrams.clear()
+        _term_gram_counts.clear()
+        _restaurant_terms.clear()
+        _dish_terms.clear()
+        _restaurant_dishes.clear()
+        _doc_terms.clear()
+        _total_length = 0.0
@@ -0,0 +1,251 @@
+"""
+Write-Ahead Log Module - Durability for the in-memory store
+
+The durable memory backend appends every table change to a log as one
+NDJSON line. Lines are buffered in memory and a committer thread writes
+and fsyncs whatever has accumulated since its last fsync (group commit),
+so concurrent writers share one fsync instead of paying one each.
+wait(seq) blocks until a line is on disk - data_store.flush() calls it
+at the end of every request, so a response is only sent once its writes
+are durable.
+
+The log is cut into numbered segments. A snapshot (a pickle of every
+table plus the id counters) starts a new segment and deletes the older
+ones once it is safely renamed into place. Recovery loads the snapshot
+and replays the segments written after it, stopping at a torn last line.
+"""
+
+import json
+import os
+import pickle
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 'group' fsyncs batches from a committer thread, 'always' fsyncs every
+# append before returning, 'none' leaves flushing to the OS
+SYNC_MODES = ('group', 'always', 'none')
+
+# Lines 'none' buffers before writing them out in one call
+UNSYNCED_BATCH_LINES = 256
+
+SNAPSHOT_FILE = 'snapshot.pickle'
+SEGMENT_PREFIX = 'wal-'
+SEGMENT_SUFFIX = '.ndjson'
+
+
+def encode(entry):
+    if orjson is not None:
+        try:
+            return orjson.dumps(entry) + b'\n'
+        except TypeError:
+            pass
+    return json.dumps(entry, separators=(',', ':')).encode() + b'\n'
+
+
+def decode(line):
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def segment_path(directory, segment):
+    return os.path.join(directory, f"{SEGMENT_PREFIX}{segment:08d}{SEGMENT_SUFFIX}")
+
+
+def segment_numbers(directory):
+    """Numbers of the log segment files in directory, ascending"""
+    numbers = []
+    for name in os.listdir(directory):
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+            numbers.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+    return sorted(numbers)
+
+
+def replay(directory, from_segment=1):
+    """Yield the entries of every segment from from_segment on, in order
+
+    A line that does not decode can only be the torn tail of the last
+    write before a crash, so the segment is cut off there.
+    """
+    for number in segment_numbers(directory):
+        if number < from_segment:
+            continue
+        path = segment_path(directory, number)
+        good_bytes = 0
+        with open(path, 'rb') as file:
+            for line in file:
+                try:
+                    entry = decode(line)
+                except ValueError:
+                    break
+                good_bytes += len(line)
+                yield entry
+        if good_bytes < os.path.getsize(path):
+            with open(path, 'r+b') as file:
+                file.truncate(good_bytes)
+
+
+def _fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """Append-only, segmented NDJSON log with group-commit fsync"""
+
+    def __init__(self, directory, sync='group'):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"sync must be one of {', '.join(SYNC_MODES)}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.sync = sync
+        segments = segment_numbers(directory)
+        self.segment = segments[-1] if segments else 1
+        self._file = open(segment_path(self.directory, self.segment), 'ab')
+        if not segments:
+            _fsync_directory(directory)
+        self._buffer = []
+        self._seq = 0
+        self._durable_seq = 0
+        self.appended_since_snapshot = 0
+        self._cond = threading.Condition()
+        # Held while writing to the current segment file
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._committer = None
+        if sync == 'group':
+            self._committer = threading.Thread(target=self._commit_loop, name='foodie-wal', daemon=True)
+            self._committer.start()
+
+    def append(self, entry):
+        """Log one entry, returning its sequence number for wait()"""
+        line = encode(entry)
+        if self.sync == 'always':
+            with self._io_lock:
+                self._file.write(line)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                with self._cond:
+                    self._seq += 1
+                    self._durable_seq = self._seq
+                    self.appended_since_snapshot += 1
+                    return self._seq
+        with self._cond:
+            self._buffer.append(line)
+            self._seq += 1
+            self.appended_since_snapshot += 1
+            if self.sync == 'group' and len(self._buffer) == 1:
+                self._cond.notify_all()
+            seq = self._seq
+            write_out = self.sync == 'none' and len(self._buffer) >= UNSYNCED_BATCH_LINES
+        if write_out:
+            self._write_buffer(fsync=False)
+        return seq
+
+    def _write_buffer(self, fsync=True):
+        """Write out everything buffered so far and mark it durable"""
+        with self._io_lock:
+            with self._cond:
+                lines, self._buffer = self._buffer, []
+                seq = self._seq
+            if lines:
+                self._file.write(b''.join(lines))
+                self._file.flush()
+                if fsync:
+                    os.fsync(self._file.fileno())
+            with self._cond:
+                self._durable_seq = max(self._durable_seq, seq)
+                self._cond.notify_all()
+
+    def _commit_loop(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._buffer:
+                    return
+            self._write_buffer()
+
+    def wait(self, seq):
+        """Block until the entry numbered seq is on disk"""
+        if self.sync != 'group':
+            return
+        with self._cond:
+            while self._durable_seq < seq:
+                self._cond.wait()
+
+    def last_seq(self):
+        with self._cond:
+            return self._seq
+
+    def rotate(self):
+        """Finish the current segment and start a new one, returning its number"""
+        self._write_buffer(fsync=self.sync != 'none')
+        with self._io_lock:
+            self._file.close()
+            self.segment += 1
+            self._file = open(segment_path(self.directory, self.segment), 'ab')
+            # The new segment's directory entry must be durable before its lines are
+            _fsync_directory(self.directory)
+            with self._cond:
+                self.appended_since_snapshot = 0
+            return self.segment
+
+    def remove_segments_before(self, segment):
+        for number in segment_numbers(self.directory):
+            if number < segment:
+                os.remove(segment_path(self.directory, number))
+
+    def truncate(self):
+        """Drop every segment, buffered entries and the snapshot, and start again from segment 1"""
+        with self._io_lock:
+            with self._cond:
+                self._buffer = []
+                self._durable_seq = self._seq
+                self.appended_since_snapshot = 0
+                self._cond.notify_all()
+            self._file.close()
+            for number in segment_numbers(self.directory):
+                os.remove(segment_path(self.directory, number))
+            snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+            self.segment = 1
+            self._file = open(segment_path(self.directory, self.segment), 'ab')
+            _fsync_directory(self.directory)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._committer is not None:
+            self._committer.join()
+        self._write_buffer(fsync=self.sync != 'none')
+        with self._io_lock:
+            self._file.close()
+
+
+def write_snapshot(directory, state):
+    """Pickle state to the snapshot file atomically - a crash leaves the previous snapshot intact"""
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    _fsync_directory(directory)
+
+
+def read_snapshot(directory):
+    """The last snapshot's state, or None if there is none"""
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        return pickle.load(file)
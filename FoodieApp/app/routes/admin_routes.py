@@ -3,7 +3,10 @@ Admin Routes - Handles admin-related API endpoints
 """
 
 from flask import Blueprint, request, jsonify
-from app.models import data_store
+from app.models import data_store, order_index
+from app.models.records import to_dict
+from app.services.pagination import list_response, page_ids
+from app.services.response_cache import cache
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -14,7 +17,9 @@ def approve_restaurant(restaurant_id):
     if restaurant_id not in data_store.restaurants:
         return jsonify({"error": "Restaurant not found"}), 404
     
-    data_store.restaurants[restaurant_id]['approved'] = True
+    restaurant = data_store.restaurants[restaurant_id]
+    restaurant.approved = True
+    data_store.save_restaurant(restaurant)
     return jsonify({"message": "Restaurant approved"}), 200
 
 
@@ -24,18 +29,50 @@ def admin_disable_restaurant(restaurant_id):
     if restaurant_id not in data_store.restaurants:
         return jsonify({"error": "Restaurant not found"}), 404
     
-    data_store.restaurants[restaurant_id]['enabled'] = False
+    restaurant = data_store.restaurants[restaurant_id]
+    restaurant.enabled = False
+    data_store.save_restaurant(restaurant)
     return jsonify({"message": "Restaurant disabled"}), 200
 
 
+@admin_bp.route('/api/v1/admin/restaurants/<int:restaurant_id>/restore', methods=['POST'])
+def restore_restaurant(restaurant_id):
+    """Restore a deleted restaurant with its dishes, orders and ratings, until compaction purges them"""
+    if restaurant_id not in data_store.trash:
+        return jsonify({"error": "Deleted restaurant not found"}), 404
+    
+    restaurant = data_store.restore_restaurant(restaurant_id)
+    if restaurant is None:
+        return jsonify({"error": "Restaurant name already exists"}), 409
+    return jsonify(to_dict(restaurant)), 200
+
+
+@admin_bp.route('/api/v1/admin/compact', methods=['POST'])
+def compact_data_store():
+    """Purge deleted restaurants' rows now instead of waiting for the background pass"""
+    return jsonify({"purged": data_store.compact()}), 200
+
+
 @admin_bp.route('/api/v1/admin/feedback', methods=['GET'])
 def view_feedback():
-    """View all customer feedback"""
-    return jsonify(data_store.feedback), 200
+    """View all customer feedback - supports ?after_id=&limit= and ?format=ndjson"""
+    def fetch_page(after_id, limit):
+        return [to_dict(entry) for entry in data_store.feedback_page(after_id, limit)]
+    
+    return list_response("feedback", fetch_page, cursor_key='rating_id')
 
 
 @admin_bp.route('/api/v1/admin/orders', methods=['GET'])
 def view_all_orders():
-    """View all orders in the system"""
-    orders_list = list(data_store.orders.values())
-    return jsonify(orders_list), 200
+    """View all orders in the system - supports ?after_id=&limit= and ?format=ndjson"""
+    def fetch_page(after_id, limit):
+        order_ids = page_ids(order_index.get_all_order_ids(), after_id, limit)
+        return [to_dict(order) for order in data_store.get_orders(order_ids)]
+    
+    return list_response("orders", fetch_page)
+
+
+@admin_bp.route('/api/v1/admin/cache', methods=['GET'])
+def view_cache_stats():
+    """View response cache hit/miss counters"""
+    return jsonify(cache.stats()), 200
@@ -0,0 +1,163 @@
+"""
+Catalog Routes - Bulk import and streaming export of restaurants and dishes
+"""
+
+from flask import Blueprint, Response, current_app, request, jsonify
+from app.models import data_store, search_index
+from app.models.records import Dish, Restaurant, to_dict
+from app.models.storage import DuplicateKey
+from app.services.bulk import (DISH_COLUMNS, RESTAURANT_COLUMNS, parse_rows,
+                               stream_rows, upload_format)
+from app.services.rate_limit import limit_blueprint
+from app.services.validation import dish_import_schema, restaurant_schema
+
+catalog_bp = Blueprint('catalog', __name__)
+# Bulk imports and full exports are the heaviest requests there are
+limit_blueprint(catalog_bp, 'catalog')
+
+MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def _error_list(errors):
+    """One entry per bad row - its first error, and all of them"""
+    by_row = {}
+    for row_number, error_msg in errors:
+        by_row.setdefault(row_number, []).append(error_msg)
+    return [{"row": row_number, "error": row_errors[0], "errors": row_errors}
+            for row_number, row_errors in sorted(by_row.items())]
+
+
+def _parse_upload():
+    """Parse the request body, returning (row_numbers, rows, errors)"""
+    parsed, errors = parse_rows(request.get_data(as_text=True), upload_format(request))
+    row_numbers = [row_number for row_number, _ in parsed]
+    rows = [data for _, data in parsed]
+    return row_numbers, rows, errors
+
+
+@catalog_bp.route('/api/v1/restaurants/bulk', methods=['POST'])
+def bulk_import_restaurants():
+    """Import many restaurants from NDJSON or CSV - all rows are created or none are"""
+    row_numbers, rows, errors = _parse_upload()
+
+    # Validate every row before touching the store
+    errors += [(row_numbers[index], error_msg)
+               for index, error_msg in restaurant_schema.validate_batch(rows)]
+
+    # Duplicate names within the upload
+    seen = {}
+    for row_number, data in zip(row_numbers, rows):
+        name = data.get('name') if isinstance(data, dict) else None
+        if not isinstance(name, str):
+            continue
+        if name in seen:
+            errors.append((row_number, f"Duplicate name in upload (row {seen[name]})"))
+        elif name:
+            seen[name] = row_number
+
+    if errors:
+        return jsonify({"created": 0, "errors": _error_list(errors)}), 400
+    if not rows:
+        return jsonify({"error": "No rows to import"}), 400
+
+    # Reserve every name atomically against existing restaurants
+    restaurant_ids, taken = data_store.restaurant_names.claim_many(
+        [data['name'] for data in rows], data_store.get_next_restaurant_id)
+    if taken:
+        taken = set(taken)
+        errors = [(row_number, "Restaurant with this name already exists")
+                  for row_number, data in zip(row_numbers, rows) if data['name'] in taken]
+        return jsonify({"created": 0, "errors": _error_list(errors)}), 409
+
+    try:
+        with data_store.transaction():
+            for restaurant_id, data in zip(restaurant_ids, rows):
+                data_store.save_restaurant(Restaurant(
+                    id=restaurant_id,
+                    name=data['name'],
+                    category=data['category'],
+                    location=data['location'],
+                    contact=data['contact'],
+                    images=data.get('images', []),
+                    lat=data.get('lat'),
+                    lon=data.get('lon')
+                ))
+    except DuplicateKey:
+        # Another worker holds one of the names - the whole upload was rolled back
+        data_store.forget_restaurants([(restaurant_id, data['name'])
+                                       for restaurant_id, data in zip(restaurant_ids, rows)])
+        raise
+
+    return jsonify({"created": len(restaurant_ids), "ids": restaurant_ids, "errors": []}), 201
+
+
+@catalog_bp.route('/api/v1/dishes/bulk', methods=['POST'])
+def bulk_import_dishes():
+    """Import many dishes from NDJSON or CSV - every row needs a restaurant_id"""
+    row_numbers, rows, errors = _parse_upload()
+    errors += [(row_numbers[index], error_msg)
+               for index, error_msg in dish_import_schema.validate_batch(rows)]
+    failed = {row_number for row_number, _ in errors}
+
+    # Existing dish names per restaurant, loaded once per restaurant in the upload
+    dish_names = {}
+    for row_number, data in zip(row_numbers, rows):
+        if row_number in failed:
+            continue
+        restaurant_id = data['restaurant_id']
+        if restaurant_id not in dish_names:
+            if restaurant_id not in data_store.restaurants:
+                errors.append((row_number, "Restaurant not found"))
+                continue
+            dish_names[restaurant_id] = {data_store.dishes[dish_id].name
+                                         for dish_id in search_index.get_dish_ids(restaurant_id)}
+        names = dish_names[restaurant_id]
+        if data['name'] in names:
+            errors.append((row_number, "Dish with this name already exists for the restaurant"))
+        else:
+            names.add(data['name'])
+
+    if errors:
+        return jsonify({"created": 0, "errors": _error_list(errors)}), 400
+    if not rows:
+        return jsonify({"error": "No rows to import"}), 400
+
+    dish_ids = []
+    with data_store.transaction():
+        for data in rows:
+            dish_id = data_store.get_next_dish_id()
+            data_store.save_dish(Dish(
+                id=dish_id,
+                restaurant_id=data['restaurant_id'],
+                name=data['name'],
+                type=data['type'],
+                price=data['price'],
+                available_time=data.get('available_time', 'All day'),
+                image=data.get('image', '')
+            ))
+            dish_ids.append(dish_id)
+
+    return jsonify({"created": len(dish_ids), "ids": dish_ids, "errors": []}), 201
+
+
+def _export(name, table, columns):
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in MIMETYPES:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    # A snapshot of the ids - the live table changes while the rows stream out
+    record_ids = data_store.record_ids(name)
+    records = (to_dict(record) for record in map(table.get, record_ids) if record is not None)
+    return Response(stream_rows(records, fmt, columns, current_app.json.dumps_bytes), mimetype=MIMETYPES[fmt]), 200
+
+
+@catalog_bp.route('/api/v1/restaurants/export', methods=['GET'])
+def export_restaurants():
+    """Stream every restaurant as NDJSON (default) or CSV"""
+    return _export('restaurants', data_store.restaurants, RESTAURANT_COLUMNS)
+
+
+@catalog_bp.route('/api/v1/dishes/export', methods=['GET'])
+def export_dishes():
+    """Stream every dish as NDJSON (default) or CSV"""
+    return _export('dishes', data_store.dishes, DISH_COLUMNS)
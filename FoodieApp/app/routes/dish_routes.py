@@ -4,7 +4,8 @@ Dish Routes - Handles dish-related API endpoints
 
 from flask import Blueprint, request, jsonify
 from app.models import data_store
-from app.services.validation import validate_dish_data
+from app.models.records import Dish, to_dict
+from app.services.validation import validate_dish_data, validate_dish_update_data
 
 dish_bp = Blueprint('dish', __name__)
 
@@ -18,25 +19,24 @@ def add_dish(restaurant_id):
     data = request.get_json()
     
     # Validate input
-    is_valid, error_msg = validate_dish_data(data)
-    if not is_valid:
-        return jsonify({"error": error_msg}), 400
+    errors = validate_dish_data(data)
+    if errors:
+        return jsonify({"error": errors[0], "errors": errors}), 400
     
     # Create dish
     dish_id = data_store.get_next_dish_id()
-    dish = {
-        "id": dish_id,
-        "restaurant_id": restaurant_id,
-        "name": data['name'],
-        "type": data['type'],
-        "price": data['price'],
-        "available_time": data.get('available_time', 'All day'),
-        "image": data.get('image', ''),
-        "enabled": True
-    }
+    dish = Dish(
+        id=dish_id,
+        restaurant_id=restaurant_id,
+        name=data['name'],
+        type=data['type'],
+        price=data['price'],
+        available_time=data.get('available_time', 'All day'),
+        image=data.get('image', '')
+    )
     
-    data_store.dishes[dish_id] = dish
-    return jsonify(dish), 201
+    data_store.save_dish(dish)
+    return jsonify(to_dict(dish)), 201
 
 
 @dish_bp.route('/api/v1/dishes/<int:dish_id>', methods=['PUT'])
@@ -48,12 +48,17 @@ def update_dish(dish_id):
     data = request.get_json()
     dish = data_store.dishes[dish_id]
     
+    errors = validate_dish_update_data(data)
+    if errors:
+        return jsonify({"error": errors[0], "errors": errors}), 400
+    
     # Update fields
     for key in ['name', 'type', 'price', 'available_time', 'image']:
         if key in data:
-            dish[key] = data[key]
+            setattr(dish, key, data[key])
     
-    return jsonify(dish), 200
+    data_store.save_dish(dish)
+    return jsonify(to_dict(dish)), 200
 
 
 @dish_bp.route('/api/v1/dishes/<int:dish_id>/status', methods=['PUT'])
@@ -66,7 +71,9 @@ def toggle_dish_status(dish_id):
     if 'enabled' not in data:
         return jsonify({"error": "enabled field is required"}), 400
     
-    data_store.dishes[dish_id]['enabled'] = data['enabled']
+    dish = data_store.dishes[dish_id]
+    dish.enabled = data['enabled']
+    data_store.save_dish(dish)
     status = "enabled" if data['enabled'] else "disabled"
     return jsonify({"message": f"Dish {status}"}), 200
 
@@ -77,5 +84,5 @@ def delete_dish(dish_id):
     if dish_id not in data_store.dishes:
         return jsonify({"error": "Dish not found"}), 404
     
-    del data_store.dishes[dish_id]
+    data_store.delete_dish(dish_id)
     return jsonify({"message": "Dish deleted"}), 200
@@ -2,31 +2,108 @@
 Order Routes - Handles order-related API endpoints
 """
 
-from flask import Blueprint, jsonify
-from app.models import data_store
+from flask import Blueprint, Response, current_app, request, jsonify
+from app.models import data_store, order_index
+from app.models.records import ACTIVE_ORDER_STATUSES, ORDER_STATUSES, to_dict
+from app.services import order_feed
+from app.services.order_lifecycle import active_orders, transition
+from app.services.pagination import list_response, page_ids
 
 order_bp = Blueprint('order', __name__)
 
 
 @order_bp.route('/api/v1/restaurants/<int:restaurant_id>/orders', methods=['GET'])
 def get_orders_by_restaurant(restaurant_id):
-    """View all orders for a specific restaurant"""
+    """View all orders for a specific restaurant - supports ?after_id=&limit= and ?format=ndjson"""
     if restaurant_id not in data_store.restaurants:
         return jsonify({"error": "Restaurant not found"}), 404
     
-    orders = [order for order in data_store.orders.values() 
-              if order['restaurant_id'] == restaurant_id]
+    def fetch_page(after_id, limit):
+        order_ids = page_ids(order_index.get_restaurant_order_ids(restaurant_id), after_id, limit)
+        return [to_dict(order) for order in data_store.get_orders(order_ids)]
     
-    return jsonify(orders), 200
+    return list_response("orders", fetch_page)
 
 
 @order_bp.route('/api/v1/users/<int:user_id>/orders', methods=['GET'])
 def get_orders_by_user(user_id):
-    """View all orders for a specific user"""
+    """View all orders for a specific user - supports ?after_id=&limit= and ?format=ndjson"""
     if user_id not in data_store.users:
         return jsonify({"error": "User not found"}), 404
     
-    orders = [order for order in data_store.orders.values() 
-              if order['user_id'] == user_id]
+    def fetch_page(after_id, limit):
+        order_ids = page_ids(order_index.get_user_order_ids(user_id), after_id, limit)
+        return [to_dict(order) for order in data_store.get_orders(order_ids)]
     
-    return jsonify(orders), 200
+    return list_response("orders", fetch_page)
+
+
+@order_bp.route('/api/v1/restaurants/<int:restaurant_id>/orders/active', methods=['GET'])
+def get_active_orders(restaurant_id):
+    """View a restaurant's in-progress orders grouped by status, oldest first - supports ?status="""
+    if restaurant_id not in data_store.restaurants:
+        return jsonify({"error": "Restaurant not found"}), 404
+    
+    statuses = ACTIVE_ORDER_STATUSES
+    if 'status' in request.args:
+        statuses = tuple(status.strip() for status in request.args['status'].split(',') if status.strip())
+        unknown = [status for status in statuses if status not in ACTIVE_ORDER_STATUSES]
+        if unknown or not statuses:
+            return jsonify({"error": f"status must be one of: {', '.join(ACTIVE_ORDER_STATUSES)}"}), 400
+    
+    orders_by_status = active_orders(restaurant_id, statuses)
+    return jsonify({
+        "orders": {status: [to_dict(order) for order in orders] for status, orders in orders_by_status.items()},
+        "count": sum(len(orders) for orders in orders_by_status.values())
+    }), 200
+
+
+@order_bp.route('/api/v1/restaurants/<int:restaurant_id>/orders/feed', methods=['GET'])
+def poll_order_feed(restaurant_id):
+    """Long-poll for order events after ?since= - waits up to ?timeout= seconds for the next one"""
+    if restaurant_id not in data_store.restaurants:
+        return jsonify({"error": "Restaurant not found"}), 404
+    
+    since, error_msg = order_feed.parse_cursor(request.args.get('since'))
+    if error_msg:
+        return jsonify({"error": error_msg}), 400
+    timeout = order_feed.parse_timeout(request.args.get('timeout'))
+    
+    result = order_feed.channel(restaurant_id).wait(since, timeout)
+    return jsonify(order_feed.poll_result(since, *result)), 200
+
+
+@order_bp.route('/api/v1/restaurants/<int:restaurant_id>/orders/stream', methods=['GET'])
+def stream_order_feed(restaurant_id):
+    """Server-Sent Events stream of order events after ?since= or Last-Event-ID"""
+    if restaurant_id not in data_store.restaurants:
+        return jsonify({"error": "Restaurant not found"}), 404
+    
+    since, error_msg = order_feed.parse_cursor(request.args.get('since'), request.headers.get('Last-Event-ID'))
+    if error_msg:
+        return jsonify({"error": error_msg}), 400
+    
+    response = Response(order_feed.sse_events(restaurant_id, since, current_app.json.dumps),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response, 200
+
+
+@order_bp.route('/api/v1/orders/<int:order_id>/status', methods=['PUT'])
+def update_order_status(order_id):
+    """Move an order to its next status"""
+    if order_id not in data_store.orders:
+        return jsonify({"error": "Order not found"}), 404
+    
+    data = request.get_json()
+    new_status = data.get('status') if isinstance(data, dict) else None
+    if new_status not in ORDER_STATUSES:
+        return jsonify({"error": f"status must be one of: {', '.join(ORDER_STATUSES)}"}), 400
+    
+    order, error_msg = transition(order_id, new_status)
+    if order is None:
+        return jsonify({"error": error_msg}), 404
+    if error_msg:
+        return jsonify({"error": error_msg}), 409
+    return jsonify(to_dict(order)), 200
@@ -2,9 +2,14 @@
 Restaurant Routes - Handles restaurant-related API endpoints
 """
 
-from flask import Blueprint, request, jsonify
-from app.models import data_store
-from app.services.validation import validate_restaurant_data
+from flask import Blueprint, Response, request, jsonify
+from app.models import data_store, geo_index, rating_aggregates, search_cards, search_index, text_index
+from app.models.records import Restaurant, to_dict
+from app.services.pagination import parse_limit
+from app.services.rate_limit import admission_controlled, rate_limited
+from app.services.response_cache import cached_response
+from app.services.validation import (parse_near, validate_restaurant_data, validate_restaurant_patch_data,
+                                     validate_restaurant_update_data)
 
 restaurant_bp = Blueprint('restaurant', __name__)
 
@@ -15,33 +20,33 @@ def register_restaurant():
     data = request.get_json()
     
     # Validate input
-    is_valid, error_msg = validate_restaurant_data(data)
-    if not is_valid:
-        return jsonify({"error": error_msg}), 400
+    errors = validate_restaurant_data(data)
+    if errors:
+        return jsonify({"error": errors[0], "errors": errors}), 400
     
-    # Check for duplicate name
-    for restaurant in data_store.restaurants.values():
-        if restaurant['name'] == data['name']:
-            return jsonify({"error": "Restaurant with this name already exists"}), 409
+    # Reserve the name and allocate an id in one step
+    restaurant_id = data_store.restaurant_names.claim(data['name'], data_store.get_next_restaurant_id)
+    if restaurant_id is None:
+        return jsonify({"error": "Restaurant with this name already exists"}), 409
     
     # Create restaurant
-    restaurant_id = data_store.get_next_restaurant_id()
-    restaurant = {
-        "id": restaurant_id,
-        "name": data['name'],
-        "category": data['category'],
-        "location": data['location'],
-        "contact": data['contact'],
-        "images": data.get('images', []),
-        "enabled": True,
-        "approved": False
-    }
-    
-    data_store.restaurants[restaurant_id] = restaurant
-    return jsonify(restaurant), 201
+    restaurant = Restaurant(
+        id=restaurant_id,
+        name=data['name'],
+        category=data['category'],
+        location=data['location'],
+        contact=data['contact'],
+        images=data.get('images', []),
+        lat=data.get('lat'),
+        lon=data.get('lon')
+    )
+    
+    data_store.save_restaurant(restaurant)
+    return jsonify(to_dict(restaurant)), 201
 
 
 @restaurant_bp.route('/api/v1/restaurants', methods=['GET'])
+@cached_response
 def get_all_restaurants():
     """Get all restaurants with optional filtering"""
     # Get query parameters
@@ -54,16 +59,16 @@ def get_all_restaurants():
     
     # Apply filters
     if category:
-        restaurants = [r for r in restaurants if r['category'].lower() == category.lower()]
+        restaurants = [r for r in restaurants if r.category.lower() == category.lower()]
     
     if approved_only:
-        restaurants = [r for r in restaurants if r.get('approved', False)]
+        restaurants = [r for r in restaurants if r.approved]
     
     if enabled_only:
-        restaurants = [r for r in restaurants if r.get('enabled', True)]
+        restaurants = [r for r in restaurants if r.enabled]
     
     return jsonify({
-        "restaurants": restaurants,
+        "restaurants": [to_dict(r) for r in restaurants],
         "count": len(restaurants)
     }), 200
 
@@ -77,12 +82,21 @@ def update_restaurant(restaurant_id):
     data = request.get_json()
     restaurant = data_store.restaurants[restaurant_id]
     
+    # Every given field is checked before the name index or the record changes
+    errors = validate_restaurant_update_data(data)
+    if errors:
+        return jsonify({"error": errors[0], "errors": errors}), 400
+    
+    if 'name' in data and not data_store.restaurant_names.rename(restaurant.name, data['name'], restaurant_id):
+        return jsonify({"error": "Restaurant with this name already exists"}), 409
+    
     # Update fields
-    for key in ['name', 'category', 'location', 'contact', 'images']:
+    for key in ['name', 'category', 'location', 'contact', 'images', 'lat', 'lon']:
         if key in data:
-            restaurant[key] = data[key]
+            setattr(restaurant, key, data[key])
     
-    return jsonify(restaurant), 200
+    data_store.save_restaurant(restaurant)
+    return jsonify(to_dict(restaurant)), 200
 
 
 @restaurant_bp.route('/api/v1/restaurants/<int:restaurant_id>/disable', methods=['PUT'])
@@ -91,17 +105,47 @@ def disable_restaurant(restaurant_id):
     if restaurant_id not in data_store.restaurants:
         return jsonify({"error": "Restaurant not found"}), 404
     
-    data_store.restaurants[restaurant_id]['enabled'] = False
+    restaurant = data_store.restaurants[restaurant_id]
+    restaurant.enabled = False
+    data_store.save_restaurant(restaurant)
     return jsonify({"message": "Restaurant disabled"}), 200
 
 
 @restaurant_bp.route('/api/v1/restaurants/<int:restaurant_id>', methods=['GET'])
+@cached_response
 def view_restaurant(restaurant_id):
     """View restaurant profile"""
     if restaurant_id not in data_store.restaurants:
         return jsonify({"error": "Restaurant not found"}), 404
     
-    return jsonify(data_store.restaurants[restaurant_id]), 200
+    return jsonify(to_dict(data_store.restaurants[restaurant_id])), 200
+
+
+@restaurant_bp.route('/api/v1/restaurants/<int:restaurant_id>/rating-summary', methods=['GET'])
+def get_rating_summary(restaurant_id):
+    """View rating count, average, min/max and histogram for a restaurant"""
+    if restaurant_id not in data_store.restaurants:
+        return jsonify({"error": "Restaurant not found"}), 404
+    
+    return jsonify(rating_aggregates.get_summary(restaurant_id)), 200
+
+
+@restaurant_bp.route('/api/v1/restaurants/<int:restaurant_id>/recent-feedback', methods=['GET'])
+def get_recent_feedback(restaurant_id):
+    """View a restaurant's latest ratings and comments, newest first - supports ?limit="""
+    if restaurant_id not in data_store.restaurants:
+        return jsonify({"error": "Restaurant not found"}), 404
+
+    limit, error_msg = parse_limit(request.args, rating_aggregates.RECENT_RATINGS, rating_aggregates.RECENT_RATINGS)
+    if error_msg:
+        return jsonify({"error": error_msg}), 400
+
+    feedback = rating_aggregates.get_recent(restaurant_id, limit)
+    return jsonify({
+        "restaurant_id": restaurant_id,
+        "feedback": feedback,
+        "count": len(feedback)
+    }), 200
 
 
 @restaurant_bp.route('/api/v1/restaurants/<int:restaurant_id>', methods=['DELETE'])
@@ -110,7 +154,7 @@ def delete_restaurant(restaurant_id):
     if restaurant_id not in data_store.restaurants:
         return jsonify({"error": "Restaurant not found"}), 404
     
-    del data_store.restaurants[restaurant_id]
+    data_store.delete_restaurant(restaurant_id)
     return jsonify({"message": "Restaurant deleted successfully"}), 200
 
 
@@ -123,43 +167,92 @@ def patch_restaurant(restaurant_id):
     data = request.get_json()
     restaurant = data_store.restaurants[restaurant_id]
     
+    errors = validate_restaurant_patch_data(data)
+    if errors:
+        return jsonify({"error": errors[0], "errors": errors}), 400
+    
+    if 'name' in data and not data_store.restaurant_names.rename(restaurant.name, data['name'], restaurant_id):
+        return jsonify({"error": "Restaurant with this name already exists"}), 409
+    
     # Update only provided fields
-    allowed_fields = ['name', 'category', 'location', 'contact', 'images', 'enabled', 'approved']
+    allowed_fields = ['name', 'category', 'location', 'contact', 'images', 'enabled', 'approved', 'lat', 'lon']
     for key in allowed_fields:
         if key in data:
-            restaurant[key] = data[key]
+            setattr(restaurant, key, data[key])
             
-    return jsonify(restaurant), 200
+    data_store.save_restaurant(restaurant)
+    return jsonify(to_dict(restaurant)), 200
 
 
 @restaurant_bp.route('/api/v1/restaurants/search', methods=['GET'])
+@rate_limited('search')
+@cached_response
+@admission_controlled('search')
 def search_restaurants():
-    """Search restaurants by name, location, or category"""
+    """Search restaurants by name, location, category, dish, or minimum average rating
+
+    Disabled restaurants are never listed, and unapproved ones only with
+    ?include_unapproved=true. ?q= ranks them by relevance to free text;
+    ?near=lat,lon&radius_km= keeps those within the radius, nearest first
+    unless q ranks them.
+    """
     name_query = request.args.get('name', '').lower()
     location_query = request.args.get('location', '').lower()
     category_query = request.args.get('category', '').lower()
+    dish_query = request.args.get('dish', '').lower()
+    text_query = request.args.get('q', '')
+    min_rating = request.args.get('rating', type=float)
+    include_unapproved = request.args.get('include_unapproved', 'false').lower() == 'true'
     
-    results = []
-    
-    for restaurant in data_store.restaurants.values():
-        match = True
-        
-        # Check name if provided
-        if name_query and name_query not in restaurant['name'].lower():
-            match = False
-        
-        # Check location if provided
-        if location_query and location_query not in restaurant['location'].lower():
-            match = False
-            
-        # Check category if provided
-        if category_query and category_query not in restaurant['category'].lower():
-            match = False
-            
-        if match:
-            results.append(restaurant)
-            
-    return jsonify({
-        "restaurants": results,
-        "count": len(results)
-    }), 200
+    # The rating and the radius narrow the candidates; None means every restaurant
+    candidates = None
+    if min_rating and min_rating > 0:
+        # Unrated restaurants average 0, so a positive rating filter only keeps rated ones
+        candidates = rating_aggregates.restaurants_rated_at_least(min_rating)
+    
+    distances = None
+    if request.args.get('near'):
+        lat, lon, radius_km, error_msg = parse_near(request.args['near'], request.args.get('radius_km'),
+                                                    geo_index.DEFAULT_RADIUS_KM, geo_index.MAX_RADIUS_KM)
+        if error_msg:
+            return jsonify({"error": error_msg}), 400
+        # Only the grid cells around the point are visited
+        distances = dict(geo_index.near(lat, lon, radius_km))
+        candidates = set(distances) if candidates is None else candidates & distances.keys()
+    
+    def has_dish(restaurant_id):
+        return any(dish_query in data_store.dishes[dish_id].name.lower()
+                   for dish_id in search_index.get_dish_ids(restaurant_id))
+    
+    # Only candidate restaurants from the search index are visited, and only enabled (and approved) ones kept
+    restaurant_ids = search_index.search(
+        name=name_query, location=location_query, category=category_query,
+        enabled_only=True, approved_only=not include_unapproved, within=candidates
+    )
+    
+    if text_query:
+        limit, error_msg = parse_limit(request.args, text_index.DEFAULT_LIMIT, text_index.MAX_LIMIT)
+        if error_msg:
+            return jsonify({"error": error_msg}), 400
+        ranked = text_index.search(text_query, limit, restrict=[set(restaurant_ids)],
+                                   keep=has_dish if dish_query else None)
+    else:
+        if distances is not None:
+            # geo_index.near() returns the nearest first
+            visible = set(restaurant_ids)
+            restaurant_ids = [restaurant_id for restaurant_id in distances if restaurant_id in visible]
+        ranked = [(restaurant_id, None) for restaurant_id in restaurant_ids
+                  if not dish_query or has_dish(restaurant_id)]
+    
+    # Cards are cached pre-serialized - the response is the cards joined, plus per-request fields
+    cards = []
+    for restaurant_id, score in ranked:
+        card = data_store.get_search_card(restaurant_id)
+        extra = {}
+        if distances is not None:
+            extra["distance_km"] = round(distances[restaurant_id], 3)
+        if score is not None:
+            extra["score"] = round(score, 4)
+        cards.append(search_cards.with_fields(card, extra) if extra else card)
+    
+    return Response(search_cards.response_body(cards), mimetype='application/json'), 200
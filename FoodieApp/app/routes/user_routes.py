@@ -2,131 +2,91 @@
 User Routes - Handles user-related API endpoints
 """
 
+import time
+
 from flask import Blueprint, request, jsonify
 from app.models import data_store
-from app.services.validation import validate_user_data, validate_order_data, validate_rating_data
+from app.models.records import Feedback, Order, Rating, User, to_dict
+from app.services import auth, order_feed
+from app.services.pricing import price_order
+from app.services.rate_limit import check_rate, rate_limited
+from app.services.validation import validate_login_data, validate_order_data, validate_rating_data, validate_user_data
 
 user_bp = Blueprint('user', __name__)
 
 
+def _user_response(user):
+    # Don't return the password hash
+    return {k: v for k, v in to_dict(user).items() if k != 'password'}
+
+
+def _hashing_busy():
+    return jsonify({"error": "Server busy, try again shortly"}), 503, {'Retry-After': '1'}
+
+
 @user_bp.route('/api/v1/users/register', methods=['POST'])
 def register_user():
     """Register a new user"""
     data = request.get_json()
     
     # Validate input
-    is_valid, error_msg = validate_user_data(data)
-    if not is_valid:
-        return jsonify({"error": error_msg}), 400
+    errors = validate_user_data(data)
+    if errors:
+        return jsonify({"error": errors[0], "errors": errors}), 400
+    
+    # Reserve the email and allocate an id in one step
+    user_id = data_store.user_emails.claim(data['email'], data_store.get_next_user_id)
+    if user_id is None:
+        return jsonify({"error": "User with this email already exists"}), 409
     
-    # Check for duplicate email
-    for user in data_store.users.values():
-        if user['email'] == data['email']:
-            return jsonify({"error": "User with this email already exists"}), 409
+    try:
+        password_hash = auth.hasher.hash(data['password'])
+    except auth.HashingBusy:
+        data_store.user_emails.release(data['email'], user_id)
+        return _hashing_busy()
     
     # Create user
-    user_id = data_store.get_next_user_id()
-    user = {
-        "id": user_id,
-        "name": data['name'],
-        "email": data['email'],
-        "password": data['password']  # In production, hash this!
-    }
-    
-    data_store.users[user_id] = user
-    # Don't return password
-    user_response = {k: v for k, v in user.items() if k != 'password'}
-    return jsonify(user_response), 201
+    user = User(
+        id=user_id,
+        name=data['name'],
+        email=data['email'],
+        password=password_hash
+    )
+    
+    data_store.save_user(user)
+    return jsonify(_user_response(user)), 201
 
 
-@user_bp.route('/api/v1/restaurants/search', methods=['GET'])
-def search_restaurants():
-    """Search restaurants by name, location, dish, or rating"""
-    name = request.args.get('name', '').lower()
-    location = request.args.get('location', '').lower()
-    dish = request.args.get('dish', '').lower()
-    min_rating = request.args.get('rating', type=float)
-    include_unapproved = request.args.get('include_unapproved', 'false').lower() == 'true'
-    
-    results = []
-    
-    for restaurant in data_store.restaurants.values():
-        # Skip disabled restaurants (always)
-        if not restaurant['enabled']:
-            continue
-        
-        # Skip unapproved restaurants unless include_unapproved=true
-        if not include_unapproved and not restaurant['approved']:
-            continue
-        
-        # Filter by name
-        if name and name not in restaurant['name'].lower():
-            continue
-        
-        # Filter by location
-        if location and location not in restaurant['location'].lower():
-            continue
-        
-        # Get all dishes for this restaurant
-        restaurant_dishes = [d for d in data_store.dishes.values() 
-                            if d['restaurant_id'] == restaurant['id']]
-        
-        # Filter by dish
-        if dish:
-            has_dish = any(dish in d['name'].lower() for d in restaurant_dishes)
-            if not has_dish:
-                continue
-        
-        # Calculate average rating and get all ratings
-        restaurant_ratings = [r for r in data_store.ratings.values() 
-                            if data_store.orders.get(r['order_id'], {}).get('restaurant_id') == restaurant['id']]
-        
-        if restaurant_ratings:
-            avg_rating = sum(r['rating'] for r in restaurant_ratings) / len(restaurant_ratings)
-        else:
-            avg_rating = 0
-        
-        # Filter by rating
-        if min_rating and avg_rating < min_rating:
-            continue
-        
-        # Build detailed result
-        result = {
-            "id": restaurant['id'],
-            "name": restaurant['name'],
-            "category": restaurant['category'],
-            "location": restaurant['location'],
-            "contact": restaurant['contact'],
-            "images": restaurant.get('images', []),
-            "average_rating": round(avg_rating, 2),
-            "total_ratings": len(restaurant_ratings),
-            "dishes": [
-                {
-                    "id": d['id'],
-                    "name": d['name'],
-                    "type": d['type'],
-                    "price": d['price'],
-                    "available_time": d.get('available_time', 'All day'),
-                    "image": d.get('image', ''),
-                    "enabled": d.get('enabled', True)
-                }
-                for d in restaurant_dishes
-            ],
-            "total_dishes": len(restaurant_dishes),
-            "recent_ratings": [
-                {
-                    "rating": r['rating'],
-                    "comment": r.get('comment', '')
-                }
-                for r in restaurant_ratings[:5]  # Show last 5 ratings
-            ]
-        }
-        results.append(result)
-    
-    return jsonify({
-        "restaurants": results,
-        "count": len(results)
-    }), 200
+@user_bp.route('/api/v1/users/login', methods=['POST'])
+@rate_limited('login')
+def login_user():
+    """Check a user's email and password"""
+    data = request.get_json()
+    
+    errors = validate_login_data(data)
+    if errors:
+        return jsonify({"error": errors[0], "errors": errors}), 400
+    
+    # Attempts are limited per client (above) and per account, however many clients guess at it
+    rejection = check_rate('login_account', 'email:' + data['email'].strip().lower())
+    if rejection is not None:
+        return rejection
+    
+    # O(1) through the email index
+    user_id = data_store.user_emails.owner(data['email'])
+    user = data_store.users.get(user_id) if user_id is not None else None
+    try:
+        matched = auth.hasher.verify(data['password'], user.password if user is not None else None)
+        if matched and auth.hasher.needs_rehash(user.password):
+            # Plain text from before hashing, or an older cost
+            user.password = auth.hasher.hash(data['password'])
+            data_store.save_user(user)
+    except auth.HashingBusy:
+        return _hashing_busy()
+    if not matched:
+        return jsonify({"error": "Invalid email or password"}), 401
+    
+    return jsonify(_user_response(user)), 200
 
 
 @user_bp.route('/api/v1/orders', methods=['POST'])
@@ -135,9 +95,9 @@ def place_order():
     data = request.get_json()
     
     # Validate input
-    is_valid, error_msg = validate_order_data(data)
-    if not is_valid:
-        return jsonify({"error": error_msg}), 400
+    errors = validate_order_data(data)
+    if errors:
+        return jsonify({"error": errors[0], "errors": errors}), 400
     
     # Validate user exists
     if data['user_id'] not in data_store.users:
@@ -147,19 +107,27 @@ def place_order():
     if data['restaurant_id'] not in data_store.restaurants:
         return jsonify({"error": "Restaurant not found"}), 400
     
+    # Price the cart server-side - any client-supplied total is ignored
+    lines, total, error_msg = price_order(data['restaurant_id'], data['dishes'])
+    if error_msg:
+        return jsonify({"error": error_msg}), 400
+    
     # Create order
     order_id = data_store.get_next_order_id()
-    order = {
-        "id": order_id,
-        "user_id": data['user_id'],
-        "restaurant_id": data['restaurant_id'],
-        "dishes": data['dishes'],
-        "status": "pending",
-        "total": data.get('total', 0)
-    }
-    
-    data_store.orders[order_id] = order
-    return jsonify(order), 201
+    now = time.time()
+    order = Order(
+        id=order_id,
+        user_id=data['user_id'],
+        restaurant_id=data['restaurant_id'],
+        dishes=lines,
+        total=total,
+        created_at=now,
+        updated_at=now
+    )
+    
+    data_store.save_order(order)
+    order_feed.publish_order('order_created', order)
+    return jsonify(to_dict(order)), 201
 
 
 @user_bp.route('/api/v1/ratings', methods=['POST'])
@@ -168,9 +136,9 @@ def give_rating():
     data = request.get_json()
     
     # Validate input
-    is_valid, error_msg = validate_rating_data(data)
-    if not is_valid:
-        return jsonify({"error": error_msg}), 400
+    errors = validate_rating_data(data)
+    if errors:
+        return jsonify({"error": errors[0], "errors": errors}), 400
     
     # Validate order exists
     if data['order_id'] not in data_store.orders:
@@ -178,24 +146,24 @@ def give_rating():
     
     # Create rating
     rating_id = data_store.get_next_rating_id()
-    rating = {
-        "id": rating_id,
-        "order_id": data['order_id'],
-        "rating": data['rating'],
-        "comment": data.get('comment', '')
-    }
+    rating = Rating(
+        id=rating_id,
+        order_id=data['order_id'],
+        rating=data['rating'],
+        comment=data.get('comment', '')
+    )
     
-    data_store.ratings[rating_id] = rating
+    data_store.save_rating(rating)
     
     # Add to feedback
     order = data_store.orders[data['order_id']]
-    feedback_entry = {
-        "rating_id": rating_id,
-        "user_id": order['user_id'],
-        "restaurant_id": order['restaurant_id'],
-        "rating": rating['rating'],
-        "comment": rating['comment']
-    }
-    data_store.feedback.append(feedback_entry)
-    
-    return jsonify(rating), 201
+    feedback_entry = Feedback(
+        rating_id=rating_id,
+        user_id=order.user_id,
+        restaurant_id=order.restaurant_id,
+        rating=rating.rating,
+        comment=rating.comment
+    )
+    data_store.add_feedback(feedback_entry)
+    
+    return jsonify(to_dict(rating)), 201
@@ -0,0 +1,168 @@
+"""
+Auth service - password hashing on a bounded worker pool
+
+Passwords are stored as salted scrypt (or PBKDF2-SHA256) hashes in the
+form algorithm$cost$salt$key, so a hash keeps verifying after the cost
+is changed; login re-hashes it at the current cost. Hashing is
+deliberately slow, so it runs on a pool of FOODIE_HASH_WORKERS threads
+(hashlib releases the GIL while it works, so they run in parallel)
+rather than on however many request threads arrive at once. At most
+QUEUE_PER_WORKER hashes per worker may wait; past that HashingBusy is
+raised and the route answers 503 instead of queueing.
+
+    FOODIE_HASH_ALGORITHM   scrypt (default) or pbkdf2_sha256
+    FOODIE_HASH_COST        scrypt N, a power of two (default 2^14), or PBKDF2 iterations (default 600000)
+    FOODIE_HASH_WORKERS     pool size (default min(4, CPUs))
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHMS = ('scrypt', 'pbkdf2_sha256')
+DEFAULT_COSTS = {'scrypt': 2 ** 14, 'pbkdf2_sha256': 600000}
+
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+# Hashes that may wait for a worker, per worker, before new ones are turned away
+QUEUE_PER_WORKER = 8
+
+
+class HashingBusy(Exception):
+    """The hashing pool's queue is full"""
+
+
+def _derive(password, algorithm, cost, salt):
+    if algorithm == 'scrypt':
+        # scrypt needs 128 * r * N bytes of memory
+        return hashlib.scrypt(password.encode(), salt=salt, n=cost, r=SCRYPT_R, p=SCRYPT_P,
+                              maxmem=256 * SCRYPT_R * cost, dklen=KEY_BYTES)
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, cost, KEY_BYTES)
+
+
+def _encode(raw):
+    return base64.b64encode(raw).decode('ascii')
+
+
+def _check_cost(algorithm, cost):
+    if algorithm == 'scrypt' and (cost < 2 or cost & (cost - 1)):
+        raise ValueError("scrypt cost must be a power of two greater than 1")
+    if cost < 1:
+        raise ValueError("PBKDF2 cost must be at least 1")
+
+
+def _parse(stored):
+    """(algorithm, cost, salt, key) of a stored hash, or None for a legacy plain-text password
+
+    Raises ValueError for a hash that names an algorithm but is malformed.
+    """
+    parts = stored.split('$')
+    if len(parts) == 1 or parts[0] not in ALGORITHMS:
+        return None
+    if len(parts) != 4:
+        raise ValueError("malformed password hash")
+    algorithm, cost, salt, key = parts
+    cost = int(cost)
+    _check_cost(algorithm, cost)
+    return algorithm, cost, base64.b64decode(salt, validate=True), base64.b64decode(key, validate=True)
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a bounded thread pool"""
+
+    def __init__(self, algorithm='scrypt', cost=None, workers=DEFAULT_WORKERS):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"algorithm must be one of {', '.join(ALGORITHMS)}")
+        self.algorithm = algorithm
+        self.cost = cost or DEFAULT_COSTS[algorithm]
+        # Checked here, at startup, rather than by every hash failing
+        _check_cost(algorithm, self.cost)
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='foodie-hash')
+        self._slots = threading.BoundedSemaphore(workers * QUEUE_PER_WORKER)
+        self._lock = threading.Lock()
+        self._dummy = None
+        self.hashed = 0
+        self.verified = 0
+        self.rejected = 0
+
+    def _run(self, func, *args):
+        """Run func on the pool and wait for it, or raise HashingBusy if the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy()
+        try:
+            return self._pool.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def _hash(self, password):
+        salt = secrets.token_bytes(SALT_BYTES)
+        key = _derive(password, self.algorithm, self.cost, salt)
+        return f"{self.algorithm}${self.cost}${_encode(salt)}${_encode(key)}"
+
+    def _verify(self, password, stored):
+        try:
+            parsed = _parse(stored)
+        except ValueError:
+            # A corrupt hash matches no password
+            return False
+        if parsed is None:
+            return hmac.compare_digest(password.encode(), stored.encode())
+        algorithm, cost, salt, key = parsed
+        return hmac.compare_digest(_derive(password, algorithm, cost, salt), key)
+
+    def hash(self, password):
+        """A new salted hash of password"""
+        stored = self._run(self._hash, password)
+        with self._lock:
+            self.hashed += 1
+        return stored
+
+    def verify(self, password, stored):
+        """Whether password matches a stored hash
+
+        stored is None for an unknown user: a dummy hash is checked anyway
+        so the response takes as long as for a real one.
+        """
+        if stored is None:
+            if self._dummy is None:
+                self._dummy = self._hash(secrets.token_hex(16))
+            self._run(self._verify, password, self._dummy)
+            return False
+        matched = self._run(self._verify, password, stored)
+        with self._lock:
+            self.verified += 1
+        return matched
+
+    def needs_rehash(self, stored):
+        """Whether a stored hash is plain text or was made with other settings"""
+        try:
+            parsed = _parse(stored)
+        except ValueError:
+            return True
+        return parsed is None or parsed[:2] != (self.algorithm, self.cost)
+
+    def stats(self):
+        with self._lock:
+            return {"algorithm": self.algorithm, "cost": self.cost, "workers": self.workers,
+                    "hashed": self.hashed, "verified": self.verified, "rejected": self.rejected}
+
+
+def _build_hasher():
+    algorithm = os.environ.get('FOODIE_HASH_ALGORITHM', 'scrypt')
+    cost = os.environ.get('FOODIE_HASH_COST')
+    workers = int(os.environ.get('FOODIE_HASH_WORKERS', DEFAULT_WORKERS))
+    return PasswordHasher(algorithm, int(cost) if cost else None, workers)
+
+
+hasher = _build_hasher()
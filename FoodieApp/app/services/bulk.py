@@ -0,0 +1,87 @@
+"""
+Bulk import/export utilities - NDJSON and CSV row parsing and writing
+"""
+
+import csv
+import io
+import json
+
+RESTAURANT_COLUMNS = ['id', 'name', 'category', 'location', 'contact', 'images', 'enabled', 'approved', 'lat', 'lon']
+DISH_COLUMNS = ['id', 'restaurant_id', 'name', 'type', 'price', 'available_time', 'image', 'enabled']
+
+# CSV cells are strings - these columns are converted back on import
+INTEGER_COLUMNS = {'restaurant_id'}
+NUMBER_COLUMNS = {'price', 'lat', 'lon'}
+LIST_COLUMNS = {'images'}
+LIST_SEPARATOR = '|'
+
+
+def upload_format(request):
+    """csv for text/csv uploads or ?format=csv, ndjson otherwise"""
+    if request.args.get('format') == 'csv' or request.mimetype == 'text/csv':
+        return 'csv'
+    return 'ndjson'
+
+
+def _convert_csv_row(row):
+    """Turn CSV strings back into the types the JSON API uses"""
+    data = {}
+    for key, value in row.items():
+        if key is None or value is None or value == '':
+            continue
+        if key in INTEGER_COLUMNS:
+            value = int(value)
+        elif key in NUMBER_COLUMNS:
+            number = float(value)
+            value = int(number) if number.is_integer() else number
+        elif key in LIST_COLUMNS:
+            value = value.split(LIST_SEPARATOR)
+        data[key] = value
+    return data
+
+
+def parse_rows(text, fmt):
+    """Parse an upload into (rows, errors)
+
+    rows holds (row_number, data) pairs; errors holds (row_number,
+    error_msg) for lines that could not be parsed. Row numbers count data
+    rows from 1, skipping blank NDJSON lines and the CSV header.
+    """
+    rows = []
+    errors = []
+    if fmt == 'csv':
+        for row_number, row in enumerate(csv.DictReader(io.StringIO(text)), start=1):
+            try:
+                rows.append((row_number, _convert_csv_row(row)))
+            except ValueError as exc:
+                errors.append((row_number, f"Invalid value: {exc}"))
+    else:
+        row_number = 0
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                rows.append((row_number, json.loads(line)))
+            except ValueError:
+                errors.append((row_number, "Invalid JSON"))
+    return rows, errors
+
+
+def stream_rows(records, fmt, columns, dumps_bytes):
+    """Yield records as NDJSON lines encoded by dumps_bytes, or as CSV with a header row"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for record in records:
+            if 'images' in record:
+                record = dict(record, images=LIST_SEPARATOR.join(record['images']))
+            writer.writerow(record)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for record in records:
+            yield dumps_bytes(record) + b'\n'
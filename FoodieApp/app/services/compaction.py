@@ -0,0 +1,58 @@
+"""
+Compaction - Background purge of soft-deleted restaurants
+
+Deleting a restaurant only moves it and its dishes, orders and ratings
+out of the live tables and indexes (data_store.delete_restaurant). A
+daemon thread calls data_store.compact() every FOODIE_COMPACT_SECONDS
+(default 60, 0 disables it) to purge them and their feedback entries,
+keeping the O(all feedback) part of a delete off the request path.
+"""
+
+import logging
+import os
+import threading
+
+from app.models import data_store
+
+DEFAULT_INTERVAL_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+_thread = None
+_stop = threading.Event()
+_lock = threading.Lock()
+
+
+def _run(interval):
+    while not _stop.wait(interval):
+        try:
+            if data_store.get_trash_counts()['restaurants']:
+                data_store.compact()
+        except Exception:
+            logger.exception("compaction pass failed")
+
+
+def start(interval=None):
+    """Start the compaction thread once per process - later calls are no-ops"""
+    global _thread
+    if interval is None:
+        interval = float(os.environ.get('FOODIE_COMPACT_SECONDS', DEFAULT_INTERVAL_SECONDS))
+    if interval <= 0:
+        return
+    with _lock:
+        if _thread is not None:
+            return
+        _stop.clear()
+        _thread = threading.Thread(target=_run, args=(interval,), name='foodie-compaction', daemon=True)
+        _thread.start()
+
+
+def stop():
+    """Stop the compaction thread"""
+    global _thread
+    with _lock:
+        if _thread is None:
+            return
+        _stop.set()
+        _thread.join()
+        _thread = None
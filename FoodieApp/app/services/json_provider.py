@@ -0,0 +1,64 @@
+"""
+JSON Provider - Fast response serialization for jsonify()
+
+Flask's default provider sorts keys and goes through the stdlib encoder.
+FastJSONProvider keeps keys in insertion order, always writes compact
+separators and encodes with orjson when it is installed, falling back
+to the stdlib for anything orjson refuses (integers wider than 64 bits)
+or when it is missing. Dates go through Flask's default() either way, so
+they stay HTTP dates. Set FOODIE_JSON_ENCODER=json to force the stdlib.
+"""
+
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODERS = ('orjson', 'json')
+
+
+def default_encoder():
+    """orjson when it is installed, unless FOODIE_JSON_ENCODER names another encoder"""
+    encoder = os.environ.get('FOODIE_JSON_ENCODER', 'orjson' if orjson is not None else 'json')
+    if encoder not in ENCODERS:
+        raise ValueError(f"FOODIE_JSON_ENCODER must be one of {', '.join(ENCODERS)}")
+    if encoder == 'orjson' and orjson is None:
+        return 'json'
+    return encoder
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson or the stdlib - compact, keys unsorted"""
+
+    sort_keys = False
+    compact = True
+    ensure_ascii = False
+
+    def __init__(self, app, encoder=None):
+        super().__init__(app)
+        self.encoder = encoder or default_encoder()
+
+    def dumps_bytes(self, obj):
+        """obj as compact UTF-8 JSON"""
+        if self.encoder == 'orjson':
+            try:
+                return orjson.dumps(obj, default=self.default,
+                                    option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+            except TypeError:
+                pass
+        return json.dumps(obj, default=self.default, ensure_ascii=False, separators=(',', ':')).encode()
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            return self.dumps_bytes(obj).decode()
+        kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,251 @@
+"""
+Request instrumentation - per-route latency, byte counts and profiling
+
+init_app() installs before/after request hooks that record, per route
+and method:
+- latency in an HDR-style histogram (log-linear buckets, so quantiles
+  keep ~3% relative precision whatever the range)
+- request and response body bytes
+- request counts by status code
+
+GET /metrics renders them, the data store operation counters, the
+response cache counters and the rate limit and admission counters in
+Prometheus text format.
+
+Set FOODIE_PROFILE_ENDPOINT (e.g. restaurant.search_restaurants) and optionally
+FOODIE_PROFILE_SAMPLE_RATE (default 0.01) to run cProfile on a sample of
+that endpoint's requests; GET /metrics/profile?top=20 shows the hottest
+functions.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+
+from flask import Response, g, jsonify, request
+
+from app.models import data_store
+from app.services import rate_limit
+from app.services.response_cache import cache
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+PROFILE_TOP = 20
+
+
+class LatencyHistogram:
+    """HDR-style histogram of integer microsecond values
+
+    Each value is rounded down to its top SIGNIFICANT_BITS bits, giving
+    2^(SIGNIFICANT_BITS - 1) linear buckets per power of two.
+    """
+
+    SIGNIFICANT_BITS = 6
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def _bucket(cls, value):
+        shift = value.bit_length() - cls.SIGNIFICANT_BITS
+        if shift <= 0:
+            return value, 1
+        return (value >> shift) << shift, 1 << shift
+
+    def record(self, value):
+        lower, _ = self._bucket(value)
+        self.counts[lower] = self.counts.get(lower, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Value at quantile q - the midpoint of the bucket holding it"""
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for lower in sorted(self.counts):
+            seen += self.counts[lower]
+            if seen >= rank:
+                _, width = self._bucket(lower)
+                return min(lower + width / 2, self.max)
+        return self.max
+
+
+class RouteStats:
+    """Everything recorded for one route and method"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.statuses = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+# Sampling profiler state
+profile_endpoint = os.environ.get('FOODIE_PROFILE_ENDPOINT')
+profile_sample_rate = float(os.environ.get('FOODIE_PROFILE_SAMPLE_RATE', '0.01'))
+_profile_stats = None
+_profiled_requests = 0
+_profile_lock = threading.Lock()
+
+
+def _route_key():
+    rule = request.url_rule.rule if request.url_rule else 'unmatched'
+    return rule, request.method
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+    if profile_endpoint and request.endpoint == profile_endpoint and random.random() < profile_sample_rate:
+        g.metrics_profiler = cProfile.Profile()
+        g.metrics_profiler.enable()
+
+
+def _record(response):
+    global _profile_stats, _profiled_requests
+
+    profiler = g.pop('metrics_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        with _profile_lock:
+            if _profile_stats is None:
+                _profile_stats = pstats.Stats(profiler)
+            else:
+                _profile_stats.add(profiler)
+            _profiled_requests += 1
+
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    elapsed_us = int((time.perf_counter() - start) * 1_000_000)
+    response_bytes = 0 if response.is_streamed else (response.content_length or 0)
+
+    key = _route_key()
+    with _stats_lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = RouteStats()
+        stats.latency.record(elapsed_us)
+        stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+        stats.request_bytes += request.content_length or 0
+        stats.response_bytes += response_bytes
+    return response
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}'
+
+
+def render_prometheus():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    with _stats_lock:
+        routes = sorted(_stats.items())
+
+        lines.append('# HELP foodie_request_duration_seconds Request latency by route')
+        lines.append('# TYPE foodie_request_duration_seconds summary')
+        for (route, method), stats in routes:
+            for q in QUANTILES:
+                value = stats.latency.quantile(q) / 1_000_000
+                lines.append(f'foodie_request_duration_seconds{_labels(route=route, method=method, quantile=q)} {value:.6f}')
+            labels = _labels(route=route, method=method)
+            lines.append(f'foodie_request_duration_seconds_sum{labels} {stats.latency.total / 1_000_000:.6f}')
+            lines.append(f'foodie_request_duration_seconds_count{labels} {stats.latency.count}')
+
+        lines.append('# HELP foodie_requests_total Requests by route and status code')
+        lines.append('# TYPE foodie_requests_total counter')
+        for (route, method), stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'foodie_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+        lines.append('# HELP foodie_request_bytes_total Request body bytes received')
+        lines.append('# TYPE foodie_request_bytes_total counter')
+        for (route, method), stats in routes:
+            lines.append(f'foodie_request_bytes_total{_labels(route=route, method=method)} {stats.request_bytes}')
+
+        lines.append('# HELP foodie_response_bytes_total Response body bytes sent (streamed bodies excluded)')
+        lines.append('# TYPE foodie_response_bytes_total counter')
+        for (route, method), stats in routes:
+            lines.append(f'foodie_response_bytes_total{_labels(route=route, method=method)} {stats.response_bytes}')
+
+    lines.append('# HELP foodie_datastore_operations_total Data store write operations')
+    lines.append('# TYPE foodie_datastore_operations_total counter')
+    for operation, count in sorted(data_store.get_operation_counts().items()):
+        lines.append(f'foodie_datastore_operations_total{_labels(operation=operation)} {count}')
+
+    shard_stats = data_store.backend.shard_stats()
+    if shard_stats:
+        lines.append('# HELP foodie_datastore_shard_records Records held per data store shard')
+        lines.append('# TYPE foodie_datastore_shard_records gauge')
+        for stats in shard_stats:
+            lines.append(f'foodie_datastore_shard_records{_labels(shard=stats["shard"])} {stats["records"]}')
+        lines.append('# HELP foodie_datastore_shard_writes_total Record writes per data store shard')
+        lines.append('# TYPE foodie_datastore_shard_writes_total counter')
+        for stats in shard_stats:
+            lines.append(f'foodie_datastore_shard_writes_total{_labels(shard=stats["shard"])} {stats["writes"]}')
+
+    cache_stats = cache.stats()
+    lines.append('# HELP foodie_response_cache_events_total Response cache lookups by outcome')
+    lines.append('# TYPE foodie_response_cache_events_total counter')
+    for event in ('hits', 'misses', 'not_modified', 'evictions'):
+        lines.append(f'foodie_response_cache_events_total{_labels(event=event)} {cache_stats[event]}')
+    lines.append('# HELP foodie_response_cache_entries Entries held in the response cache')
+    lines.append('# TYPE foodie_response_cache_entries gauge')
+    lines.append(f'foodie_response_cache_entries {cache_stats["size"]}')
+
+    limiter_stats = rate_limit.stats()
+    lines.append('# HELP foodie_rate_limit_decisions_total Rate-limited requests by limit and decision')
+    lines.append('# TYPE foodie_rate_limit_decisions_total counter')
+    for name, stats in sorted(limiter_stats['limits'].items()):
+        for decision in ('allowed', 'limited'):
+            lines.append(f'foodie_rate_limit_decisions_total{_labels(limit=name, decision=decision)} {stats[decision]}')
+    lines.append('# HELP foodie_admission_requests_total Admission-controlled requests by gate and outcome')
+    lines.append('# TYPE foodie_admission_requests_total counter')
+    for name, stats in sorted(limiter_stats['gates'].items()):
+        for outcome in ('admitted', 'shed'):
+            lines.append(f'foodie_admission_requests_total{_labels(gate=name, outcome=outcome)} {stats[outcome]}')
+    lines.append('# HELP foodie_admission_in_flight Requests running under each admission gate')
+    lines.append('# TYPE foodie_admission_in_flight gauge')
+    for name, stats in sorted(limiter_stats['gates'].items()):
+        lines.append(f'foodie_admission_in_flight{_labels(gate=name)} {stats["in_flight"]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_endpoint():
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+def profile_endpoint_view():
+    """Top hot functions from the sampled profiles"""
+    if not profile_endpoint:
+        return jsonify({"error": "Profiling is off - set FOODIE_PROFILE_ENDPOINT"}), 404
+    top = request.args.get('top', PROFILE_TOP, type=int)
+    with _profile_lock:
+        if _profile_stats is None:
+            return jsonify({"error": f"No sampled requests for {profile_endpoint} yet"}), 404
+        output = io.StringIO()
+        _profile_stats.stream = output
+        _profile_stats.sort_stats('cumulative').print_stats(top)
+        profiled = _profiled_requests
+    header = f"endpoint: {profile_endpoint}  sampled requests: {profiled}  sample rate: {profile_sample_rate}\n"
+    return Response(header + output.getvalue(), mimetype='text/plain')
+
+
+def init_app(app):
+    """Install the timing hooks and the /metrics endpoints"""
+    app.before_request(_start_timer)
+    app.after_request(_record)
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint, methods=['GET'])
+    app.add_url_rule('/metrics/profile', 'metrics_profile', profile_endpoint_view, methods=['GET'])
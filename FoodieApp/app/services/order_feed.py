@@ -0,0 +1,211 @@
+"""
+Order feed - in-process pub/sub of order events per restaurant
+
+place_order and order status changes publish an event to the ordering
+restaurant's channel. Each channel numbers its events 1, 2, 3... and
+keeps the last BUFFER_SIZE of them, so a dashboard can ask for
+everything after the sequence number it saw last (the since cursor).
+
+Waiting subscribers block until the next publish - an idle dashboard
+costs no CPU and is woken the moment an event is published. Threads
+wait with wait(); coroutines on an asyncio loop (the ASGI server) with
+wait_async(). Channels live in this process only: with several worker
+processes, a subscriber sees the events published by its own worker.
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+
+from app.models.records import to_dict
+
+BUFFER_SIZE = 1000
+DEFAULT_WAIT_SECONDS = 25
+MAX_WAIT_SECONDS = 60
+HEARTBEAT_SECONDS = 15
+
+
+def _wake_futures(futures):
+    for future in futures:
+        if not future.done():
+            future.set_result(None)
+
+
+class Channel:
+    """Numbered, bounded event buffer for one restaurant
+
+    publish() replaces an immutable (last_seq, events) snapshot, so
+    readers never take a lock to read. Each waiting thread blocks on its
+    own lock, which publish() releases - woken waiters do not queue on a
+    shared lock the way Condition.notify_all() waiters do. Waiting
+    coroutines hold futures, resolved with one callback per event loop.
+    """
+
+    def __init__(self):
+        self.events = deque(maxlen=BUFFER_SIZE)
+        self.last_seq = 0
+        self.snapshot = (0, ())
+        self._lock = threading.Lock()
+        self._waiters = set()
+        self._async_waiters = {}
+
+    def _publish_snapshot(self):
+        """Expose the current events and wake every waiter - caller holds the lock"""
+        self.snapshot = (self.last_seq, tuple(self.events))
+        waiters, self._waiters = self._waiters, set()
+        for waiter in waiters:
+            waiter.release()
+        async_waiters, self._async_waiters = self._async_waiters, {}
+        for loop, futures in async_waiters.items():
+            loop.call_soon_threadsafe(_wake_futures, futures)
+
+    def publish(self, event_type, payload):
+        with self._lock:
+            self.last_seq += 1
+            self.events.append({"seq": self.last_seq, "type": event_type, "order": payload})
+            self._publish_snapshot()
+
+    def _events_after(self, since):
+        """(events, missed, last_seq) for the current snapshot"""
+        last_seq, events = self.snapshot
+        if since > last_seq:
+            # Cursor from before a restart - the client has to resync
+            return [], True, last_seq
+        if since == last_seq:
+            return [], False, last_seq
+        first_seq = events[0]["seq"] if events else last_seq + 1
+        missed = since < first_seq - 1
+        return list(events[max(0, since - first_seq + 1):]), missed, last_seq
+
+    def wait(self, since, timeout):
+        """Events after since, blocking up to timeout seconds until there are some
+
+        Returns (events, missed, last_seq); missed is True when events
+        after since were already dropped from the buffer.
+        """
+        if since == self.snapshot[0] and timeout > 0:
+            waiter = threading.Lock()
+            waiter.acquire()
+            with self._lock:
+                waiting = since == self.snapshot[0]
+                if waiting:
+                    self._waiters.add(waiter)
+            if waiting and not waiter.acquire(timeout=timeout):
+                with self._lock:
+                    self._waiters.discard(waiter)
+        return self._events_after(since)
+
+    async def wait_async(self, since, timeout):
+        """wait() for coroutines - suspends instead of blocking the thread"""
+        if since == self.snapshot[0] and timeout > 0:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self._lock:
+                waiting = since == self.snapshot[0]
+                if waiting:
+                    self._async_waiters.setdefault(loop, []).append(future)
+            if waiting:
+                try:
+                    await asyncio.wait_for(future, timeout)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    if not future.done() or future.cancelled():
+                        self._forget(loop, future)
+        return self._events_after(since)
+
+    def _forget(self, loop, future):
+        """Drop a timed out or cancelled waiter, so publish() never calls into a loop that may be closed"""
+        with self._lock:
+            futures = self._async_waiters.get(loop)
+            if futures is not None and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self._async_waiters[loop]
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self._publish_snapshot()
+
+
+_channels = {}
+_channels_lock = threading.Lock()
+
+
+def channel(restaurant_id):
+    """The restaurant's channel, created on first use"""
+    with _channels_lock:
+        found = _channels.get(restaurant_id)
+        if found is None:
+            found = _channels[restaurant_id] = Channel()
+        return found
+
+
+def publish_order(event_type, order):
+    """Publish an order event to its restaurant's subscribers"""
+    channel(order.restaurant_id).publish(event_type, to_dict(order))
+
+
+def parse_cursor(since, last_event_id=None):
+    """The since cursor from ?since= or an SSE Last-Event-ID header, as (since, error_msg)"""
+    if since is None:
+        since = last_event_id if last_event_id is not None else 0
+    try:
+        since = int(since)
+    except ValueError:
+        return None, "since must be an integer"
+    if since < 0:
+        return None, "since must not be negative"
+    return since, None
+
+
+def parse_timeout(timeout):
+    """Long-poll wait in seconds from ?timeout=, clamped to 0..MAX_WAIT_SECONDS"""
+    try:
+        timeout = float(timeout) if timeout is not None else DEFAULT_WAIT_SECONDS
+    except ValueError:
+        timeout = DEFAULT_WAIT_SECONDS
+    return max(0, min(timeout, MAX_WAIT_SECONDS))
+
+
+def poll_result(since, events, missed, last_seq):
+    """Long-poll response body"""
+    return {
+        "events": events,
+        "missed": missed,
+        "next_since": events[-1]['seq'] if events else (last_seq if missed else since)
+    }
+
+
+def sse_messages(since, events, missed, last_seq, dumps=json.dumps):
+    """(SSE text for one wait() result, the cursor to wait from next) - orders encoded by dumps"""
+    parts = []
+    if missed:
+        # Older events are gone - the dashboard should reload its order list
+        since = events[0]['seq'] - 1 if events else last_seq
+        parts.append(f"id: {since}\nevent: resync\ndata: {{}}\n\n")
+    for event in events:
+        parts.append(f"id: {event['seq']}\nevent: {event['type']}\ndata: {dumps(event['order'])}\n\n")
+        since = event['seq']
+    if not parts:
+        # Keeps proxies from closing the connection and detects gone clients
+        parts.append(": heartbeat\n\n")
+    return ''.join(parts), since
+
+
+def sse_events(restaurant_id, since, dumps=json.dumps):
+    """Yield Server-Sent Events for every event after since, with heartbeat comments while idle"""
+    feed = channel(restaurant_id)
+    while True:
+        message, since = sse_messages(since, *feed.wait(since, HEARTBEAT_SECONDS), dumps)
+        yield message
+
+
+def reset():
+    """Drop buffered events - sequence numbers keep counting so old cursors stay valid"""
+    with _channels_lock:
+        channels = list(_channels.values())
+    for each in channels:
+        each.clear()
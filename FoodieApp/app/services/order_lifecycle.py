@@ -0,0 +1,44 @@
+"""
+Order lifecycle - validated status transitions
+
+pending -> accepted -> preparing -> dispatched -> delivered, with
+cancellation allowed until the order is dispatched. The allowed moves
+are records.ORDER_TRANSITIONS; data_store.save_order moves the order
+between the restaurant's status queues.
+"""
+
+import threading
+import time
+
+from app.models import data_store, order_index
+from app.models.records import ACTIVE_ORDER_STATUSES, ORDER_TRANSITIONS
+from app.services import order_feed
+
+# Serializes check-and-set so two concurrent transitions cannot both succeed
+_lock = threading.Lock()
+
+
+def transition(order_id, new_status):
+    """Move an order to new_status, returning (order, error_msg) - order is None if it is gone"""
+    with _lock:
+        # The order may have been deleted since the caller looked it up
+        order = data_store.orders.get(order_id)
+        if order is None:
+            return None, "Order not found"
+        if new_status not in ORDER_TRANSITIONS[order.status]:
+            allowed = ', '.join(ORDER_TRANSITIONS[order.status]) or 'none'
+            return order, f"Cannot move order from {order.status} to {new_status} (allowed: {allowed})"
+        order.status = new_status
+        order.updated_at = time.time()
+        data_store.save_order(order)
+        order_feed.publish_order('order_status', order)
+    return order, None
+
+
+def active_orders(restaurant_id, statuses=ACTIVE_ORDER_STATUSES):
+    """status -> the restaurant's orders in that status, oldest first, skipping any deleted meanwhile"""
+    orders_by_status = {}
+    for status in statuses:
+        orders = map(data_store.orders.get, order_index.get_queued_order_ids(restaurant_id, status))
+        orders_by_status[status] = [order for order in orders if order is not None]
+    return orders_by_status
@@ -0,0 +1,98 @@
+"""
+Pagination utilities for list endpoints
+"""
+
+from bisect import bisect_right
+
+from flask import Response, current_app, jsonify, request
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+STREAM_CHUNK = 500
+
+
+def parse_page_args(args):
+    """Read after_id and limit query args, returning (after_id, limit, error_msg)"""
+    try:
+        after_id = int(args.get('after_id', 0))
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return None, None, "after_id and limit must be integers"
+    if limit < 1 or limit > MAX_LIMIT:
+        return None, None, f"limit must be between 1 and {MAX_LIMIT}"
+    return after_id, limit, None
+
+
+def parse_limit(args, default, maximum):
+    """Read the limit query arg on its own, returning (limit, error_msg)"""
+    try:
+        limit = int(args.get('limit', default))
+    except ValueError:
+        return None, "limit must be an integer"
+    if limit < 1 or limit > maximum:
+        return None, f"limit must be between 1 and {maximum}"
+    return limit, None
+
+
+def page_ids(ids, after_id, limit):
+    """The next limit ids after after_id from an ascending id list"""
+    start = bisect_right(ids, after_id)
+    return ids[start:start + limit]
+
+
+def _stream_ndjson(fetch_page, cursor_key, after_id, limit, dumps_bytes):
+    """Yield one JSON line per item, fetching STREAM_CHUNK items at a time"""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        chunk = STREAM_CHUNK if remaining is None else min(STREAM_CHUNK, remaining)
+        items = fetch_page(after_id, chunk)
+        for item in items:
+            yield dumps_bytes(item) + b'\n'
+        if len(items) < chunk:
+            return
+        after_id = items[-1][cursor_key]
+        if remaining is not None:
+            remaining -= len(items)
+
+
+def list_response(key, fetch_page, cursor_key='id'):
+    """Serve a list endpoint
+
+    fetch_page(after_id, limit) must return up to limit items whose
+    cursor_key is greater than after_id, in ascending cursor order.
+
+    - ?format=ndjson streams every item (or the first limit) as NDJSON
+      in constant memory
+    - ?after_id= and/or ?limit= return one page plus the next cursor
+    - otherwise the whole list is returned as a JSON array, as before
+    """
+    paginated = 'after_id' in request.args or 'limit' in request.args
+    streaming = request.args.get('format') == 'ndjson'
+
+    if not paginated and not streaming:
+        items = []
+        after_id = 0
+        while True:
+            page = fetch_page(after_id, MAX_LIMIT)
+            items.extend(page)
+            if len(page) < MAX_LIMIT:
+                return jsonify(items), 200
+            after_id = page[-1][cursor_key]
+
+    after_id, limit, error_msg = parse_page_args(request.args)
+    if error_msg:
+        return jsonify({"error": error_msg}), 400
+
+    if streaming:
+        stream_limit = limit if 'limit' in request.args else None
+        # The app's JSON provider is looked up now - the stream runs after the request context is gone
+        return Response(_stream_ndjson(fetch_page, cursor_key, after_id, stream_limit, current_app.json.dumps_bytes),
+                        mimetype='application/x-ndjson'), 200
+
+    items = fetch_page(after_id, limit)
+    next_after_id = items[-1][cursor_key] if len(items) == limit else None
+    return jsonify({
+        key: items,
+        "count": len(items),
+        "next_after_id": next_after_id
+    }), 200
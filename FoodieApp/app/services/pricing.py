@@ -0,0 +1,73 @@
+"""
+Order pricing - resolves cart lines against the restaurant's price table
+
+Totals are always computed server-side. Every dish in the cart must
+belong to the ordering restaurant and be enabled; the lines are resolved
+with one lookup each against the restaurant's cached price table, so
+pricing a cart costs O(lines) whatever the size of the menu.
+"""
+
+from operator import mul
+
+from app.models import data_store
+from app.models.records import OrderLine
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_cart(items):
+    """Split cart items into (dish_ids, quantities, error_msg)"""
+    dish_ids = []
+    quantities = []
+    for position, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            return None, None, f"Dish {position} must be an object"
+        dish_id = item.get('dish_id')
+        quantity = item.get('quantity', 1)
+        if not _is_int(dish_id):
+            return None, None, f"Dish {position}: dish_id must be an integer"
+        if not _is_int(quantity) or quantity < 1:
+            return None, None, f"Dish {position}: quantity must be a positive integer"
+        dish_ids.append(dish_id)
+        quantities.append(quantity)
+    return dish_ids, quantities, None
+
+
+def _unavailable_dish_error(restaurant_id, table, dish_ids):
+    """Error message for the first dish that cannot be ordered"""
+    for dish_id in dish_ids:
+        entry = table.get(dish_id)
+        if entry is None:
+            dish = data_store.dishes.get(dish_id)
+            if dish is not None and dish.restaurant_id != restaurant_id:
+                return f"Dish {dish_id} belongs to another restaurant"
+            return f"Dish {dish_id} not found"
+        if not entry[2]:
+            return f"Dish {dish_id} is not available"
+        if entry[1] is None:
+            return f"Dish {dish_id} has no valid price"
+    return None
+
+
+def price_order(restaurant_id, items):
+    """Price a cart for a restaurant, returning (lines, total, error_msg)"""
+    dish_ids, quantities, error_msg = parse_cart(items)
+    if error_msg:
+        return None, None, error_msg
+
+    table = data_store.get_price_table(restaurant_id)
+    entries = list(map(table.get, dish_ids))
+    if None in entries or not all(entry[2] and entry[1] is not None for entry in entries):
+        return None, None, _unavailable_dish_error(restaurant_id, table, dish_ids)
+
+    names, prices, _ = zip(*entries)
+    line_totals = list(map(mul, prices, quantities))
+    total = sum(line_totals)
+    if isinstance(total, float):
+        # Prices are currency amounts - keep cents, drop float noise
+        line_totals = [round(line_total, 2) for line_total in line_totals]
+        total = round(total, 2)
+    lines = list(map(OrderLine, dish_ids, quantities, names, prices, line_totals))
+    return lines, total, None
@@ -0,0 +1,298 @@
+"""
+Rate limiting and admission control
+
+Token buckets, one per client and named limit, refill at `rate` tokens
+a second up to `burst`; a request takes one token or gets a 429 with a
+Retry-After header. Clients are told apart by their remote address, or
+by their X-API-Key header when it is one of the keys in FOODIE_API_KEYS -
+any other key is ignored, so a client cannot dodge its limit by sending
+a new key with every request. Limits apply to a route
+(@rate_limited('search')) or a whole blueprint
+(limit_blueprint(catalog_bp, 'catalog')).
+
+Buckets live in this process by default. Set FOODIE_RATE_LIMIT_DB to an
+SQLite path to share them between worker processes.
+
+Admission control caps how many requests of one kind run at once
+(@admission_controlled('search')): past the cap a request gets a 503
+straight away rather than queueing behind the others, so a flood of
+searches cannot take every worker thread.
+
+Both are configured from the environment, e.g.
+
+    FOODIE_RATE_LIMITS=search=20:40,catalog=2:5   (tokens/s:burst, 0 disables)
+    FOODIE_MAX_IN_FLIGHT=search=16                (0 disables)
+    FOODIE_API_KEYS=partner-key-1,partner-key-2
+
+and counted on /metrics.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, request
+
+# name -> (tokens per second, burst)
+DEFAULT_LIMITS = {
+    'search': (20.0, 40),
+    'catalog': (2.0, 10),
+    'login': (1.0, 10),
+    # Per target account rather than per client, so spreading guesses over addresses does not help
+    'login_account': (0.1, 5)
+}
+
+# name -> most requests running at once
+DEFAULT_MAX_IN_FLIGHT = {
+    'search': 16
+}
+
+# Idle buckets are dropped once the memory store holds this many
+MAX_MEMORY_BUCKETS = 100000
+
+SHED_RETRY_AFTER_SECONDS = 1
+
+
+def _take_token(tokens, updated, rate, burst, now):
+    """Refill a bucket and try to take a token - returns (allowed, tokens left, seconds until the next token)"""
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Token buckets in a dict, for a single process"""
+
+    def __init__(self, max_buckets=MAX_MEMORY_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (burst, now, None))
+            allowed, tokens, retry_after = _take_token(tokens, updated, rate, burst, now)
+            # Kept with the seconds the bucket takes to refill from empty, for _prune
+            self._buckets[key] = (tokens, now, burst / rate)
+            if len(self._buckets) > self.max_buckets:
+                self._prune(now)
+            return allowed, retry_after
+
+    def _prune(self, now):
+        """Drop buckets idle long enough to have refilled under their own limit - they behave like new ones"""
+        for key in [key for key, (_, updated, full_after) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBucketStore:
+    """Token buckets in an SQLite table shared by every worker process
+
+    Each take is one IMMEDIATE transaction, so two processes can never
+    spend the same token.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.connection().execute("CREATE TABLE IF NOT EXISTS rate_buckets "
+                                  "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst):
+        conn = self.connection()
+        # Wall-clock time - monotonic clocks are not comparable across processes
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row is not None else (burst, now)
+            allowed, tokens, retry_after = _take_token(tokens, updated, rate, burst, now)
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def clear(self):
+        self.connection().execute("DELETE FROM rate_buckets")
+
+
+class RateLimit:
+    """One named limit and its decision counters"""
+
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.allowed = 0
+        self.limited = 0
+
+
+class AdmissionGate:
+    """Non-blocking cap on the requests of one kind running at once"""
+
+    def __init__(self, name, max_in_flight):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        """Admit a request, or return False if max_in_flight are already running"""
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+def _parse_settings(value):
+    """'search=20:40,catalog=2' -> {'search': ['20', '40'], 'catalog': ['2']}"""
+    settings = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            name, numbers = item.split('=', 1)
+            settings[name.strip()] = numbers.strip().split(':')
+    return settings
+
+
+def _build_limits():
+    configured = dict(DEFAULT_LIMITS)
+    for name, numbers in _parse_settings(os.environ.get('FOODIE_RATE_LIMITS')).items():
+        rate = float(numbers[0])
+        burst = int(numbers[1]) if len(numbers) > 1 else max(1, math.ceil(rate))
+        configured[name] = (rate, burst)
+    return {name: RateLimit(name, rate, burst) for name, (rate, burst) in configured.items()}
+
+
+def _build_gates():
+    configured = dict(DEFAULT_MAX_IN_FLIGHT)
+    for name, numbers in _parse_settings(os.environ.get('FOODIE_MAX_IN_FLIGHT')).items():
+        configured[name] = int(numbers[0])
+    return {name: AdmissionGate(name, max_in_flight) for name, max_in_flight in configured.items()}
+
+
+def _build_api_keys():
+    return frozenset(key.strip() for key in os.environ.get('FOODIE_API_KEYS', '').split(',') if key.strip())
+
+
+def _build_store():
+    path = os.environ.get('FOODIE_RATE_LIMIT_DB')
+    return SQLiteBucketStore(path) if path else MemoryBucketStore()
+
+
+limits = _build_limits()
+gates = _build_gates()
+store = _build_store()
+api_keys = _build_api_keys()
+_counter_lock = threading.Lock()
+
+
+def client_key():
+    """The known API key a request presents, or its remote address"""
+    api_key = request.headers.get('X-API-Key')
+    if api_key in api_keys:
+        return 'key:' + api_key
+    return 'ip:' + (request.remote_addr or 'unknown')
+
+
+def check_rate(name, subject=None):
+    """None if the client may make a request under limit name, else a 429 response
+
+    subject, when given, keys the bucket instead of the client - e.g. the
+    account a login attempt targets.
+    """
+    limit = limits.get(name)
+    if limit is None or limit.rate <= 0:
+        return None
+    allowed, retry_after = store.take(f"{name}|{subject or client_key()}", limit.rate, limit.burst)
+    with _counter_lock:
+        if allowed:
+            limit.allowed += 1
+        else:
+            limit.limited += 1
+    if allowed:
+        return None
+    seconds = max(1, math.ceil(retry_after))
+    return jsonify({"error": "Rate limit exceeded", "retry_after": seconds}), 429, {'Retry-After': str(seconds)}
+
+
+def rate_limited(name):
+    """Apply limit name to a view"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            rejection = check_rate(name)
+            if rejection is not None:
+                return rejection
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def limit_blueprint(blueprint, name):
+    """Apply limit name to every route of a blueprint"""
+    blueprint.before_request(lambda: check_rate(name))
+
+
+def admission_controlled(name):
+    """Shed a view's requests with a 503 while its gate is full"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            gate = gates.get(name)
+            if gate is None or gate.max_in_flight <= 0:
+                return view(*args, **kwargs)
+            if not gate.enter():
+                return (jsonify({"error": "Server busy, try again shortly"}), 503,
+                        {'Retry-After': str(SHED_RETRY_AFTER_SECONDS)})
+            try:
+                return view(*args, **kwargs)
+            finally:
+                gate.leave()
+        return wrapper
+    return decorator
+
+
+def stats():
+    """Decision counters per limit and gate"""
+    with _counter_lock:
+        limit_stats = {name: {"rate": limit.rate, "burst": limit.burst, "allowed": limit.allowed,
+                              "limited": limit.limited}
+                       for name, limit in limits.items()}
+    gate_stats = {name: {"max_in_flight": gate.max_in_flight, "in_flight": gate.in_flight,
+                         "admitted": gate.admitted, "shed": gate.shed}
+                  for name, gate in gates.items()}
+    return {"limits": limit_stats, "gates": gate_stats}
+
+
+def reset():
+    """Refill every bucket"""
+    store.clear()
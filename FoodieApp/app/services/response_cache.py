@@ -0,0 +1,123 @@
+"""
+Response cache for read-heavy endpoints
+
+Responses are cached per path and normalized query args, tagged with the
+data store's catalog_version. Any write that can change a cached answer
+bumps that version, so stale entries are never served; LRU order and a
+TTL bound the memory used. Every cached response carries an ETag, and a
+matching If-None-Match gets a 304 without a body.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from app.models import data_store
+
+CAPACITY = 1024
+TTL_SECONDS = 30
+
+
+class ResponseCache:
+    """LRU + TTL cache of serialized response bodies"""
+
+    def __init__(self, capacity=CAPACITY, ttl=TTL_SECONDS):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        """Cached (body, mimetype, etag) for key if it is still current, else None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_version, expires_at, body, mimetype, etag = entry
+            if entry_version != version or expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body, mimetype, etag
+
+    def put(self, key, version, body, mimetype, etag):
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, body, mimetype, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "ttl_seconds": self.ttl,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0
+        }
+
+
+cache = ResponseCache()
+
+
+def _cache_key():
+    """Path plus sorted query args with empty values dropped
+
+    Values are case-folded because every cached endpoint matches its
+    query args case-insensitively.
+    """
+    args = sorted((key, value.strip().lower()) for key, value in request.args.items(multi=True)
+                  if value.strip())
+    return request.path, tuple(args)
+
+
+def cached_response(view):
+    """Serve a GET view from the response cache"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = _cache_key()
+        # Read the version before running the view so a concurrent write can never be cached as current
+        version = data_store.catalog_version
+        entry = cache.get(key, version)
+
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data()
+            etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+            cache.put(key, version, body, response.mimetype, etag)
+        else:
+            body, mimetype, etag = entry
+            response = Response(body, status=200, mimetype=mimetype)
+
+        response.set_etag(etag)
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            cache.record_not_modified()
+        return response
+    return wrapper
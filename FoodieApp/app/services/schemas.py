@@ -0,0 +1,213 @@
+"""
+Declarative request schemas compiled into validator functions
+
+A Schema lists a payload's fields - String, Integer, Number, Boolean or
+List, each optionally required, nullable, bounded or pattern-checked -
+plus pairs of fields that must be given together. Building a Schema
+generates the source of two functions specialised to its fields and
+compiles them once:
+
+    schema.validate(data)        every problem with one payload, [] if valid
+    schema.validate_batch(rows)  (index, problem) pairs for a list of payloads
+
+Every check is inlined as straight-line code, with exact type tests on
+the values json.loads produces, so there is no per-field interpretation
+of the schema at request time, and validate_batch runs all of it inside
+a single loop rather than calling a validator per row.
+"""
+
+import copy
+import math
+import re
+
+_MISSING = object()
+
+
+class Field:
+    """One payload field
+
+    required fields may not be missing or null (nor blank, for strings);
+    nullable optional fields accept null. minimum/maximum bound numbers,
+    nonempty rejects empty strings and lists, pattern is a regex strings
+    must match, items is the Field type or Schema every element of a list
+    must pass.
+    message replaces the type, bound and format error messages.
+    """
+
+    type_name = None
+    # Python expression that is true when {v} has the wrong type
+    type_check = None
+
+    def __init__(self, required=False, nullable=False, minimum=None, maximum=None, nonempty=False,
+                 pattern=None, items=None, message=None):
+        self.required = required
+        self.nullable = nullable
+        self.minimum = minimum
+        self.maximum = maximum
+        self.nonempty = nonempty
+        self.pattern = re.compile(pattern) if pattern is not None else None
+        self.items = items
+        self.message = message
+
+
+class String(Field):
+    type_name = 'a string'
+    type_check = '{v}.__class__ is not str'
+
+
+class Integer(Field):
+    type_name = 'an integer'
+    type_check = '{v}.__class__ is not int'
+
+
+class Number(Field):
+    type_name = 'a number'
+    type_check = '{v}.__class__ is not int and ({v}.__class__ is not float or not _isfinite({v}))'
+
+
+class Boolean(Field):
+    type_name = 'a boolean'
+    type_check = '{v}.__class__ is not bool'
+
+
+class List(Field):
+    type_name = 'a list'
+    type_check = '{v}.__class__ is not list'
+
+
+class _Generator:
+    """Source lines of one generated function, plus the objects they refer to"""
+
+    def __init__(self, namespace):
+        self.lines = []
+        self.namespace = namespace
+
+    def emit(self, depth, line):
+        self.lines.append('    ' * depth + line)
+
+    def constant(self, value):
+        """Name bound to value in the generated functions' globals"""
+        name = f"_c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+
+def _message(template, name, prefix):
+    """Code for a message naming a field - prefix is the code for its path in an enclosing list, if any"""
+    before, after = template.split('{name}')
+    if prefix is None:
+        return repr(before + name + after)
+    parts = [repr(before)] if before else []
+    return ' + '.join(parts + [prefix, repr(name + after)])
+
+
+def _emit_field(gen, depth, level, name, field, report, prefix):
+    """Inline the checks of one field - report(code) is the code that records a message"""
+    value = f"value{level}"
+    gen.emit(depth, f"{value} = get{level}({name!r}, _MISSING)")
+    absent = [f"{value} is _MISSING"]
+    if field.required or field.nullable:
+        absent.append(f"{value} is None")
+    if field.required and isinstance(field, String):
+        absent.append(f"{value} == ''")
+    gen.emit(depth, f"if {' or '.join(absent)}:")
+    if field.required:
+        gen.emit(depth + 1, report(_message('Missing required field: {name}', name, prefix)))
+    else:
+        gen.emit(depth + 1, 'pass')
+
+    def fail(template, condition):
+        message = repr(field.message) if field.message else _message(template, name, prefix)
+        gen.emit(depth, f"elif {condition}:")
+        gen.emit(depth + 1, report(message))
+
+    fail('{name} must be ' + field.type_name, field.type_check.format(v=value))
+    if field.minimum is not None and field.maximum is not None:
+        fail(f'{{name}} must be between {field.minimum} and {field.maximum}',
+             f"not {field.minimum!r} <= {value} <= {field.maximum!r}")
+    elif field.minimum is not None:
+        fail(f'{{name}} must be at least {field.minimum}', f"{value} < {field.minimum!r}")
+    elif field.maximum is not None:
+        fail(f'{{name}} must be at most {field.maximum}', f"{value} > {field.maximum!r}")
+    if field.nonempty:
+        fail('{name} must not be empty', f"not {value}")
+    if field.pattern is not None:
+        fail('{name} is not valid', f"{gen.constant(field.pattern)}.match({value}) is None")
+    if isinstance(field.items, Field):
+        fail('every item of {name} must be ' + field.items.type_name,
+             f"any({field.items.type_check.format(v='element')} for element in {value})")
+    elif field.items is not None:
+        # The item schema's checks run inline in a loop over the list
+        position, item = f"position{level}", f"item{level + 1}"
+        path = f"{prefix} + {name!r}" if prefix is not None else repr(name)
+        item_prefix = f"{path} + '[' + str({position}) + '].'"
+        gen.emit(depth, 'else:')
+        gen.emit(depth + 1, f"for {position}, {item} in enumerate({value}):")
+        gen.emit(depth + 2, f"if {item}.__class__ is not dict:")
+        gen.emit(depth + 3, report(f"{path} + '[' + str({position}) + '] must be an object'"))
+        gen.emit(depth + 3, 'continue')
+        _emit_checks(gen, depth + 2, level + 1, item, field.items, report, item_prefix)
+
+
+def _emit_checks(gen, depth, level, data, schema, report, prefix=None):
+    gen.emit(depth, f"get{level} = {data}.get")
+    for name, field in schema.fields.items():
+        _emit_field(gen, depth, level, name, field, report, prefix)
+    for first, second in schema.together:
+        gen.emit(depth, f"if (get{level}({first!r}) is None) is not (get{level}({second!r}) is None):")
+        gen.emit(depth + 1, report(_message('{name} must be given together', f"{first} and {second}", prefix)))
+
+
+class Schema:
+    """Fields of one kind of payload, compiled into validate() and validate_batch()"""
+
+    def __init__(self, fields, together=()):
+        self.fields = dict(fields)
+        # (first, second) pairs that must both be set or both be missing/null
+        self.together = [tuple(pair) for pair in together]
+        self.source = self._compile()
+
+    def extend(self, fields):
+        """A new schema with extra fields"""
+        return Schema({**self.fields, **fields}, self.together)
+
+    def partial(self):
+        """A new schema for partial updates: any field may be left out, but one that is given
+        must be valid, and required ones may not be null or blank"""
+        fields = {}
+        for name, field in self.fields.items():
+            field = copy.copy(field)
+            if field.required:
+                field.required = False
+                # Not nullable, so null fails the type check; blank strings fail nonempty
+                field.nonempty = field.nonempty or isinstance(field, String)
+            fields[name] = field
+        return Schema(fields, self.together)
+
+    def _compile(self):
+        namespace = {'_MISSING': _MISSING, '_isfinite': math.isfinite}
+        gen = _Generator(namespace)
+
+        gen.emit(0, 'def validate(data):')
+        gen.emit(1, 'if data.__class__ is not dict:')
+        gen.emit(2, "return ['Request body must be an object']")
+        gen.emit(1, 'errors = []')
+        gen.emit(1, 'append = errors.append')
+        _emit_checks(gen, 1, 0, 'data', self, lambda message: f"append({message})")
+        gen.emit(1, 'return errors')
+
+        gen.emit(0, 'def validate_batch(rows):')
+        gen.emit(1, 'errors = []')
+        gen.emit(1, 'append = errors.append')
+        gen.emit(1, 'for index, data in enumerate(rows):')
+        gen.emit(2, 'if data.__class__ is not dict:')
+        gen.emit(3, "append((index, 'Row must be an object'))")
+        gen.emit(3, 'continue')
+        _emit_checks(gen, 2, 0, 'data', self, lambda message: f"append((index, {message}))")
+        gen.emit(1, 'return errors')
+
+        source = '\n'.join(gen.lines) + '\n'
+        exec(compile(source, f"<schema {', '.join(self.fields)}>", 'exec'), namespace)
+        self.validate = namespace['validate']
+        self.validate_batch = namespace['validate_batch']
+        return source
@@ -1,52 +1,114 @@
 """
 Validation utilities for input validation
+
+Request payloads are checked against the schemas below, compiled once at
+import into validator functions (app/services/schemas.py). A validator
+returns every problem with a payload - an empty list when it is valid -
+and each schema's validate_batch() checks a whole bulk upload at once.
 """
 
+import math
 
-def validate_restaurant_data(data):
-    """Validate restaurant registration data"""
-    required_fields = ['name', 'category', 'location', 'contact']
-    for field in required_fields:
-        if field not in data or not data[field]:
-            return False, f"Missing required field: {field}"
-    return True, None
+from app.services.schemas import Boolean, Integer, List, Number, Schema, String
 
 
-def validate_dish_data(data):
-    """Validate dish data"""
-    required_fields = ['name', 'type', 'price']
-    for field in required_fields:
-        if field not in data or data[field] is None:
-            return False, f"Missing required field: {field}"
-    return True, None
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
 
 
-def validate_user_data(data):
-    """Validate user registration data"""
-    required_fields = ['name', 'email', 'password']
-    for field in required_fields:
-        if field not in data or not data[field]:
-            return False, f"Missing required field: {field}"
+def validate_coordinates(data):
+    """Validate optional lat/lon - both or neither, null clears them"""
+    if 'lat' not in data and 'lon' not in data:
+        return True, None
+    lat, lon = data.get('lat'), data.get('lon')
+    if lat is None and lon is None:
+        return True, None
+    if lat is None or lon is None:
+        return False, "lat and lon must be given together"
+    if not _is_number(lat) or not -90 <= lat <= 90:
+        return False, "lat must be a number between -90 and 90"
+    if not _is_number(lon) or not -180 <= lon <= 180:
+        return False, "lon must be a number between -180 and 180"
     return True, None
 
 
-def validate_order_data(data):
-    """Validate order data"""
-    required_fields = ['user_id', 'restaurant_id', 'dishes']
-    for field in required_fields:
-        if field not in data:
-            return False, f"Missing required field: {field}"
-    if not isinstance(data['dishes'], list) or len(data['dishes']) == 0:
-        return False, "Dishes must be a non-empty list"
-    return True, None
+def parse_near(near, radius_km, default_radius_km, max_radius_km):
+    """Parse near=lat,lon and radius_km query args, returning (lat, lon, radius_km, error_msg)"""
+    try:
+        lat, lon = (float(part) for part in near.split(','))
+        radius_km = float(radius_km) if radius_km is not None else default_radius_km
+    except ValueError:
+        return None, None, None, "near must be lat,lon and radius_km a number"
+    is_valid, error_msg = validate_coordinates({'lat': lat, 'lon': lon})
+    if not is_valid:
+        return None, None, None, error_msg
+    if not 0 < radius_km <= max_radius_km:
+        return None, None, None, f"radius_km must be greater than 0 and at most {max_radius_km}"
+    return lat, lon, radius_km, None
 
 
-def validate_rating_data(data):
-    """Validate rating data"""
-    required_fields = ['order_id', 'rating']
-    for field in required_fields:
-        if field not in data:
-            return False, f"Missing required field: {field}"
-    if not isinstance(data['rating'], (int, float)) or data['rating'] < 1 or data['rating'] > 5:
-        return False, "Rating must be between 1 and 5"
-    return True, None
+restaurant_schema = Schema({
+    # The name is a unique key, so a blank one is refused rather than claimed
+    'name': String(required=True, nonempty=True),
+    'category': String(required=True),
+    'location': String(required=True),
+    'contact': String(required=True),
+    'images': List(items=String()),
+    'lat': Number(nullable=True, minimum=-90, maximum=90, message="lat must be a number between -90 and 90"),
+    'lon': Number(nullable=True, minimum=-180, maximum=180, message="lon must be a number between -180 and 180")
+}, together=[('lat', 'lon')])
+
+dish_schema = Schema({
+    'name': String(required=True),
+    'type': String(required=True),
+    'price': Number(required=True, minimum=0),
+    'available_time': String(),
+    'image': String()
+})
+
+# PUT updates some of the fields; PATCH may also set the flags
+restaurant_update_schema = restaurant_schema.partial()
+restaurant_patch_schema = restaurant_update_schema.extend({'enabled': Boolean(), 'approved': Boolean()})
+
+dish_update_schema = dish_schema.partial()
+
+# Bulk dish uploads name each row's restaurant
+dish_import_schema = dish_schema.extend({'restaurant_id': Integer(required=True)})
+
+user_schema = Schema({
+    'name': String(required=True),
+    'email': String(required=True, pattern=r'[^@\s]+@[^@\s]+\.[^@\s]+$', message="email must be a valid email address"),
+    'password': String(required=True)
+})
+
+login_schema = Schema({
+    'email': String(required=True),
+    'password': String(required=True)
+})
+
+order_line_schema = Schema({
+    'dish_id': Integer(required=True),
+    'quantity': Integer(minimum=1)
+})
+
+order_schema = Schema({
+    'user_id': Integer(required=True),
+    'restaurant_id': Integer(required=True),
+    'dishes': List(required=True, nonempty=True, items=order_line_schema, message="Dishes must be a non-empty list")
+})
+
+rating_schema = Schema({
+    'order_id': Integer(required=True),
+    'rating': Number(required=True, minimum=1, maximum=5, message="Rating must be between 1 and 5"),
+    'comment': String()
+})
+
+validate_restaurant_data = restaurant_schema.validate
+validate_restaurant_update_data = restaurant_update_schema.validate
+validate_restaurant_patch_data = restaurant_patch_schema.validate
+validate_dish_data = dish_schema.validate
+validate_dish_update_data = dish_update_schema.validate
+validate_user_data = user_schema.validate
+validate_login_data = login_schema.validate
+validate_order_data = order_schema.validate
+validate_rating_data = rating_schema.validate
@@ -0,0 +1,209 @@
+"""
+ASGI Benchmark - threaded WSGI server vs the ASGI entry point under many connections
+
+Starts each server in its own process on a free port, seeds it with
+restaurants through the bulk import endpoint, then opens N concurrent
+client connections that each send GET requests back to back (restaurant
+lookups and searches) for a fixed duration. uvicorn keeps connections
+alive; the werkzeug server closes each one after its response, so those
+clients reconnect per request, as real clients of it would. Optionally parks some
+connections in order feed long-polls first, the way open dashboards
+would sit on the server.
+
+Reports requests per second and latency percentiles per server.
+
+Usage:
+    python benchmarks/bench_asgi.py [--connections 1000] [--seconds 10] [--idle-pollers 500]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from common import CATEGORIES, LOCATIONS, WORDS, percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'wsgi': [sys.executable, '-c',
+             "import logging, sys; from werkzeug.serving import WSGIRequestHandler; "
+             "logging.getLogger('werkzeug').setLevel(logging.ERROR); "
+             "WSGIRequestHandler.protocol_version = 'HTTP/1.1'; "
+             "from app import create_app; create_app().run(port=int(sys.argv[1]), threaded=True)"],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--log-level', 'error', '--backlog', '4096', '--port'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def request(reader, writer, method, path, body=b'', content_type='application/json'):
+    """One HTTP/1.1 request, returning (status, body, keep_alive)"""
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+    if body:
+        head += f"Content-Type: {content_type}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    status_line = await reader.readline()
+    length = 0
+    chunked = False
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+        elif name == 'connection' and 'close' in value.lower():
+            keep_alive = False
+    if chunked:
+        parts = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            parts.append(await reader.readexactly(size + 2))
+            if size == 0:
+                break
+        payload = b''.join(part[:-2] for part in parts)
+    else:
+        payload = await reader.readexactly(length)
+    return int(status_line.split()[1]), payload, keep_alive
+
+
+async def open_connection(port, attempts=50):
+    for _ in range(attempts):
+        try:
+            return await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"could not connect to port {port}")
+
+
+def next_path(rng, restaurant_count):
+    if rng.random() < 0.6:
+        return f"/api/v1/restaurants/{rng.randint(1, restaurant_count)}"
+    return f"/api/v1/restaurants/search?name={rng.choice(WORDS).lower()}&location={rng.choice(LOCATIONS)}&limit=10"
+
+
+async def seed_server(port, restaurant_count):
+    rng = random.Random(42)
+    rows = '\n'.join(json.dumps({"name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                                 "category": rng.choice(CATEGORIES), "location": rng.choice(LOCATIONS),
+                                 "contact": f"{9000000000 + i}"}) for i in range(restaurant_count))
+    reader, writer = await open_connection(port)
+    await request(reader, writer, 'POST', '/reset')
+    writer.close()
+    reader, writer = await open_connection(port)
+    status, body, _ = await request(reader, writer, 'POST', '/api/v1/restaurants/bulk', rows.encode(),
+                                    content_type='application/x-ndjson')
+    writer.close()
+    if status != 201:
+        raise RuntimeError(f"seeding failed with {status}: {body[:200]}")
+
+
+async def idle_poller(port, stop):
+    """Sit in order feed long-polls until stop is set"""
+    try:
+        while not stop.is_set():
+            reader, writer = await open_connection(port)
+            keep_alive = True
+            while keep_alive and not stop.is_set():
+                _, _, keep_alive = await request(reader, writer, 'GET', '/api/v1/restaurants/1/orders/feed?timeout=60')
+            writer.close()
+    except (OSError, asyncio.IncompleteReadError, asyncio.CancelledError):
+        return
+
+
+async def client(port, restaurant_count, deadline, seed, latencies, errors):
+    rng = random.Random(seed)
+    writer = None
+    try:
+        while time.perf_counter() < deadline:
+            # Latency includes reconnecting when the server closed the connection
+            started = time.perf_counter()
+            if writer is None:
+                reader, writer = await open_connection(port)
+            status, _, keep_alive = await request(reader, writer, 'GET', next_path(rng, restaurant_count))
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                writer = None
+    except (OSError, RuntimeError, asyncio.IncompleteReadError, ValueError, IndexError):
+        errors.append('connection')
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def run_load(port, args):
+    await seed_server(port, args.restaurants)
+    stop = asyncio.Event()
+    pollers = [asyncio.ensure_future(idle_poller(port, stop)) for _ in range(args.idle_pollers)]
+    await asyncio.sleep(1 if pollers else 0)
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    await asyncio.gather(*(client(port, args.restaurants, deadline, seed, latencies, errors)
+                           for seed in range(args.connections)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for poller in pollers:
+        poller.cancel()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "errors": len(errors),
+    }
+
+
+def bench_server(name, args):
+    port = free_port()
+    env = dict(os.environ, FOODIE_ASGI_THREADS=str(args.threads))
+    process = subprocess.Popen(SERVERS[name] + [str(port)], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return asyncio.run(run_load(port, args))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--restaurants', type=int, default=5000)
+    parser.add_argument('--idle-pollers', type=int, default=0,
+                        help="connections parked in order feed long-polls during the run")
+    parser.add_argument('--threads', type=int, default=32, help="FOODIE_ASGI_THREADS for the ASGI server")
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+    args = parser.parse_args()
+
+    print(f"{args.connections} connections for {args.seconds:.0f}s, "
+          f"{args.idle_pollers} idle pollers, {args.restaurants} restaurants")
+    for name in args.servers:
+        result = bench_server(name, args)
+        print(f"{name:5s} {result['rps']:8.0f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+              f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}  ({result['requests']} requests)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Auth Benchmark - registrations/s and login latency with the password hashing pool
+
+Registers users and then logs them in through the Flask routes from
+`threads` client threads, for several hashing pool sizes. Requests the
+pool turns away (503, its queue is full) are counted separately from
+the ones served. The login rate limits are switched off for the run.
+
+Usage:
+    python benchmarks/bench_auth.py [users] [threads] [algorithm] [cost]
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ['FOODIE_RATE_LIMITS'] = 'login=0,login_account=0'
+
+from common import percentile
+
+from app import create_app
+from app.models import data_store
+from app.services import auth
+
+POOL_SIZES = (1, 2, 4, 8)
+
+
+def run(app, users, threads):
+    """(registrations/s, rejected registrations, login p50 ms, login p99 ms, rejected logins)"""
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        return local.client
+
+    def register(i):
+        return client().post('/api/v1/users/register', json={
+            "name": f"Bench {i}", "email": f"bench{i}@example.com", "password": f"password-{i}"}).status_code
+
+    def login(i):
+        start = time.perf_counter()
+        status = client().post('/api/v1/users/login', json={
+            "email": f"bench{i}@example.com", "password": f"password-{i}"}).status_code
+        return status, (time.perf_counter() - start) * 1000
+
+    data_store.reset_data()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(register, range(users)))
+    elapsed = time.perf_counter() - start
+    registered = statuses.count(201)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(login, [i for i, status in enumerate(statuses) if status == 201]))
+    timings = sorted(ms for status, ms in results if status == 200)
+    return (registered / elapsed, statuses.count(503), percentile(timings, 0.5), percentile(timings, 0.99),
+            sum(1 for status, _ in results if status == 503))
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    algorithm = sys.argv[3] if len(sys.argv) > 3 else 'scrypt'
+    cost = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    app = create_app()
+
+    print(f"{users} users, {threads} client threads, {algorithm} cost "
+          f"{cost or auth.DEFAULT_COSTS[algorithm]}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'registrations/s':>16} {'rejected':>9} {'login p50':>10} {'login p99':>10} {'rejected':>9}")
+    for workers in POOL_SIZES:
+        auth.hasher = auth.PasswordHasher(algorithm, cost, workers)
+        rate, rejected_registrations, p50, p99, rejected_logins = run(app, users, threads)
+        print(f"{workers:>8} {rate:>16,.1f} {rejected_registrations:>9} {p50:>8.1f}ms {p99:>8.1f}ms "
+              f"{rejected_logins:>9}")
+
+
+if __name__ == '__main__':
+    main()
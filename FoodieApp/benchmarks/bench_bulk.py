@@ -0,0 +1,85 @@
+"""
+Bulk Import Benchmark - time to load and export a large catalog
+
+Compares one-by-one POSTs against the bulk NDJSON/CSV endpoints and
+times the streaming export.
+
+Usage:
+    python benchmarks/bench_bulk.py [dish_count] [restaurant_count]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import data_store
+
+DISH_COUNT = 100000
+RESTAURANT_COUNT = 1000
+SINGLE_POST_SAMPLE = 2000
+
+
+def restaurant_rows(count):
+    return [{"name": f"Chain Outlet {i}", "category": "Indian", "location": "Mumbai", "contact": "9999999999"}
+            for i in range(count)]
+
+
+def dish_rows(count, restaurant_ids):
+    return [{"restaurant_id": restaurant_ids[i % len(restaurant_ids)], "name": f"Dish {i}",
+             "type": "Main Course", "price": 100 + i % 400} for i in range(count)]
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44} {elapsed:>8.2f}s")
+    return result, elapsed
+
+
+def run(dish_count, restaurant_count):
+    app = create_app()
+    client = app.test_client()
+
+    # Baseline - one POST per dish, extrapolated from a sample
+    data_store.reset_data()
+    restaurant_id = client.post('/api/v1/restaurants', json=restaurant_rows(1)[0]).get_json()['id']
+    sample = dish_rows(SINGLE_POST_SAMPLE, [restaurant_id])
+    _, elapsed = timed(f"single POSTs ({SINGLE_POST_SAMPLE} dishes)",
+                       lambda: [client.post(f'/api/v1/restaurants/{restaurant_id}/dishes', json=d) for d in sample])
+    print(f"{'  extrapolated to ' + str(dish_count) + ' dishes':<44} {elapsed * dish_count / SINGLE_POST_SAMPLE:>8.2f}s")
+
+    data_store.reset_data()
+    body = '\n'.join(json.dumps(row) for row in restaurant_rows(restaurant_count))
+    response, _ = timed(f"bulk NDJSON restaurants ({restaurant_count})",
+                        lambda: client.post('/api/v1/restaurants/bulk', data=body, content_type='application/x-ndjson'))
+    restaurant_ids = response.get_json()['ids']
+
+    rows = dish_rows(dish_count, restaurant_ids)
+    body = '\n'.join(json.dumps(row) for row in rows)
+    response, _ = timed(f"bulk NDJSON dishes ({dish_count})",
+                        lambda: client.post('/api/v1/dishes/bulk', data=body, content_type='application/x-ndjson'))
+    assert response.status_code == 201, response.get_json()
+
+    data_store.reset_data()
+    client.post('/api/v1/restaurants/bulk', data='\n'.join(json.dumps(r) for r in restaurant_rows(restaurant_count)),
+                content_type='application/x-ndjson')
+    csv_body = 'restaurant_id,name,type,price\n' + '\n'.join(
+        f"{r['restaurant_id']},{r['name']},{r['type']},{r['price']}" for r in rows)
+    response, _ = timed(f"bulk CSV dishes ({dish_count})",
+                        lambda: client.post('/api/v1/dishes/bulk', data=csv_body, content_type='text/csv'))
+    assert response.status_code == 201, response.get_json()
+
+    timed(f"export NDJSON dishes ({len(data_store.dishes)})",
+          lambda: client.get('/api/v1/dishes/export').get_data())
+    timed(f"export CSV dishes ({len(data_store.dishes)})",
+          lambda: client.get('/api/v1/dishes/export?format=csv').get_data())
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    run(args[0] if args else DISH_COUNT, args[1] if len(args) > 1 else RESTAURANT_COUNT)
@@ -0,0 +1,90 @@
+"""
+Concurrency Stress Benchmark - concurrent writes through the Flask routes
+
+Fires ORDER_COUNT order placements at place_order from a thread pool and
+checks that every order got a distinct id, then races duplicate
+restaurant and user registrations and checks exactly one of each wins.
+
+Usage:
+    python benchmarks/bench_concurrency.py [order_count] [threads]
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import data_store
+
+ORDER_COUNT = 10000
+THREADS = 32
+DUPLICATE_ATTEMPTS = 200
+
+# Short switch interval so threads interleave as much as possible
+sys.setswitchinterval(1e-6)
+
+
+def run(order_count, threads):
+    app = create_app()
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        return local.client
+
+    data_store.reset_data()
+    user_id = client().post('/api/v1/users/register', json={
+        "name": "Stress", "email": "stress@example.com", "password": "pass"}).get_json()['id']
+    restaurant_id = client().post('/api/v1/restaurants', json={
+        "name": "Stress Kitchen", "category": "Indian", "location": "Mumbai", "contact": "1"}).get_json()['id']
+    dish_id = client().post(f'/api/v1/restaurants/{restaurant_id}/dishes', json={
+        "name": "Stress Thali", "type": "Main Course", "price": 200}).get_json()['id']
+    order = {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id, "quantity": 1}]}
+
+    def place(_):
+        response = client().post('/api/v1/orders', json=order)
+        return response.status_code, response.get_json()['id']
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(place, range(order_count)))
+    elapsed = time.perf_counter() - start
+
+    ids = [order_id for _, order_id in results]
+    collisions = len(ids) - len(set(ids))
+    print(f"orders placed:   {order_count} with {threads} threads in {elapsed:.2f}s "
+          f"({order_count / elapsed:.0f} req/s)")
+    print(f"non-201:         {sum(1 for status, _ in results if status != 201)}")
+    print(f"id collisions:   {collisions}")
+    print(f"stored orders:   {len(data_store.orders)}")
+
+    def register_restaurant(_):
+        return client().post('/api/v1/restaurants', json={
+            "name": "Same Name", "category": "Cafe", "location": "Pune", "contact": "2"}).status_code
+
+    def register_user(_):
+        return client().post('/api/v1/users/register', json={
+            "name": "Same", "email": "same@example.com", "password": "pass"}).status_code
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        restaurant_statuses = list(pool.map(register_restaurant, range(DUPLICATE_ATTEMPTS)))
+        user_statuses = list(pool.map(register_user, range(DUPLICATE_ATTEMPTS)))
+    print(f"duplicate name:  {restaurant_statuses.count(201)} created, {restaurant_statuses.count(409)} rejected")
+    print(f"duplicate email: {user_statuses.count(201)} created, {user_statuses.count(409)} rejected")
+
+    ok = (collisions == 0 and len(data_store.orders) == order_count
+          and restaurant_statuses.count(201) == 1 and user_statuses.count(201) == 1)
+    print("PASS" if ok else "FAIL")
+    return ok
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    order_count = args[0] if args else ORDER_COUNT
+    threads = args[1] if len(args) > 1 else THREADS
+    sys.exit(0 if run(order_count, threads) else 1)
@@ -0,0 +1,63 @@
+"""
+Delete Benchmark - cascading restaurant deletes through reverse indexes vs table scans
+
+Seeds restaurants with dishes, orders and ratings, then deletes random
+restaurants two ways: data_store.delete_restaurant(), which finds the
+dependent rows through the reverse indexes, and a naive cascade that
+scans the dishes, orders and ratings tables for them. Also times the
+compaction pass that purges the soft-deleted rows afterwards.
+
+Usage:
+    python benchmarks/bench_delete.py [restaurants] [deletes]
+"""
+
+import random
+import sys
+import time
+
+from common import percentile, seed
+
+from app.models import data_store
+
+SCAN_DELETES = 5
+
+
+def naive_related(restaurant_id):
+    """The dependent rows of a restaurant found by scanning every table"""
+    dish_ids = [dish.id for dish in data_store.dishes.values() if dish.restaurant_id == restaurant_id]
+    order_ids = {order.id for order in data_store.orders.values() if order.restaurant_id == restaurant_id}
+    rating_ids = [rating.id for rating in data_store.ratings.values() if rating.order_id in order_ids]
+    return dish_ids, order_ids, rating_ids
+
+
+def timings_ms(func, restaurant_ids):
+    timings = []
+    for restaurant_id in restaurant_ids:
+        start = time.perf_counter()
+        func(restaurant_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return percentile(timings, 0.5), percentile(timings, 0.99)
+
+
+def main():
+    restaurant_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    delete_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    seed(restaurant_count, dishes_per_restaurant=5, ratings_per_restaurant=5)
+    rng = random.Random(3)
+    doomed = rng.sample(sorted(data_store.restaurants), delete_count + SCAN_DELETES)
+
+    print(f"{restaurant_count} restaurants, {len(data_store.dishes)} dishes, {len(data_store.orders)} orders, "
+          f"{len(data_store.ratings)} ratings")
+    scan_p50, scan_p99 = timings_ms(naive_related, doomed[:SCAN_DELETES])
+    print(f"{'naive scan (lookup only)':<28} p50 {scan_p50:9.3f} ms  p99 {scan_p99:9.3f} ms")
+    index_p50, index_p99 = timings_ms(data_store.delete_restaurant, doomed[SCAN_DELETES:])
+    print(f"{'cascade soft-delete':<28} p50 {index_p50:9.3f} ms  p99 {index_p99:9.3f} ms")
+
+    start = time.perf_counter()
+    purged = data_store.compact()
+    print(f"compaction purged {purged} in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Feed Benchmark - idle cost and wake-up latency of order feed subscribers
+
+Parks N subscriber threads in long-polls on one restaurant channel, then
+measures the process CPU used while they sit idle and the delay from
+publishing an order event to each subscriber receiving it.
+
+Usage:
+    python benchmarks/bench_feed.py [subscribers]
+"""
+
+import sys
+import threading
+import time
+
+from common import percentile
+
+from app.models.records import Order
+from app.services import order_feed
+
+IDLE_SECONDS = 2.0
+ROUNDS = 5
+
+
+def main():
+    subscriber_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    feed = order_feed.channel(1)
+    published_at = {}
+    latencies = []
+    latencies_lock = threading.Lock()
+    ready = threading.Barrier(subscriber_count + 1)
+
+    def subscriber():
+        since = 0
+        ready.wait()
+        while since < ROUNDS:
+            events, _, _ = feed.wait(since, order_feed.MAX_WAIT_SECONDS)
+            received = time.perf_counter()
+            with latencies_lock:
+                latencies.extend((received - published_at[event['seq']]) * 1000 for event in events)
+            since = events[-1]['seq']
+
+    threads = [threading.Thread(target=subscriber, daemon=True) for _ in range(subscriber_count)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    time.sleep(0.2)
+
+    cpu_start = time.process_time()
+    time.sleep(IDLE_SECONDS)
+    idle_cpu = time.process_time() - cpu_start
+    print(f"{subscriber_count} subscribers idle for {IDLE_SECONDS:.0f}s: {idle_cpu * 1000:.1f} ms CPU")
+
+    for seq in range(1, ROUNDS + 1):
+        published_at[seq] = time.perf_counter()
+        order_feed.publish_order('order_created', Order(id=seq, user_id=1, restaurant_id=1, dishes=[]))
+        time.sleep(0.5)
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    print(f"delivery latency over {len(latencies)} deliveries: "
+          f"p50 {percentile(latencies, 0.5):.2f} ms  p99 {percentile(latencies, 0.99):.2f} ms  "
+          f"max {latencies[-1]:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Geo Benchmark - radius queries through the grid index vs measuring every restaurant
+
+Seeds restaurants and scatters them around the benchmark cities (up to
+about 30 km from each centre), then answers "restaurants within R km"
+for random points two ways: geo_index.near() and a scan computing the
+distance to every restaurant. Both must return the same ids.
+
+Usage:
+    python benchmarks/bench_geo.py [restaurants]
+"""
+
+import random
+import sys
+import time
+
+from common import LOCATIONS, percentile, seed
+
+from app.models import data_store, geo_index
+
+CITY_CENTRES = {
+    'Mumbai': (19.0760, 72.8777), 'Delhi': (28.6139, 77.2090), 'Pune': (18.5204, 73.8567),
+    'Bangalore': (12.9716, 77.5946), 'Chennai': (13.0827, 80.2707), 'Kolkata': (22.5726, 88.3639),
+    'Hyderabad': (17.3850, 78.4867), 'Jaipur': (26.9124, 75.7873),
+}
+RADII_KM = (1, 5, 20)
+QUERIES = 200
+
+
+def scan(lat, lon, radius_km):
+    found = []
+    for restaurant in data_store.restaurants.values():
+        if restaurant.lat is None:
+            continue
+        distance = geo_index.distance_km(lat, lon, restaurant.lat, restaurant.lon)
+        if distance <= radius_km:
+            found.append((distance, restaurant.id))
+    found.sort()
+    return [(restaurant_id, distance) for distance, restaurant_id in found]
+
+
+def timings_ms(func, points, radius_km):
+    timings = []
+    for lat, lon in points:
+        start = time.perf_counter()
+        func(lat, lon, radius_km)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return percentile(timings, 0.5), percentile(timings, 0.99)
+
+
+def main():
+    restaurant_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    seed(restaurant_count, dishes_per_restaurant=0, ratings_per_restaurant=0)
+    rng = random.Random(7)
+    for restaurant in list(data_store.restaurants.values()):
+        centre = CITY_CENTRES[restaurant.location]
+        restaurant.lat = centre[0] + rng.uniform(-0.27, 0.27)
+        restaurant.lon = centre[1] + rng.uniform(-0.27, 0.27)
+        data_store.save_restaurant(restaurant)
+
+    points = []
+    for _ in range(QUERIES):
+        centre = CITY_CENTRES[rng.choice(LOCATIONS)]
+        points.append((centre[0] + rng.uniform(-0.2, 0.2), centre[1] + rng.uniform(-0.2, 0.2)))
+
+    print(f"{restaurant_count} restaurants, {QUERIES} queries per radius")
+    print(f"{'radius km':>10} {'matches':>8} {'index p50':>10} {'index p99':>10} {'scan p50':>9} {'scan p99':>9}")
+    for radius_km in RADII_KM:
+        matches = [len(geo_index.near(lat, lon, radius_km)) for lat, lon in points]
+        assert geo_index.near(*points[0], radius_km) == scan(*points[0], radius_km)
+        index_p50, index_p99 = timings_ms(geo_index.near, points, radius_km)
+        scan_p50, scan_p99 = timings_ms(scan, points[:10], radius_km)
+        print(f"{radius_km:>10} {sum(matches) / len(matches):>8.0f} {index_p50:>10.3f} {index_p99:>10.3f} "
+              f"{scan_p50:>9.1f} {scan_p99:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
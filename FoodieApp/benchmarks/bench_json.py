@@ -0,0 +1,75 @@
+"""
+JSON Benchmark - serialization time of the largest responses per JSON provider
+
+Seeds the data store, builds the payloads of the biggest list responses
+- a restaurant search returning thousands of matches, the detailed
+search with dishes and ratings, the admin order list - and times only
+turning each into a response through three providers:
+
+    flask     Flask's default provider (sorted keys, stdlib encoder)
+    stdlib    FastJSONProvider falling back to the stdlib encoder
+    orjson    FastJSONProvider with orjson (skipped when not installed)
+
+Usage:
+    python benchmarks/bench_json.py [restaurants]
+"""
+
+import sys
+import time
+
+from common import percentile, seed
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app
+from app.models import data_store, order_index, search_index
+from app.models.records import to_dict
+from app.services import json_provider
+
+ITERATIONS = 30
+
+
+def payloads():
+    """(label, payload) for the largest responses"""
+    restaurant_ids = search_index.search(location='mumbai')
+    detailed_ids = restaurant_ids[:1000]
+    order_ids = order_index.get_all_order_ids()
+    return [
+        (f"search location=mumbai ({len(restaurant_ids)})",
+         {"restaurants": [to_dict(data_store.restaurants[i]) for i in restaurant_ids], "count": len(restaurant_ids)}),
+        (f"detailed search with dishes ({len(detailed_ids)})",
+         {"restaurants": [data_store._build_search_card(i) for i in detailed_ids], "count": len(detailed_ids)}),
+        (f"admin orders ({len(order_ids)})", [to_dict(data_store.orders[i]) for i in order_ids]),
+    ]
+
+
+def timings_ms(provider, payload):
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        provider.response(payload).get_data()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return percentile(timings, 0.5)
+
+
+def main():
+    restaurant_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed(restaurant_count)
+    app = create_app()
+    providers = [('flask', DefaultJSONProvider(app)), ('stdlib', json_provider.FastJSONProvider(app, 'json'))]
+    if json_provider.orjson is not None:
+        providers.append(('orjson', json_provider.FastJSONProvider(app, 'orjson')))
+
+    print(f"{restaurant_count} restaurants, p50 of {ITERATIONS} serializations in ms")
+    print(f"{'payload':<40} {'bytes':>10}" + ''.join(f" {name:>9}" for name, _ in providers) + f" {'saved':>7}")
+    with app.app_context():
+        for label, payload in payloads():
+            size = len(providers[-1][1].response(payload).get_data())
+            results = [timings_ms(provider, payload) for _, provider in providers]
+            saved = 1 - results[-1] / results[0]
+            print(f"{label:<40} {size:>10}" + ''.join(f" {ms:>9.2f}" for ms in results) + f" {saved:>7.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Memory Benchmark - RSS of N stored orders as plain dicts vs slotted records
+
+Each variant runs in a fresh interpreter so their heaps do not mix. Both
+build the same orders table (id -> order, one line item per order) the
+way the data store holds it; the difference is the per-order container.
+
+Usage:
+    python benchmarks/bench_memory.py [order_count]
+"""
+
+import gc
+import subprocess
+import sys
+
+from common import rss_mb
+
+from app.models.records import Order
+
+VARIANTS = ('dict', 'record')
+
+
+def build_orders(variant, order_count):
+    orders = {}
+    for order_id in range(1, order_count + 1):
+        dishes = [{"dish_id": order_id % 5000 + 1, "quantity": 1}]
+        if variant == 'dict':
+            orders[order_id] = {"id": order_id, "user_id": order_id % 1000 + 1, "restaurant_id": order_id % 2000 + 1,
+                                "dishes": dishes, "status": "pending", "total": 250}
+        else:
+            orders[order_id] = Order(id=order_id, user_id=order_id % 1000 + 1, restaurant_id=order_id % 2000 + 1,
+                                     dishes=dishes, total=250)
+    return orders
+
+
+def measure(variant, order_count):
+    """Run in the child process - print RSS growth in MB"""
+    gc.collect()
+    before = rss_mb()
+    orders = build_orders(variant, order_count)
+    gc.collect()
+    print(rss_mb() - before)
+    return orders
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        measure(sys.argv[2], int(sys.argv[3]))
+        return
+
+    order_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{order_count:,} orders")
+    growth = {}
+    for variant in VARIANTS:
+        output = subprocess.run([sys.executable, __file__, '--child', variant, str(order_count)],
+                                capture_output=True, text=True, check=True).stdout
+        growth[variant] = float(output.strip())
+        print(f"  {variant:<7} {growth[variant]:8.1f} MB  ({growth[variant] * 1024 * 1024 / order_count:6.1f} bytes/order)")
+    saved = growth['dict'] - growth['record']
+    print(f"  saved   {saved:8.1f} MB  ({saved / growth['dict']:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Pricing Benchmark - cart pricing via cached price tables vs per-line dish scans
+
+Builds a catalog, then prices carts of increasing size for one
+restaurant two ways: the pricing service (one price table lookup per
+line) and a naive loop that scans the dish table for every line.
+
+Usage:
+    python benchmarks/bench_pricing.py [restaurants] [dishes_per_restaurant]
+"""
+
+import sys
+import time
+
+from common import seed
+
+from app.models import data_store, search_index
+from app.services.pricing import price_order
+
+CART_SIZES = (1, 10, 100, 500)
+REPEAT = 200
+
+
+def naive_price(restaurant_id, items):
+    """Resolve each line by scanning every dish - what pricing looked like without an index"""
+    total = 0
+    for item in items:
+        for dish in data_store.dishes.values():
+            if dish.id == item['dish_id']:
+                if dish.restaurant_id != restaurant_id or not dish.enabled:
+                    return None
+                total += dish.price * item.get('quantity', 1)
+                break
+        else:
+            return None
+    return total
+
+
+def timed_us(func, *args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func(*args)
+    return (time.perf_counter() - start) / REPEAT * 1_000_000
+
+
+def main():
+    restaurant_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    dishes_per_restaurant = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    seed(restaurant_count, dishes_per_restaurant, ratings_per_restaurant=0)
+    restaurant_id = restaurant_count // 2
+    dish_ids = search_index.get_dish_ids(restaurant_id)
+
+    print(f"{len(data_store.dishes)} dishes in the catalog, {len(dish_ids)} on the menu")
+    print(f"{'lines':>6} {'naive us':>12} {'cold us':>10} {'cached us':>10}")
+    for size in CART_SIZES:
+        items = [{"dish_id": dish_ids[i % len(dish_ids)], "quantity": 1 + i % 3} for i in range(size)]
+        _, total, error_msg = price_order(restaurant_id, items)
+        assert error_msg is None and total == naive_price(restaurant_id, items)
+
+        naive = timed_us(naive_price, restaurant_id, items) if size <= 100 else float('nan')
+
+        def cold():
+            data_store.price_tables.invalidate(restaurant_id)
+            price_order(restaurant_id, items)
+
+        print(f"{size:>6} {naive:>12.1f} {timed_us(cold):>10.1f} {timed_us(price_order, restaurant_id, items):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
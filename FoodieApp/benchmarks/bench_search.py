@@ -0,0 +1,70 @@
+"""
+Search Benchmark - p50/p99 latency of the search endpoints at 1k/10k/100k restaurants
+
+Seeds the in-memory data store directly, then drives the search endpoints
+through the Flask test client so routing and JSON serialization are
+included in the timings. Each scenario is measured with the response
+cache cleared before every call (index only) and with a warm cache.
+
+Usage:
+    python benchmarks/bench_search.py [sizes...]
+"""
+
+import statistics
+import sys
+import time
+
+from common import seed
+
+from app import create_app
+from app.services.response_cache import cache
+
+SIZES = [1000, 10000, 100000]
+ITERATIONS = 200
+
+
+def measure(func, iterations=ITERATIONS, before=None):
+    """Run func repeatedly and return (p50, p99) in milliseconds - before() runs untimed ahead of each call"""
+    timings = []
+    for _ in range(iterations):
+        if before:
+            before()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def run(sizes):
+    app = create_app()
+    client = app.test_client()
+
+    def search(query):
+        return lambda: client.get(f'/api/v1/restaurants/search?{query}')
+
+    scenarios = [
+        ("name=spice grill 7", search('name=spice grill 7')),
+        ("name=biryani&location=pune", search('name=biryani dosa 1&location=pune')),
+        ("q=biryni mumbai", search('q=biryni mumbai')),
+        ("q=masala dosa pune", search('q=masala dosa pune')),
+        ("q=tandor", search('q=tandor')),
+        ("name=tandoor wok 3", search('name=tandoor wok 3')),
+        ("q=spice grill&rating=4", search('q=spice grill&rating=4')),
+        ("name=taco 12&dish=dosa", search('name=taco 12&dish=dosa')),
+        ("location=jaipur&rating=4.5", search('location=jaipur&rating=4.5')),
+    ]
+
+    print(f"{'restaurants':>12}  {'scenario':<40} {'cold p50':>9} {'cold p99':>9} {'warm p50':>9} {'warm p99':>9}")
+    for size in sizes:
+        start = time.perf_counter()
+        seed(size)
+        print(f"# seeded {size} restaurants in {time.perf_counter() - start:.1f}s")
+        for label, func in scenarios:
+            cold_p50, cold_p99 = measure(func, before=cache.clear)
+            warm_p50, warm_p99 = measure(func)
+            print(f"{size:>12}  {label:<40} {cold_p50:>9.3f} {cold_p99:>9.3f} {warm_p50:>9.3f} {warm_p99:>9.3f}")
+
+
+if __name__ == '__main__':
+    run([int(arg) for arg in sys.argv[1:]] or SIZES)
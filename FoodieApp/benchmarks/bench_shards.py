@@ -0,0 +1,145 @@
+"""
+Shard Benchmark - write throughput of the sharded store as writers are added
+
+Every writer inserts restaurants with their dishes, orders and ratings
+into the storage backend's tables, each writer owning its own
+restaurants. Writers run two ways:
+
+    threads     threads sharing one backend in this process - they only
+                run in parallel on a free-threaded (no GIL) Python build
+    processes   one process per writer, all writing into one shared
+                backend served from a manager process, each writer's
+                requests handled on its own thread there
+
+against both the unsharded and the sharded in-memory backend. Reports
+records written per second for each writer count.
+
+Usage:
+    python benchmarks/bench_shards.py [restaurants_per_writer] [max_writers]
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.records import Dish, Order, Rating, Restaurant
+from app.models.storage import MemoryBackend, ShardedMemoryBackend
+
+DISHES_PER_RESTAURANT = 3
+ORDERS_PER_RESTAURANT = 4
+RECORDS_PER_RESTAURANT = 1 + DISHES_PER_RESTAURANT + 2 * ORDERS_PER_RESTAURANT
+
+
+def write_restaurants(backend, writer, writer_count, restaurant_count):
+    """Insert restaurant_count restaurants (and their records) owned by this writer"""
+    restaurants = backend.table('restaurants')
+    dishes = backend.table('dishes')
+    orders = backend.table('orders')
+    ratings = backend.table('ratings')
+    for i in range(restaurant_count):
+        # Restaurant ids writer, writer + writer_count, ... never collide between writers
+        restaurant_id = writer + 1 + i * writer_count
+        restaurants[restaurant_id] = Restaurant(id=restaurant_id, name=f"Bench {restaurant_id}", category="Cafe",
+                                                location="Pune", contact="9999999999")
+        for _ in range(DISHES_PER_RESTAURANT):
+            dish_id = backend.next_id('dishes')
+            dishes[dish_id] = Dish(id=dish_id, restaurant_id=restaurant_id, name="Dosa", type="Main", price=100)
+        for _ in range(ORDERS_PER_RESTAURANT):
+            order_id = backend.next_id('orders')
+            orders[order_id] = Order(id=order_id, user_id=1, restaurant_id=restaurant_id, dishes=[])
+            rating_id = backend.next_id('ratings')
+            ratings[rating_id] = Rating(id=rating_id, order_id=order_id, rating=4)
+
+
+def run_threads(backend, writer_count, restaurant_count):
+    threads = [threading.Thread(target=write_restaurants, args=(backend, writer, writer_count, restaurant_count))
+               for writer in range(writer_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+class StoreManager(BaseManager):
+    """Serves one store to the writer processes, handling each one's requests on its own thread"""
+
+
+BACKENDS = {backend_class.__name__: backend_class for backend_class in (MemoryBackend, ShardedMemoryBackend)}
+_stores = {}
+
+
+def served_store(backend_name):
+    """The manager process's one store of that backend, created by the first caller"""
+    if backend_name not in _stores:
+        _stores[backend_name] = BACKENDS[backend_name]()
+    return _stores[backend_name]
+
+
+# Tables come back as proxies too, so every write lands in the one served store
+StoreManager.register('Table', exposed=('__setitem__', '__len__'))
+StoreManager.register('store', served_store, exposed=('table', 'next_id'), method_to_typeid={'table': 'Table'})
+
+
+def process_writer(address, backend_name, writer, writer_count, restaurant_count, ready, go, done):
+    manager = StoreManager(address)
+    manager.connect()
+    backend = manager.store(backend_name)
+    ready.wait()
+    go.wait()
+    write_restaurants(backend, writer, writer_count, restaurant_count)
+    done.put(time.perf_counter())
+
+
+def run_processes(backend_class, writer_count, restaurant_count):
+    """Seconds for writer_count processes to fill one shared backend_class store"""
+    ready = multiprocessing.Barrier(writer_count + 1)
+    go = multiprocessing.Event()
+    done = multiprocessing.Queue()
+    with StoreManager() as manager:
+        backend = manager.store(backend_class.__name__)
+        processes = [multiprocessing.Process(target=process_writer, args=(
+            manager.address, backend_class.__name__, writer, writer_count, restaurant_count, ready, go, done))
+                     for writer in range(writer_count)]
+        for process in processes:
+            process.start()
+        ready.wait()
+        start = time.perf_counter()
+        go.set()
+        finished = max(done.get() for _ in processes)
+        for process in processes:
+            process.join()
+        written = len(backend.table('restaurants'))
+    assert written == writer_count * restaurant_count, "writers lost restaurants"
+    return finished - start
+
+
+def main():
+    restaurant_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    max_writers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f"{restaurant_count} restaurants ({restaurant_count * RECORDS_PER_RESTAURANT} records) per writer, "
+          f"{multiprocessing.cpu_count()} CPUs, GIL {'enabled' if gil_enabled else 'disabled'}")
+    print(f"{'writers':>8} {'threads unsharded':>18} {'threads sharded':>16} "
+          f"{'processes unsharded':>20} {'processes sharded':>18}   (records/s)")
+
+    writer_count = 1
+    while writer_count <= max_writers:
+        records = writer_count * restaurant_count * RECORDS_PER_RESTAURANT
+        unsharded = records / run_threads(MemoryBackend(), writer_count, restaurant_count)
+        sharded = records / run_threads(ShardedMemoryBackend(), writer_count, restaurant_count)
+        shared_unsharded = records / run_processes(MemoryBackend, writer_count, restaurant_count)
+        shared_sharded = records / run_processes(ShardedMemoryBackend, writer_count, restaurant_count)
+        print(f"{writer_count:>8} {unsharded:>18,.0f} {sharded:>16,.0f} "
+              f"{shared_unsharded:>20,.0f} {shared_sharded:>18,.0f}")
+        writer_count *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+WAL Benchmark - write overhead and recovery time of the durable memory backend
+
+Writes records (restaurants with their dishes, orders and ratings) into
+the plain in-memory backend and the durable one in each sync mode, then
+times a snapshot and the two ways of recovering:
+
+    snapshot + tail     the snapshot plus the log segment written after it
+    log only            every record replayed from the log
+
+Request latency is measured separately: writer threads each make one
+change and flush() it, the way a request handler does, so the 'group'
+mode can share fsyncs between them where 'always' pays one per change.
+
+Usage:
+    python benchmarks/bench_wal.py [records] [writer_threads]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from common import percentile
+
+from app.models.records import Dish, Order, Rating, Restaurant
+from app.models.storage import DurableMemoryBackend, MemoryBackend
+
+DISHES_PER_RESTAURANT = 3
+ORDERS_PER_RESTAURANT = 4
+RECORDS_PER_RESTAURANT = 1 + DISHES_PER_RESTAURANT + 2 * ORDERS_PER_RESTAURANT
+REQUESTS_PER_WRITER = 200
+TAIL_FRACTION = 0.1
+
+
+def write_records(backend, restaurant_count):
+    """Insert restaurant_count restaurants and their dishes, orders and ratings"""
+    restaurants = backend.table('restaurants')
+    dishes = backend.table('dishes')
+    orders = backend.table('orders')
+    ratings = backend.table('ratings')
+    for _ in range(restaurant_count):
+        restaurant_id = backend.next_id('restaurants')
+        restaurants[restaurant_id] = Restaurant(id=restaurant_id, name=f"Bench {restaurant_id}", category="Cafe",
+                                                location="Pune", contact="9999999999")
+        for _ in range(DISHES_PER_RESTAURANT):
+            dish_id = backend.next_id('dishes')
+            dishes[dish_id] = Dish(id=dish_id, restaurant_id=restaurant_id, name="Dosa", type="Main", price=100)
+        for _ in range(ORDERS_PER_RESTAURANT):
+            order_id = backend.next_id('orders')
+            orders[order_id] = Order(id=order_id, user_id=1, restaurant_id=restaurant_id, dishes=[])
+            rating_id = backend.next_id('ratings')
+            ratings[rating_id] = Rating(id=rating_id, order_id=order_id, rating=4)
+    backend.flush()
+
+
+def directory_size_mb(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 1e6
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def request_latencies_ms(backend, writer_count):
+    """Per-request latency of writer_count threads each saving one dish and flushing it"""
+    timings = []
+    lock = threading.Lock()
+
+    def writer():
+        dishes = backend.table('dishes')
+        mine = []
+        for _ in range(REQUESTS_PER_WRITER):
+            start = time.perf_counter()
+            dish_id = backend.next_id('dishes')
+            dishes[dish_id] = Dish(id=dish_id, restaurant_id=1, name="Dosa", type="Main", price=100)
+            backend.flush()
+            mine.append((time.perf_counter() - start) * 1000)
+        with lock:
+            timings.extend(mine)
+
+    threads = [threading.Thread(target=writer) for _ in range(writer_count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    timings.sort()
+    return percentile(timings, 0.5), percentile(timings, 0.99), len(timings) / elapsed
+
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    writer_count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    restaurant_count = max(1, record_count // RECORDS_PER_RESTAURANT)
+    records = restaurant_count * RECORDS_PER_RESTAURANT
+    root = tempfile.mkdtemp(prefix='foodie-wal-')
+    try:
+        print(f"{records} records")
+        elapsed, _ = timed(write_records, MemoryBackend(), restaurant_count)
+        baseline = records / elapsed
+        print(f"{'memory':<22} {baseline:>10,.0f} records/s")
+        for sync in ('none', 'group'):
+            directory = os.path.join(root, sync)
+            backend = DurableMemoryBackend(directory, sync=sync, snapshot_seconds=0)
+            elapsed, _ = timed(write_records, backend, restaurant_count)
+            backend.close()
+            print(f"{'durable ' + sync:<22} {records / elapsed:>10,.0f} records/s  "
+                  f"({baseline * elapsed / records:.1f}x memory, log {directory_size_mb(directory):.0f} MB)")
+
+        # Recovery from the log alone, then from a snapshot plus a tail
+        directory = os.path.join(root, 'group')
+        elapsed, backend = timed(DurableMemoryBackend, directory, 'group', 0)
+        print(f"{'recover log only':<22} {elapsed:>9.2f} s")
+        elapsed, _ = timed(backend.snapshot)
+        print(f"{'snapshot':<22} {elapsed:>9.2f} s  ({directory_size_mb(directory):.0f} MB)")
+        write_records(backend, max(1, int(restaurant_count * TAIL_FRACTION)))
+        backend.close()
+        elapsed, backend = timed(DurableMemoryBackend, directory, 'group', 0)
+        print(f"{'recover snapshot+tail':<22} {elapsed:>9.2f} s  "
+              f"({int(TAIL_FRACTION * 100)}% of the records in the tail)")
+        backend.close()
+
+        print(f"\n{writer_count} writer threads, one change + flush per request")
+        for sync in ('always', 'group'):
+            directory = os.path.join(root, 'requests-' + sync)
+            backend = DurableMemoryBackend(directory, sync=sync, snapshot_seconds=0)
+            p50, p99, throughput = request_latencies_ms(backend, writer_count)
+            backend.close()
+            print(f"{'durable ' + sync:<22} p50 {p50:7.3f} ms  p99 {p99:7.3f} ms  {throughput:>8,.0f} requests/s")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Shared benchmark helpers - synthetic data seeding and measurement utilities
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import data_store
+from app.models.records import Dish, Feedback, Order, Rating, Restaurant, User
+
+LOCATIONS = ['Mumbai', 'Delhi', 'Pune', 'Bangalore', 'Chennai', 'Kolkata', 'Hyderabad', 'Jaipur']
+CATEGORIES = ['Indian', 'Italian', 'Chinese', 'Mexican', 'Cafe', 'Fast Food']
+WORDS = ['Spice', 'Curry', 'Tandoor', 'Pasta', 'Wok', 'Grill', 'Biryani', 'Dosa', 'Taco', 'Bistro']
+DISHES = ['Paneer Tikka', 'Biryani', 'Margherita', 'Hakka Noodles', 'Burrito', 'Masala Dosa']
+
+
+def seed(restaurant_count, dishes_per_restaurant=3, ratings_per_restaurant=2, user_count=1, rng_seed=42):
+    """Fill the data store with synthetic restaurants, dishes, users, orders and ratings
+
+    Every rating comes with the order it rates and a feedback entry, the
+    same records the API would create.
+    """
+    data_store.reset_data()
+    rng = random.Random(rng_seed)
+    user_ids = []
+    for i in range(user_count):
+        user = data_store.save_user(User(id=data_store.get_next_user_id(), name=f"Bench User {i}",
+                                         email=f"bench{i}@example.com", password="bench"))
+        data_store.user_emails.add(user.email, user.id)
+        user_ids.append(user.id)
+
+    for i in range(restaurant_count):
+        restaurant_id = data_store.get_next_restaurant_id()
+        name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}"
+        data_store.save_restaurant(Restaurant(
+            id=restaurant_id,
+            name=name,
+            category=rng.choice(CATEGORIES),
+            location=rng.choice(LOCATIONS),
+            contact="9999999999",
+            approved=rng.random() < 0.8
+        ))
+        data_store.restaurant_names.add(name, restaurant_id)
+        for _ in range(dishes_per_restaurant):
+            data_store.save_dish(Dish(
+                id=data_store.get_next_dish_id(),
+                restaurant_id=restaurant_id,
+                name=rng.choice(DISHES),
+                type="Main Course",
+                price=rng.randint(100, 500)
+            ))
+        for _ in range(ratings_per_restaurant):
+            user_id = rng.choice(user_ids)
+            order = data_store.save_order(Order(id=data_store.get_next_order_id(), user_id=user_id,
+                                                restaurant_id=restaurant_id, dishes=[]))
+            rating = data_store.save_rating(Rating(id=data_store.get_next_rating_id(), order_id=order.id,
+                                                   rating=rng.randint(1, 5)))
+            data_store.add_feedback(Feedback(rating_id=rating.id, user_id=user_id,
+                                             restaurant_id=restaurant_id, rating=rating.rating))
+    data_store.flush()
+    return user_ids
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0
+    index = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # Peak RSS - KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
@@ -0,0 +1,253 @@
+"""
+Load Test - mixed workloads against the FoodieApp API with concurrent clients
+
+Seeds synthetic restaurants, dishes, users, orders and ratings, then runs
+each scenario for a fixed number of requests spread over concurrent
+client threads. Clients either call create_app() in-process through the
+Flask test client or go over HTTP to a local threaded WSGI server.
+
+Per scenario it reports throughput, latency percentiles, error count and
+process RSS, and writes everything to JSON. Pass --compare with an
+earlier result file to flag regressions (exit code 1).
+
+Usage:
+    python benchmarks/load_test.py --restaurants 10000 --clients 16 --output run.json
+    python benchmarks/load_test.py --mode wsgi --compare baseline.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import CATEGORIES, DISHES, LOCATIONS, WORDS, percentile, rss_mb, seed
+
+from app import create_app
+
+SCENARIOS = ('search_heavy', 'order_heavy', 'admin_listing')
+
+
+def search_heavy(rng, ctx):
+    roll = rng.random()
+    if roll < 0.5:
+        return 'GET', f"/api/v1/restaurants/search?name={rng.choice(WORDS).lower()}&location={rng.choice(LOCATIONS)}", None
+    if roll < 0.8:
+        return 'GET', f"/api/v1/restaurants/search?category={rng.choice(CATEGORIES)}&name={rng.randrange(ctx['restaurants'])}", None
+    if roll < 0.95:
+        return 'GET', f"/api/v1/restaurants/{rng.randint(1, ctx['restaurants'])}", None
+    return 'GET', f"/api/v1/restaurants?category={rng.choice(CATEGORIES)}&approved=true", None
+
+
+def order_heavy(rng, ctx):
+    roll = rng.random()
+    user_id = rng.choice(ctx['user_ids'])
+    restaurant_id = rng.randint(1, ctx['restaurants'])
+    if roll < 0.7:
+        # Seeded dish ids run restaurant by restaurant
+        first_dish_id = (restaurant_id - 1) * ctx['dishes_per_restaurant'] + 1
+        dishes = [{"dish_id": first_dish_id + rng.randrange(ctx['dishes_per_restaurant']), "quantity": rng.randint(1, 3)}
+                  for _ in range(rng.randint(1, 4))]
+        return 'POST', '/api/v1/orders', {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": dishes}
+    if roll < 0.9:
+        return 'GET', f"/api/v1/users/{user_id}/orders?limit=50", None
+    return 'POST', '/api/v1/ratings', {"order_id": rng.randint(1, ctx['orders']), "rating": rng.randint(1, 5),
+                                       "comment": rng.choice(DISHES)}
+
+
+def admin_listing(rng, ctx):
+    roll = rng.random()
+    if roll < 0.4:
+        return 'GET', f"/api/v1/admin/orders?limit=100&after_id={rng.randrange(ctx['orders'])}", None
+    if roll < 0.7:
+        return 'GET', f"/api/v1/admin/feedback?limit=100&after_id={rng.randrange(ctx['orders'])}", None
+    if roll < 0.9:
+        return 'GET', f"/api/v1/restaurants/{rng.randint(1, ctx['restaurants'])}/orders?limit=100", None
+    return 'GET', '/api/v1/restaurants?enabled=true', None
+
+
+WORKLOADS = {'search_heavy': search_heavy, 'order_heavy': order_heavy, 'admin_listing': admin_listing}
+
+
+class InProcessClient:
+    """Calls the app through the Flask test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method, path, body):
+        response = self.client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+
+class HttpClient:
+    """Calls a local WSGI server over HTTP with a keep-alive session"""
+
+    def __init__(self, base_url):
+        import requests
+        self.session = requests.Session()
+        self.base_url = base_url
+
+    def send(self, method, path, body):
+        response = self.session.request(method, self.base_url + path, json=body)
+        return response.status_code
+
+
+def start_wsgi_server(app):
+    """Serve app from a threaded werkzeug server on a free local port"""
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_scenario(name, make_client, ctx, clients, requests_per_scenario):
+    workload = WORKLOADS[name]
+    per_client = requests_per_scenario // clients
+    rss_before = rss_mb()
+
+    def client_loop(client_number):
+        rng = random.Random(f"{name}-{client_number}")
+        client = make_client()
+        latencies = []
+        errors = 0
+        for _ in range(per_client):
+            method, path, body = workload(rng, ctx)
+            start = time.perf_counter()
+            status = client.send(method, path, body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                errors += 1
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(client_loop, range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p90": round(percentile(latencies, 0.90), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3)
+        },
+        "rss_mb_before": round(rss_before, 1),
+        "rss_mb_after": round(rss_mb(), 1)
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Scenarios whose throughput fell or p99 rose by more than tolerance"""
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+        if current['latency_ms']['p99'] > previous['latency_ms']['p99'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['latency_ms']['p99']} -> {current['latency_ms']['p99']} ms")
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--mode', choices=('inprocess', 'wsgi'), default='inprocess')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--restaurants', type=int, default=1000)
+    parser.add_argument('--dishes-per-restaurant', type=int, default=5)
+    parser.add_argument('--ratings-per-restaurant', type=int, default=5)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=4000, help="requests per scenario")
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--compare', help="baseline results JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(WORKLOADS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    app = create_app()
+    if args.mode == 'wsgi':
+        server, base_url = start_wsgi_server(app)
+        make_client = lambda: HttpClient(base_url)
+    else:
+        server = None
+        make_client = lambda: InProcessClient(app)
+
+    results = {
+        "meta": {
+            "mode": args.mode,
+            "restaurants": args.restaurants,
+            "dishes_per_restaurant": args.dishes_per_restaurant,
+            "ratings_per_restaurant": args.ratings_per_restaurant,
+            "users": args.users,
+            "clients": args.clients,
+            "requests_per_scenario": args.requests,
+            "python": platform.python_version(),
+            "started_at": time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        "scenarios": {}
+    }
+
+    print(f"{'scenario':<16} {'req/s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'errors':>7} {'rss MB':>8}")
+    for name in scenarios:
+        # Every scenario starts from the same seeded data
+        user_ids = seed(args.restaurants, args.dishes_per_restaurant, args.ratings_per_restaurant, args.users)
+        ctx = {
+            "restaurants": args.restaurants,
+            "dishes_per_restaurant": args.dishes_per_restaurant,
+            "orders": args.restaurants * args.ratings_per_restaurant,
+            "user_ids": user_ids
+        }
+        result = run_scenario(name, make_client, ctx, args.clients, args.requests)
+        results['scenarios'][name] = result
+        latency = result['latency_ms']
+        print(f"{name:<16} {result['throughput_rps']:>9.1f} {latency['p50']:>8.2f} {latency['p90']:>8.2f} "
+              f"{latency['p99']:>8.2f} {result['errors']:>7} {result['rss_mb_after']:>8.1f}")
+
+    if server is not None:
+        server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('meta', {}).get('mode') != args.mode:
+            print(f"warning: baseline was run in {baseline.get('meta', {}).get('mode')} mode, this run in {args.mode}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"no regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
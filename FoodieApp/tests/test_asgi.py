@@ -0,0 +1,147 @@
+"""
+Pytest Tests for the ASGI adapter - FoodieASGI driven through its ASGI callable, in-process
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app import create_app
+from app.asgi import FoodieASGI
+from app.models import data_store
+from app.services import order_feed
+
+
+@pytest.fixture(autouse=True)
+def reset_data_before_test():
+    """Runs in-process - overrides the live server reset in conftest"""
+    data_store.reset_data()
+    order_feed.reset()
+    yield
+
+
+@pytest.fixture
+def app():
+    asgi_app = FoodieASGI(create_app(), threads=4)
+    yield asgi_app
+    asgi_app.executor.shutdown(wait=True)
+
+
+class Connection:
+    """One ASGI http request - feeds the body to the app and collects what it sends"""
+
+    def __init__(self, method, path, query='', body=None, headers=()):
+        self.scope = {
+            'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http', 'path': path,
+            'root_path': '', 'query_string': query.encode(), 'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+            'headers': [(b'host', b'testserver'), *((name.encode(), value.encode()) for name, value in headers)]
+        }
+        self.incoming = asyncio.Queue()
+        self.incoming.put_nowait({'type': 'http.request', 'body': body or b'', 'more_body': False})
+        self.started = asyncio.get_running_loop().create_future()
+        self.chunks = asyncio.Queue()
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.started.set_result((message['status'], dict(message['headers'])))
+        else:
+            await self.chunks.put(message)
+
+    def disconnect(self):
+        self.incoming.put_nowait({'type': 'http.disconnect'})
+
+    async def body(self):
+        parts = []
+        while True:
+            message = await self.chunks.get()
+            parts.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(parts)
+
+
+async def call(app, method, path, data=None, query=''):
+    """(status, headers, decoded JSON body) for one request"""
+    body = json.dumps(data).encode() if data is not None else None
+    headers = [('content-type', 'application/json'), ('content-length', str(len(body)))] if body else []
+    connection = Connection(method, path, query, body, headers)
+    await app(connection.scope, connection.receive, connection.send)
+    status, response_headers = await connection.started
+    return status, response_headers, json.loads(await connection.body())
+
+
+async def restaurant_with_dish(app):
+    """(user id, restaurant id, dish id) created through the app"""
+    _, _, user = await call(app, 'POST', '/api/v1/users/register', {
+        "name": "Async Diner", "email": "async@example.com", "password": "pass"})
+    _, _, restaurant = await call(app, 'POST', '/api/v1/restaurants', {
+        "name": "Async Adda", "category": "Cafe", "location": "Pune", "contact": "1"})
+    _, _, dish = await call(app, 'POST', f"/api/v1/restaurants/{restaurant['id']}/dishes", {
+        "name": "Misal", "type": "Main", "price": 90})
+    return user['id'], restaurant['id'], dish['id']
+
+
+def test_request_runs_flask_view(app):
+    """Test a POST and a GET go through the Flask app with body, status, headers and query string intact"""
+    async def scenario():
+        _, restaurant_id, _ = await restaurant_with_dish(app)
+        status, headers, body = await call(app, 'GET', '/api/v1/restaurants/search', query='name=adda&include_unapproved=true')
+        assert status == 200
+        assert headers[b'content-type'] == b'application/json'
+        assert [restaurant['id'] for restaurant in body['restaurants']] == [restaurant_id]
+
+        status, _, body = await call(app, 'GET', '/api/v1/restaurants/9999')
+        assert status == 404 and body == {"error": "Restaurant not found"}
+    asyncio.run(scenario())
+
+
+def test_long_poll_feed_wakes_on_new_order(app):
+    """Test a waiting long-poll subscriber gets the order placed while it waits"""
+    async def scenario():
+        user_id, restaurant_id, dish_id = await restaurant_with_dish(app)
+        # Sequence numbers outlive order_feed.reset(), so start from the channel's current one
+        since = order_feed.channel(restaurant_id).last_seq
+        waiting = asyncio.ensure_future(call(app, 'GET', f"/api/v1/restaurants/{restaurant_id}/orders/feed",
+                                             query=f'since={since}&timeout=10'))
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+
+        status, _, order = await call(app, 'POST', '/api/v1/orders', {
+            "user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id, "quantity": 1}]})
+        assert status == 201
+        status, headers, body = await asyncio.wait_for(waiting, 5)
+        assert status == 200
+        assert headers[b'access-control-allow-origin'] == b'*'
+        events = [(event['type'], event['order']['id']) for event in body['events']]
+        assert events == [("order_created", order['id'])]
+        assert body['next_since'] == body['events'][-1]['seq']
+
+        status, _, _ = await call(app, 'GET', '/api/v1/restaurants/9999/orders/feed')
+        assert status == 404
+    asyncio.run(scenario())
+
+
+def test_event_stream_sends_new_orders_until_disconnect(app):
+    """Test an SSE subscriber is sent each new order and the stream ends when the client goes away"""
+    async def scenario():
+        user_id, restaurant_id, dish_id = await restaurant_with_dish(app)
+        since = order_feed.channel(restaurant_id).last_seq
+        connection = Connection('GET', f"/api/v1/restaurants/{restaurant_id}/orders/stream",
+                                headers=[('last-event-id', str(since))])
+        streaming = asyncio.ensure_future(app(connection.scope, connection.receive, connection.send))
+        status, headers = await asyncio.wait_for(connection.started, 5)
+        assert status == 200 and headers[b'content-type'].startswith(b'text/event-stream')
+
+        _, _, order = await call(app, 'POST', '/api/v1/orders', {
+            "user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id, "quantity": 1}]})
+        message = (await asyncio.wait_for(connection.chunks.get(), 5))['body'].decode()
+        assert message.startswith(f"id: {since + 1}\nevent: order_created\n")
+        assert json.loads(message.split("data: ", 1)[1])['id'] == order['id']
+
+        connection.disconnect()
+        await asyncio.wait_for(streaming, 5)
+    asyncio.run(scenario())
@@ -0,0 +1,131 @@
+"""
+Pytest Tests for the durable memory backend - writes survive a restart on the same FOODIE_DATA_DIR
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from app import create_app
+from app.models import data_store, wal
+from app.models.records import Dish, Restaurant
+from app.models.storage import DurableMemoryBackend, MemoryBackend
+
+
+@pytest.fixture(autouse=True)
+def reset_data_before_test():
+    """Runs in-process - overrides the live server reset in conftest"""
+    yield
+
+
+@pytest.fixture
+def start_app(tmp_path, monkeypatch):
+    """Starts the app on a data directory in tmp_path - each call restarts it on the same directory"""
+    for name in ('FOODIE_DB_PATH', 'FOODIE_SHARDS'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('FOODIE_DATA_DIR', str(tmp_path / "data"))
+    monkeypatch.setenv('FOODIE_SNAPSHOT_SECONDS', '0')
+
+    def start():
+        if isinstance(data_store.backend, DurableMemoryBackend):
+            data_store.backend.close()
+        return create_app().test_client()
+
+    yield start
+    data_store.backend.close()
+    data_store.configure_backend(MemoryBackend())
+
+
+def restaurant(restaurant_id):
+    return Restaurant(id=restaurant_id, name=f"Logged Cafe {restaurant_id}", category="Cafe", location="Pune",
+                      contact="1")
+
+
+def test_records_and_ids_survive_a_restart(start_app):
+    """Test records written through the API are recovered and ids carry on after the highest ever used"""
+    client = start_app()
+    data = {"category": "Cafe", "location": "Pune", "contact": "1"}
+    first = client.post("/api/v1/restaurants", json=dict(data, name="Kept Cafe")).get_json()['id']
+    second = client.post("/api/v1/restaurants", json=dict(data, name="Dropped Cafe")).get_json()['id']
+    dish_id = client.post(f"/api/v1/restaurants/{first}/dishes", json={
+        "name": "Upma", "type": "Breakfast", "price": 35}).get_json()['id']
+    assert client.put(f"/api/v1/dishes/{dish_id}", json={"price": 40}).status_code == 200
+    assert client.delete(f"/api/v1/restaurants/{second}").status_code == 200
+
+    client = start_app()
+    assert client.get(f"/api/v1/restaurants/{first}").get_json()['name'] == "Kept Cafe"
+    assert client.get(f"/api/v1/restaurants/{second}").status_code == 404
+    assert data_store.dishes[dish_id].price == 40
+    assert data_store.restaurant_names.owner("Kept Cafe") == first
+    # The deleted restaurant's id is not handed out again
+    third = client.post("/api/v1/restaurants", json=dict(data, name="Dropped Cafe")).get_json()['id']
+    assert third == second + 1
+
+
+def test_recovery_replays_tail_after_snapshot_and_drops_torn_line(tmp_path):
+    """Test a snapshot plus the segment written after it are recovered, cut at a torn last line"""
+    directory = str(tmp_path / "data")
+    backend = DurableMemoryBackend(directory, snapshot_seconds=0)
+    for restaurant_id in (1, 2):
+        backend.table('restaurants')[backend.next_id('restaurants')] = restaurant(restaurant_id)
+    backend.snapshot()
+    backend.table('restaurants')[backend.next_id('restaurants')] = restaurant(3)
+    backend.table('dishes')[backend.next_id('dishes')] = Dish(id=1, restaurant_id=3, name="Vada", type="Snack",
+                                                              price=20)
+    del backend.table('restaurants')[1]
+    backend.close()
+
+    [segment] = wal.segment_numbers(directory)
+    path = wal.segment_path(directory, segment)
+    size = os.path.getsize(path)
+    with open(path, 'ab') as file:
+        file.write(b'["s","restaurants",4,{"id":4,"na')
+
+    recovered = DurableMemoryBackend(directory, snapshot_seconds=0)
+    try:
+        assert sorted(recovered.table('restaurants')) == [2, 3]
+        assert recovered.table('dishes')[1].restaurant_id == 3
+        assert recovered.next_id('restaurants') == 4
+        assert recovered.next_id('dishes') == 2
+        # The torn line is cut off, so the next append starts on a clean line
+        assert os.path.getsize(path) == size
+    finally:
+        recovered.close()
+
+
+def test_concurrent_writes_to_one_key_replay_to_the_live_state(tmp_path):
+    """Test a write racing another to the same key reaches the log in the order it reached memory"""
+    directory = str(tmp_path / "data")
+    backend = DurableMemoryBackend(directory, snapshot_seconds=0)
+    restaurants = backend.table('restaurants')
+    second_done = threading.Event()
+
+    # The first writer stalls between its change and its log append until the second has written,
+    # or for a moment if the second cannot get in
+    log_set = backend.log_set
+
+    def stalling_log_set(*args):
+        if threading.current_thread().name == 'first':
+            second_done.wait(0.2)
+        log_set(*args)
+    backend.log_set = stalling_log_set
+
+    def write(name):
+        restaurants[1] = Restaurant(id=1, name=name, category="Cafe", location="Pune", contact="1")
+
+    first = threading.Thread(target=write, args=("First",), name='first')
+    first.start()
+    time.sleep(0.05)
+    write("Second")
+    second_done.set()
+    first.join()
+    live = restaurants[1].name
+    backend.close()
+
+    recovered = DurableMemoryBackend(directory, snapshot_seconds=0)
+    try:
+        assert recovered.table('restaurants')[1].name == live
+    finally:
+        recovered.close()
@@ -0,0 +1,119 @@
+"""
+Pytest Tests for the in-memory indexes - removing records leaves no empty entries behind
+"""
+
+import pytest
+
+from app.models import data_store, geo_index, order_index, search_index, text_index
+from app.models.records import ACTIVE_ORDER_STATUSES, Dish, Order, Restaurant, User
+from app.services import order_lifecycle
+
+
+@pytest.fixture(autouse=True)
+def reset_data_before_test():
+    """Runs in-process - overrides the live server reset in conftest"""
+    data_store.reset_data()
+    yield
+    data_store.reset_data()
+
+
+def add_restaurant(name, lat=None, lon=None):
+    restaurant_id = data_store.get_next_restaurant_id()
+    data_store.restaurant_names.claim(name, lambda: restaurant_id)
+    return data_store.save_restaurant(Restaurant(id=restaurant_id, name=name, category="Cafe", location="Pune",
+                                                 contact="1", lat=lat, lon=lon)).id
+
+
+def add_dish(restaurant_id, name):
+    return data_store.save_dish(Dish(id=data_store.get_next_dish_id(), restaurant_id=restaurant_id, name=name,
+                                     type="Main", price=50)).id
+
+
+def empty_entries(mapping):
+    return [key for key, value in mapping.items() if not value]
+
+
+def test_deleting_last_dish_drops_the_restaurants_dish_sets():
+    """Test a restaurant whose last dish is deleted keeps no empty dish set in either index"""
+    restaurant_id = add_restaurant("Lone Dish Cafe")
+    data_store.delete_dish(add_dish(restaurant_id, "Quinoabowl"))
+
+    assert restaurant_id not in search_index.restaurant_dishes
+    assert restaurant_id not in text_index._restaurant_dishes
+    assert "quinoabowl" not in text_index.postings
+    assert empty_entries(text_index.term_trigrams) == []
+    assert [restaurant_id for restaurant_id, _ in text_index.search("lone dish cafe")] == [restaurant_id]
+
+
+def test_deleting_restaurant_leaves_no_index_entries():
+    """Test a deleted restaurant's dishes, orders and terms leave every index"""
+    kept = add_restaurant("Kept Kitchen")
+    add_dish(kept, "Khichdi")
+    deleted = add_restaurant("Gone Grill")
+    add_dish(deleted, "Shawarma")
+    user = data_store.save_user(User(id=data_store.get_next_user_id(), name="Eater", email="eater@example.com",
+                                     password="x"))
+    data_store.save_order(Order(id=data_store.get_next_order_id(), user_id=user.id, restaurant_id=deleted,
+                                dishes=[]))
+
+    data_store.delete_restaurant(deleted)
+
+    assert deleted not in search_index.restaurant_dishes
+    assert deleted not in search_index.restaurant_ratings
+    assert deleted not in search_index.indexed_text
+    assert all(deleted not in ids for postings in search_index.ngram_index.values() for ids in postings.values())
+    assert deleted not in text_index.doc_lengths
+    assert deleted not in text_index._restaurant_dishes
+    assert "shawarma" not in text_index.postings and "grill" not in text_index.postings
+    assert empty_entries(text_index.term_trigrams) == []
+    assert deleted not in order_index.restaurant_orders
+    assert user.id not in order_index.user_orders
+    assert order_index.get_all_order_ids() == []
+    assert search_index.get_dish_ids(kept) and "khichdi" in text_index.postings
+
+
+def test_order_deleted_elsewhere_drops_its_restaurant_and_user_lists():
+    """Test an order delete synced from another worker leaves no empty per-restaurant or per-user list"""
+    restaurant_id = add_restaurant("Synced Sweets")
+    order = data_store.save_order(Order(id=data_store.get_next_order_id(), user_id=7, restaurant_id=restaurant_id,
+                                        dishes=[]))
+    del data_store.orders[order.id]
+    data_store.apply_changes([('orders', order.id, 'd', order)])
+
+    assert restaurant_id not in order_index.restaurant_orders
+    assert 7 not in order_index.user_orders
+    assert order_index.get_all_order_ids() == []
+
+
+def test_geo_radius_search_across_antimeridian_and_near_poles():
+    """Test radius search finds each restaurant in range once, nearest first, wherever the circle falls"""
+    west = add_restaurant("Dateline West", lat=-16.5, lon=179.98)
+    east = add_restaurant("Dateline East", lat=-16.5, lon=-179.97)
+    add_restaurant("Dateline Far", lat=-16.5, lon=178.0)
+    assert [restaurant_id for restaurant_id, _ in geo_index.near(-16.5, -179.99, 10)] == [east, west]
+
+    # Near the pole a degree of longitude is a few km, so the circle covers every longitude
+    station = add_restaurant("Polar Station", lat=89.95, lon=45.0)
+    across = add_restaurant("Across The Pole", lat=89.9, lon=-135.0)
+    found = geo_index.near(89.97, -100.0, 20)
+    assert [restaurant_id for restaurant_id, _ in found] == [station, across]
+    assert all(distance <= 20 for _, distance in found)
+
+    # Just short of the whole circle - the longitude cells must not wrap onto themselves
+    for lon in (0.0, 0.033, 0.045, 179.99):
+        keys = geo_index._cell_keys(88.8144, lon, 100)
+        assert len(keys) == len(set(keys))
+    ring = add_restaurant("Ring Road", lat=88.9, lon=1.0)
+    assert [restaurant_id for restaurant_id, _ in geo_index.near(88.8144, 0.033, 100)] == [ring]
+
+
+def test_lifecycle_skips_orders_deleted_behind_the_index():
+    """Test an order gone from the table but still queued is skipped, and transitioning it reports it missing"""
+    restaurant_id = add_restaurant("Racing Rolls")
+    order = data_store.save_order(Order(id=data_store.get_next_order_id(), user_id=1, restaurant_id=restaurant_id,
+                                        dishes=[]))
+    # Deleted by another request between the index lookup and the read
+    dict.pop(data_store.orders, order.id)
+
+    assert order_lifecycle.active_orders(restaurant_id) == {status: [] for status in ACTIVE_ORDER_STATUSES}
+    assert order_lifecycle.transition(order.id, "accepted") == (None, "Order not found")
@@ -47,6 +47,21 @@ def test_register_restaurant_missing_field():
     assert response.status_code == 400
 
 
+def test_register_restaurant_reports_every_error():
+    """Test validation reports every problem with a payload, type errors included"""
+    data = {"name": "Typed Restaurant", "category": 7, "contact": "", "images": ["a.png", 3], "lat": 12.9}
+    response = requests.post(f"{BASE_URL}/api/v1/restaurants", json=data)
+    assert response.status_code == 400
+    assert response.json()['errors'] == [
+        "category must be a string",
+        "Missing required field: location",
+        "Missing required field: contact",
+        "every item of images must be a string",
+        "lat and lon must be given together"
+    ]
+    assert response.json()['error'] == "category must be a string"
+
+
 def test_update_restaurant():
     """Test updating restaurant details"""
     # First create a restaurant
@@ -67,6 +82,32 @@ def test_update_nonexistent_restaurant():
     assert response.status_code == 404
 
 
+def test_update_rejects_invalid_fields():
+    """Test restaurant and dish updates validate every given field and change nothing when one is bad"""
+    data = {"name": "Checked Cafe", "category": "Cafe", "location": "Pune", "contact": "3030303030"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=data).json()['id']
+    url = f"{BASE_URL}/api/v1/restaurants/{restaurant_id}"
+
+    response = requests.put(url, json={"name": ["x"]})
+    assert response.status_code == 400
+    assert response.json()['error'] == "name must be a string"
+    assert requests.put(url, json={"name": "", "category": "Bistro"}).status_code == 400
+    assert requests.patch(url, json={"enabled": "yes"}).status_code == 400
+    assert requests.patch(url, json={"lat": 18.5}).status_code == 400
+    assert requests.get(url).json()['name'] == "Checked Cafe"
+    assert requests.get(url).json()['category'] == "Cafe"
+
+    dish = {"name": "Poha", "type": "Breakfast", "price": 40}
+    dish_id = requests.post(f"{url}/dishes", json=dish).json()['id']
+    response = requests.put(f"{BASE_URL}/api/v1/dishes/{dish_id}", json={"price": "free"})
+    assert response.status_code == 400
+    assert response.json()['error'] == "price must be a number"
+    assert requests.put(f"{BASE_URL}/api/v1/dishes/{dish_id}", json={"price": -5}).status_code == 400
+    response = requests.put(f"{BASE_URL}/api/v1/dishes/{dish_id}", json={"price": 45})
+    assert response.status_code == 200
+    assert response.json()['price'] == 45
+
+
 def test_disable_restaurant():
     """Test disabling a restaurant"""
     # First create a restaurant
@@ -97,3 +138,248 @@ def test_view_nonexistent_restaurant():
     """Test viewing nonexistent restaurant returns 404"""
     response = requests.get(f"{BASE_URL}/api/v1/restaurants/9999")
     assert response.status_code == 404
+
+
+def test_search_reflects_restaurant_update():
+    """Test search index picks up renamed restaurants"""
+    data = {"name": "Old Name Diner", "category": "Cafe", "location": "Chennai", "contact": "1212121212"}
+    create_response = requests.post(f"{BASE_URL}/api/v1/restaurants", json=data)
+    restaurant_id = create_response.json()['id']
+    
+    requests.put(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}", json={"name": "Fresh Name Diner"})
+    
+    old_results = requests.get(f"{BASE_URL}/api/v1/restaurants/search?name=old name&include_unapproved=true").json()
+    new_results = requests.get(f"{BASE_URL}/api/v1/restaurants/search?name=fresh name&include_unapproved=true").json()
+    assert old_results['count'] == 0
+    assert [r['id'] for r in new_results['restaurants']] == [restaurant_id]
+
+
+def test_search_returns_cards_with_dishes():
+    """Test search results are detailed cards that follow dish changes and can filter by dish"""
+    data = {"name": "Card Cafe", "category": "Cafe", "location": "Kochi", "contact": "1313131313"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=data).json()['id']
+    requests.post(f"{BASE_URL}/api/v1/restaurants", json=dict(data, name="Plain Cafe"))
+    dish = requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes",
+                         json={"name": "Appam", "type": "Breakfast", "price": 60}).json()
+
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/search?location=kochi&include_unapproved=true")
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/json'
+    card = response.json()['restaurants'][0]
+    assert response.json()['count'] == 2
+    assert card['id'] == restaurant_id
+    assert card['enabled'] is True and card['approved'] is False
+    assert card['lat'] is None and card['lon'] is None
+    assert card['average_rating'] == 0 and card['total_ratings'] == 0
+    assert card['total_dishes'] == 1
+    assert card['dishes'][0]['name'] == "Appam" and card['dishes'][0]['price'] == 60
+    assert card['recent_ratings'] == []
+
+    # The cached card is rebuilt after its dish changes
+    requests.put(f"{BASE_URL}/api/v1/dishes/{dish['id']}", json={"price": 75})
+    results = requests.get(f"{BASE_URL}/api/v1/restaurants/search?location=kochi&dish=appam&include_unapproved=true").json()
+    assert [r['id'] for r in results['restaurants']] == [restaurant_id]
+    assert results['restaurants'][0]['dishes'][0]['price'] == 75
+
+
+def test_search_hides_disabled_and_unapproved_restaurants():
+    """Test search lists approved restaurants only, unapproved ones on request, and never disabled ones"""
+    data = {"category": "Cafe", "location": "Ooty", "contact": "1414141414"}
+    approved, pending, disabled = [requests.post(f"{BASE_URL}/api/v1/restaurants", json=dict(data, name=name)).json()['id']
+                                   for name in ("Approved Ooty", "Pending Ooty", "Disabled Ooty")]
+    for restaurant_id in (approved, disabled):
+        requests.put(f"{BASE_URL}/api/v1/admin/restaurants/{restaurant_id}/approve")
+    requests.put(f"{BASE_URL}/api/v1/restaurants/{disabled}/disable")
+
+    for query in ("location=ooty", "q=ooty"):
+        results = requests.get(f"{BASE_URL}/api/v1/restaurants/search?{query}").json()['restaurants']
+        assert [r['id'] for r in results] == [approved]
+        assert results[0]['approved'] is True
+        results = requests.get(f"{BASE_URL}/api/v1/restaurants/search?{query}&include_unapproved=true").json()
+        assert sorted(r['id'] for r in results['restaurants']) == [approved, pending]
+
+
+def test_text_search_ranks_and_tolerates_typos():
+    """Test ?q= search matches dish names despite typos and ranks the closest restaurant first"""
+    restaurants = [
+        {"name": "Biryani House", "category": "Indian", "location": "Hyderabad", "contact": "3131313131"},
+        {"name": "Curry Corner", "category": "Indian", "location": "Hyderabad", "contact": "3232323232"},
+        {"name": "Noodle Bar", "category": "Chinese", "location": "Hyderabad", "contact": "3333333333"},
+    ]
+    ids = [requests.post(f"{BASE_URL}/api/v1/restaurants", json=data).json()['id'] for data in restaurants]
+    requests.post(f"{BASE_URL}/api/v1/restaurants/{ids[1]}/dishes", json={"name": "Chicken Biryani", "type": "Main", "price": 250})
+    
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/search?q=biryni hyderabad&include_unapproved=true")
+    assert response.status_code == 200
+    results = response.json()['restaurants']
+    # Too few restaurants match every word, so ones matching only the location follow
+    assert [r['id'] for r in results] == ids
+    assert results[0]['score'] > results[1]['score'] > results[2]['score']
+    
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/search?q=biryani&limit=0")
+    assert response.status_code == 400
+
+
+def test_search_near_sorted_by_distance():
+    """Test ?near= returns restaurants within the radius, nearest first, and follows moves"""
+    restaurants = [
+        {"name": "Bandra Bites", "category": "Cafe", "location": "Mumbai", "contact": "4141414141", "lat": 19.0596, "lon": 72.8295},
+        {"name": "Colaba Corner", "category": "Cafe", "location": "Mumbai", "contact": "4242424242", "lat": 18.9067, "lon": 72.8147},
+        {"name": "Connaught Cafe", "category": "Cafe", "location": "Delhi", "contact": "4343434343", "lat": 28.6315, "lon": 77.2167},
+        {"name": "Nowhere Cafe", "category": "Cafe", "location": "Mumbai", "contact": "4444444444"},
+    ]
+    ids = [requests.post(f"{BASE_URL}/api/v1/restaurants", json=data).json()['id'] for data in restaurants]
+    
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/search?near=19.0760,72.8777&radius_km=25&include_unapproved=true")
+    assert response.status_code == 200
+    results = response.json()['restaurants']
+    assert [r['id'] for r in results] == ids[:2]
+    assert 0 < results[0]['distance_km'] < results[1]['distance_km'] < 25
+    
+    # Moving a restaurant moves it in the index
+    requests.put(f"{BASE_URL}/api/v1/restaurants/{ids[2]}", json={"lat": 19.0700, "lon": 72.8700})
+    results = requests.get(f"{BASE_URL}/api/v1/restaurants/search?near=19.0760,72.8777&radius_km=25&include_unapproved=true").json()['restaurants']
+    assert [r['id'] for r in results] == [ids[2], ids[0], ids[1]]
+    
+    assert requests.get(f"{BASE_URL}/api/v1/restaurants/search?near=19.07").status_code == 400
+    bad = dict(restaurants[0], name="Bad Coordinates", lat=95)
+    assert requests.post(f"{BASE_URL}/api/v1/restaurants", json=bad).status_code == 400
+
+
+def test_rename_to_existing_name_conflicts():
+    """Test renaming a restaurant to another restaurant's name returns 409"""
+    first = {"name": "First Place", "category": "Cafe", "location": "Pune", "contact": "1010101010"}
+    second = {"name": "Second Place", "category": "Cafe", "location": "Pune", "contact": "2020202020"}
+    requests.post(f"{BASE_URL}/api/v1/restaurants", json=first)
+    second_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=second).json()['id']
+    
+    response = requests.put(f"{BASE_URL}/api/v1/restaurants/{second_id}", json={"name": "First Place"})
+    assert response.status_code == 409
+    
+    # The old name is free again once a restaurant is renamed
+    requests.put(f"{BASE_URL}/api/v1/restaurants/{second_id}", json={"name": "Third Place"})
+    response = requests.post(f"{BASE_URL}/api/v1/restaurants", json=second)
+    assert response.status_code == 201
+
+
+def test_bulk_import_restaurants_reports_row_errors():
+    """Test bulk import rejects the whole upload and reports every bad row"""
+    requests.post(f"{BASE_URL}/api/v1/restaurants",
+                  json={"name": "Existing", "category": "Cafe", "location": "Pune", "contact": "1"})
+    body = "\n".join([
+        '{"name": "Bulk One", "category": "Indian", "location": "Mumbai", "contact": "1"}',
+        '{"name": "Bulk Two", "category": "Indian"}',
+        'not json',
+    ])
+    response = requests.post(f"{BASE_URL}/api/v1/restaurants/bulk", data=body,
+                             headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 400
+    assert [e['row'] for e in response.json()['errors']] == [2, 3]
+    assert requests.get(f"{BASE_URL}/api/v1/restaurants").json()['count'] == 1
+
+
+def test_blank_or_non_string_names_never_claimed():
+    """Test a name that is not a non-empty string is a 400 on every path that claims names"""
+    data = {"name": "", "category": "Cafe", "location": "Pune", "contact": "4040404040"}
+    assert requests.post(f"{BASE_URL}/api/v1/restaurants", json=data).status_code == 400
+    response = requests.post(f"{BASE_URL}/api/v1/restaurants/bulk", data='{"name": "", "category": "Cafe", '
+                             '"location": "Pune", "contact": "1"}', headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 400
+
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=dict(data, name="Named Cafe")).json()['id']
+    for name in ([], {"x": 1}, 7, ""):
+        assert requests.put(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}", json={"name": name}).status_code == 400
+        assert requests.patch(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}", json={"name": name}).status_code == 400
+
+    # The original name is still held by the restaurant
+    assert requests.post(f"{BASE_URL}/api/v1/restaurants", json=dict(data, name="Named Cafe")).status_code == 409
+
+
+def test_bulk_import_and_export_dishes_csv():
+    """Test CSV dish import followed by CSV export"""
+    body = '{"name": "Bulk Kitchen", "category": "Indian", "location": "Mumbai", "contact": "1"}'
+    response = requests.post(f"{BASE_URL}/api/v1/restaurants/bulk", data=body,
+                             headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 201
+    restaurant_id = response.json()['ids'][0]
+    
+    csv_body = f"restaurant_id,name,type,price\n{restaurant_id},Dal,Main,120\n{restaurant_id},Naan,Bread,30.5\n"
+    response = requests.post(f"{BASE_URL}/api/v1/dishes/bulk", data=csv_body,
+                             headers={"Content-Type": "text/csv"})
+    assert response.status_code == 201
+    assert response.json()['created'] == 2
+    
+    export = requests.get(f"{BASE_URL}/api/v1/dishes/export?format=csv").text.strip().splitlines()
+    assert export[0] == "id,restaurant_id,name,type,price,available_time,image,enabled"
+    assert len(export) == 3
+    assert ",Naan,Bread,30.5," in export[2]
+
+
+def test_view_restaurant_etag_and_invalidation():
+    """Test cached restaurant view returns 304 for a matching ETag until the restaurant changes"""
+    data = {"name": "Cache Cafe", "category": "Cafe", "location": "Delhi", "contact": "3434343434"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=data).json()['id']
+    
+    first = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}")
+    etag = first.headers['ETag']
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    
+    requests.put(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}", json={"location": "Noida"})
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()['location'] == "Noida"
+    
+    stats = requests.get(f"{BASE_URL}/api/v1/admin/cache").json()
+    assert stats['hits'] >= 1
+    assert stats['not_modified'] >= 1
+
+
+def test_metrics_endpoint():
+    """Test /metrics exposes per-route latency in Prometheus text format"""
+    requests.get(f"{BASE_URL}/api/v1/restaurants/9999")
+    response = requests.get(f"{BASE_URL}/metrics")
+    assert response.status_code == 200
+    assert '# TYPE foodie_request_duration_seconds summary' in response.text
+    assert ('foodie_requests_total{route="/api/v1/restaurants/<int:restaurant_id>",method="GET",status="404"}'
+            in response.text)
+
+
+def test_restaurant_response_fields():
+    """Test a stored restaurant serializes every field, defaults included"""
+    data = {"name": "Field Kitchen", "category": "Indian", "location": "Pune", "contact": "5656565656"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=data).json()['id']
+    
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}")
+    assert response.json() == {"id": restaurant_id, "name": "Field Kitchen", "category": "Indian",
+                               "location": "Pune", "contact": "5656565656", "images": [],
+                               "enabled": True, "approved": False, "lat": None, "lon": None}
+
+
+def test_json_responses_compact_in_field_order():
+    """Test responses are compact JSON with keys in record field order, not sorted"""
+    data = {"name": "Compact Cafe", "category": "Cafe", "location": "Delhi", "contact": "4545454545"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=data).json()['id']
+    
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}")
+    assert response.headers['Content-Type'] == 'application/json'
+    assert response.text.startswith(f'{{"id":{restaurant_id},"name":"Compact Cafe","category":"Cafe"')
+
+
+def test_search_rate_limited_per_client():
+    """Test a client hammering search gets 429s with Retry-After, however many API keys it makes up"""
+    session = requests.Session()
+    # Unknown keys are ignored, so every request counts against the same remote address
+    responses = [session.get(f"{BASE_URL}/api/v1/restaurants/search?name=x", headers={"X-API-Key": f"made-up-{i}"})
+                 for i in range(100)]
+    assert responses[0].status_code == 200
+    limited = [response for response in responses if response.status_code == 429]
+    assert limited
+    assert int(limited[0].headers['Retry-After']) >= 1
+    
+    # Other limits have their own buckets
+    response = session.get(f"{BASE_URL}/api/v1/restaurants")
+    assert response.status_code == 200
+    
+    metrics = requests.get(f"{BASE_URL}/metrics").text
+    assert 'foodie_rate_limit_decisions_total{limit="search",decision="limited"}' in metrics
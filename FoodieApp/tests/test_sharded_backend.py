@@ -0,0 +1,75 @@
+"""
+Pytest Tests for the sharded backend - the app run in-process with FOODIE_SHARDS set
+"""
+
+import json
+
+import pytest
+
+from app import create_app
+from app.models import data_store
+from app.models.storage import MemoryBackend, ShardedMemoryBackend
+
+SHARDS = 4
+
+
+@pytest.fixture(autouse=True)
+def reset_data_before_test():
+    """Runs in-process - overrides the live server reset in conftest"""
+    yield
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A test client for an app configured from FOODIE_SHARDS, put back to memory afterwards"""
+    for name in ('FOODIE_DB_PATH', 'FOODIE_DATA_DIR'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('FOODIE_SHARDS', str(SHARDS))
+    app = create_app()
+    yield app.test_client()
+    data_store.configure_backend(MemoryBackend())
+
+
+def test_records_live_in_the_shard_their_id_hashes_to_and_reads_gather_every_shard(client):
+    """Test each record is stored in its id's shard with no route map, and listings span all shards"""
+    backend = data_store.backend
+    assert isinstance(backend, ShardedMemoryBackend) and len(backend.shards) == SHARDS
+
+    user_id = client.post("/api/v1/users/register", json={
+        "name": "Shard User", "email": "shard@example.com", "password": "pass"}).get_json()['id']
+    order_ids = []
+    for i in range(SHARDS + 2):
+        restaurant_id = client.post("/api/v1/restaurants", json={
+            "name": f"Shard Cafe {i}", "category": "Cafe", "location": "Pune", "contact": "1"}).get_json()['id']
+        dish_id = client.post(f"/api/v1/restaurants/{restaurant_id}/dishes", json={
+            "name": "Idli", "type": "Breakfast", "price": 30}).get_json()['id']
+        response = client.post("/api/v1/orders", json={
+            "user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id, "quantity": 1}]})
+        assert response.status_code == 201
+        order_id = response.get_json()['id']
+        order_ids.append(order_id)
+        assert client.post("/api/v1/ratings", json={"order_id": order_id, "rating": 5}).status_code == 201
+
+    for name in ('restaurants', 'dishes', 'orders', 'ratings'):
+        for key in data_store.backend.ids(name):
+            assert key in backend.shards[backend.shard_of(key)].tables[name]
+    # Consecutive ids spread over every shard
+    assert all(stats["records"] for stats in backend.shard_stats())
+    assert client.get("/api/v1/restaurants").get_json()['count'] == SHARDS + 2
+    assert [order['id'] for order in client.get(f"/api/v1/users/{user_id}/orders").get_json()] == order_ids
+    assert [order['id'] for order in client.get("/api/v1/admin/orders").get_json()] == order_ids
+
+    # A search reads its restaurants back from their shards
+    restaurants = client.get("/api/v1/restaurants/search?name=shard&include_unapproved=true").get_json()['restaurants']
+    assert [restaurant['name'] for restaurant in restaurants] == [f"Shard Cafe {i}" for i in range(SHARDS + 2)]
+
+
+def test_export_streams_every_shard_in_id_order(client):
+    """Test an export walks a snapshot of the ids gathered from every shard"""
+    for i in range(SHARDS * 2):
+        client.post("/api/v1/restaurants", json={
+            "name": f"Export Cafe {i}", "category": "Cafe", "location": "Pune", "contact": "1"})
+    assert data_store.record_ids('restaurants') == list(range(1, SHARDS * 2 + 1))
+
+    lines = client.get("/api/v1/restaurants/export").get_data(as_text=True).splitlines()
+    assert [json.loads(line)['name'] for line in lines] == [f"Export Cafe {i}" for i in range(SHARDS * 2)]
@@ -0,0 +1,155 @@
+"""
+Pytest Tests for the SQLite backend - two backends on one file stand in for two worker processes
+"""
+
+import pytest
+
+from app import create_app
+from app.models import data_store, search_index
+from app.models.records import Dish, Restaurant, User
+from app.models.storage import DuplicateKey, MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(autouse=True)
+def reset_data_before_test():
+    """Runs in-process - overrides the live server reset in conftest"""
+    yield
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two backends sharing one database file"""
+    path = str(tmp_path / "foodie.db")
+    yield SQLiteBackend(path), SQLiteBackend(path)
+
+
+@pytest.fixture
+def store(workers):
+    """data_store running on the second worker's backend, put back to memory afterwards"""
+    data_store.configure_backend(workers[1])
+    yield workers[0]
+    data_store.configure_backend(MemoryBackend())
+
+
+def restaurant(restaurant_id, name, location="Pune"):
+    return Restaurant(id=restaurant_id, name=name, category="Cafe", location=location, contact="1234567890")
+
+
+def test_unique_names_and_emails_across_workers(workers):
+    """Test a name or email one worker committed cannot be taken by another"""
+    first, second = workers
+    first.table('restaurants')[1] = restaurant(1, "Shared Name")
+    first.table('users')[1] = User(id=1, name="Asha", email="asha@example.com", password="x")
+    first.flush()
+
+    with pytest.raises(DuplicateKey, match="Restaurant with this name already exists"):
+        second.table('restaurants')[2] = restaurant(2, "Shared Name")
+    with pytest.raises(DuplicateKey, match="User with this email already exists"):
+        second.table('users')[2] = User(id=2, name="Asha", email="asha@example.com", password="y")
+
+    # Updating the holder itself is fine
+    second.table('restaurants')[1] = restaurant(1, "Shared Name", location="Goa")
+    second.flush()
+    assert first.table('restaurants')[1].location == "Goa"
+
+
+def test_external_changes_are_the_other_workers(workers):
+    """Test each worker sees only the other's changes, deletes carrying the deleted record"""
+    first, second = workers
+    first.table('restaurants')[1] = restaurant(1, "Change Cafe")
+    first.table('dishes')[1] = Dish(id=1, restaurant_id=1, name="Dosa", type="Main", price=80)
+    first.flush()
+
+    assert first.external_changes() == []
+    assert second.external_changes() == [('restaurants', 1, 's', None), ('dishes', 1, 's', None)]
+    assert second.external_changes() == []
+
+    del first.table('dishes')[1]
+    first.flush()
+    [(name, key, operation, deleted)] = second.external_changes()
+    assert (name, key, operation) == ('dishes', 1, 'd')
+    assert deleted.restaurant_id == 1 and deleted.name == "Dosa"
+
+    # Clearing everything cannot be replayed row by row
+    first.clear()
+    assert second.external_changes() is None
+
+
+def test_sync_applies_other_workers_changes_without_rebuilding(store):
+    """Test data_store.sync() updates the indexes row by row for another worker's writes"""
+    other = store
+    rebuilds = data_store.get_operation_counts().get('rebuild_indexes', 0)
+
+    other.table('restaurants')[1] = restaurant(1, "Remote Rasoi")
+    other.table('restaurants')[2] = restaurant(2, "Remote Dhaba")
+    other.table('dishes')[1] = Dish(id=1, restaurant_id=1, name="Thali", type="Main", price=150)
+    other.flush()
+    data_store.sync()
+    assert search_index.search(name="remote") == [1, 2]
+    assert search_index.get_dish_ids(1) == [1]
+    assert data_store.restaurant_names.owner("Remote Rasoi") == 1
+
+    # A rename frees the old name, a delete the restaurant's
+    other.table('restaurants')[1] = restaurant(1, "Renamed Rasoi")
+    del other.table('restaurants')[2]
+    other.flush()
+    data_store.sync()
+    assert search_index.search(name="remote") == []
+    assert search_index.search(name="renamed") == [1]
+    assert data_store.restaurant_names.owner("Remote Rasoi") is None
+    assert data_store.restaurant_names.owner("Remote Dhaba") is None
+    assert data_store.restaurant_names.owner("Renamed Rasoi") == 1
+
+    assert data_store.get_operation_counts().get('rebuild_indexes', 0) == rebuilds
+
+
+def test_duplicate_from_another_worker_is_a_conflict(store, monkeypatch):
+    """Test a name another worker committed after this one last synced gets a 409 and frees the local claim"""
+    other = store
+    app = create_app()
+    # The other worker commits between this worker's sync and its write
+    monkeypatch.setattr(data_store, 'sync', lambda: None)
+    other.table('restaurants')[other.next_id('restaurants')] = restaurant(1, "Race Cafe")
+    other.flush()
+
+    data = {"name": "Race Cafe", "category": "Cafe", "location": "Pune", "contact": "1234567890"}
+    response = app.test_client().post("/api/v1/restaurants", json=data)
+    assert response.status_code == 409
+    assert response.get_json()['error'] == "Restaurant with this name already exists"
+    assert data_store.restaurant_names.owner("Race Cafe") is None
+
+
+def test_soft_delete_is_shared_by_every_worker(store, tmp_path):
+    """Test a restaurant one worker deleted is restored or purged by another, and outlives a restart"""
+    first = store
+    client = create_app().test_client()
+    user_id = client.post("/api/v1/users/register", json={
+        "name": "Trash User", "email": "trash@example.com", "password": "pass"}).get_json()['id']
+    restaurant_id = client.post("/api/v1/restaurants", json={
+        "name": "Binned Bistro", "category": "Cafe", "location": "Pune", "contact": "1"}).get_json()['id']
+    dish_id = client.post(f"/api/v1/restaurants/{restaurant_id}/dishes", json={
+        "name": "Poha", "type": "Breakfast", "price": 30}).get_json()['id']
+    order_id = client.post("/api/v1/orders", json={
+        "user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id}]}).get_json()['id']
+    client.post("/api/v1/ratings", json={"order_id": order_id, "rating": 4, "comment": "Soft"})
+    assert client.delete(f"/api/v1/restaurants/{restaurant_id}").status_code == 200
+
+    # The trash is in the database, where the other worker sees it and restores it, feedback and all
+    assert restaurant_id in first.trash()
+    data_store.configure_backend(first)
+    assert data_store.get_trash_counts() == {"restaurants": 1, "ratings": 1}
+    assert client.get("/api/v1/admin/feedback").get_json() == []
+    assert client.post(f"/api/v1/admin/restaurants/{restaurant_id}/restore").status_code == 200
+    assert client.get(f"/api/v1/restaurants/{restaurant_id}").get_json()['name'] == "Binned Bistro"
+    assert search_index.get_dish_ids(restaurant_id) == [dish_id]
+    assert [entry['comment'] for entry in client.get("/api/v1/admin/feedback").get_json()] == ["Soft"]
+    assert data_store.get_trash_counts() == {"restaurants": 0, "ratings": 0}
+
+    # Deleted again, it survives a restart and a fresh worker compacts it
+    assert client.delete(f"/api/v1/restaurants/{restaurant_id}").status_code == 200
+    data_store.configure_backend(SQLiteBackend(str(tmp_path / "foodie.db")))
+    assert restaurant_id in data_store.trash
+    response = client.post("/api/v1/admin/compact")
+    assert response.get_json()['purged'] == {"restaurants": 1, "dishes": 1, "orders": 1, "ratings": 1}
+    assert client.get("/api/v1/admin/feedback").get_json() == []
+    assert client.post(f"/api/v1/admin/restaurants/{restaurant_id}/restore").status_code == 404
@@ -29,6 +29,43 @@ def test_register_duplicate_user():
     assert response.status_code == 409
 
 
+def test_login_verifies_hashed_password():
+    """Test login succeeds only with the registered password, which is never stored or returned in plain text"""
+    data = {"name": "Login User", "email": "login@example.com", "password": "s3cret-pass"}
+    user_id = requests.post(f"{BASE_URL}/api/v1/users/register", json=data).json()['id']
+    
+    response = requests.post(f"{BASE_URL}/api/v1/users/login",
+                             json={"email": "login@example.com", "password": "s3cret-pass"})
+    assert response.status_code == 200
+    assert response.json()['id'] == user_id
+    assert 'password' not in response.json()
+    
+    response = requests.post(f"{BASE_URL}/api/v1/users/login",
+                             json={"email": "login@example.com", "password": "wrong"})
+    assert response.status_code == 401
+    response = requests.post(f"{BASE_URL}/api/v1/users/login",
+                             json={"email": "nobody@example.com", "password": "s3cret-pass"})
+    assert response.status_code == 401
+    assert response.json()['error'] == "Invalid email or password"
+
+
+def test_login_attempts_limited_per_account():
+    """Test repeated wrong passwords for one account get 429s while other accounts can still log in"""
+    for email in ["target@example.com", "other@example.com"]:
+        requests.post(f"{BASE_URL}/api/v1/users/register",
+                      json={"name": "Guessed User", "email": email, "password": "s3cret-pass"})
+
+    statuses = [requests.post(f"{BASE_URL}/api/v1/users/login",
+                              json={"email": "target@example.com", "password": f"guess-{i}"},
+                              headers={"X-API-Key": f"made-up-{i}"}).status_code
+                for i in range(6)]
+    assert statuses == [401] * 5 + [429]
+
+    response = requests.post(f"{BASE_URL}/api/v1/users/login",
+                             json={"email": "other@example.com", "password": "s3cret-pass"})
+    assert response.status_code == 200
+
+
 def test_search_restaurants():
     """Test searching restaurants"""
     # First create and approve a restaurant
@@ -60,11 +97,14 @@ def test_place_order():
     restaurant_response = requests.post(f"{BASE_URL}/api/v1/restaurants", json=restaurant_data)
     restaurant_id = restaurant_response.json()['id']
     
+    dish_data = {"name": "Lasagna", "type": "Main Course", "price": 250}
+    dish_id = requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes", json=dish_data).json()['id']
+    
     # Place order
     order_data = {
         "user_id": user_id,
         "restaurant_id": restaurant_id,
-        "dishes": [{"dish_id": 1, "quantity": 2}],
+        "dishes": [{"dish_id": dish_id, "quantity": 2}],
         "total": 500
     }
     response = requests.post(f"{BASE_URL}/api/v1/orders", json=order_data)
@@ -83,7 +123,10 @@ def test_give_rating():
     restaurant_response = requests.post(f"{BASE_URL}/api/v1/restaurants", json=restaurant_data)
     restaurant_id = restaurant_response.json()['id']
     
-    order_data = {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": 1}]}
+    dish_data = {"name": "Burrito", "type": "Main Course", "price": 180}
+    dish_id = requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes", json=dish_data).json()['id']
+    
+    order_data = {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id}]}
     order_response = requests.post(f"{BASE_URL}/api/v1/orders", json=order_data)
     order_id = order_response.json()['id']
     
@@ -119,3 +162,245 @@ def test_get_orders_by_user():
     response = requests.get(f"{BASE_URL}/api/v1/users/{user_id}/orders")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
+
+
+def test_rating_summary():
+    """Test rating summary reflects every rating given"""
+    user_data = {"name": "Summary User", "email": "summary@example.com", "password": "pass"}
+    user_id = requests.post(f"{BASE_URL}/api/v1/users/register", json=user_data).json()['id']
+    
+    restaurant_data = {"name": "Summary Restaurant", "category": "Thai", "location": "Goa", "contact": "5656565656"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=restaurant_data).json()['id']
+    dish_data = {"name": "Pad Thai", "type": "Main Course", "price": 220}
+    dish_id = requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes", json=dish_data).json()['id']
+    
+    for score in [5, 3, 4.5]:
+        order_data = {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id}]}
+        order_id = requests.post(f"{BASE_URL}/api/v1/orders", json=order_data).json()['id']
+        requests.post(f"{BASE_URL}/api/v1/ratings", json={"order_id": order_id, "rating": score})
+    
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/rating-summary")
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary['total_ratings'] == 3
+    assert summary['average_rating'] == 4.17
+    assert summary['min_rating'] == 3
+    assert summary['max_rating'] == 5
+    assert summary['histogram'] == {"1": 0, "2": 0, "3": 1, "4": 1, "5": 1}
+
+
+def test_search_by_minimum_rating():
+    """Test ?rating= keeps only restaurants whose average rating is at least the minimum"""
+    user_data = {"name": "Rating User", "email": "rating@example.com", "password": "pass"}
+    user_id = requests.post(f"{BASE_URL}/api/v1/users/register", json=user_data).json()['id']
+
+    restaurant_ids = []
+    for name, score in [("Top Tiffin", 5), ("Middling Mess", 3), ("Unrated Udupi", None)]:
+        restaurant_data = {"name": name, "category": "South Indian", "location": "Mysore", "contact": "7878787878"}
+        restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=restaurant_data).json()['id']
+        restaurant_ids.append(restaurant_id)
+        requests.put(f"{BASE_URL}/api/v1/admin/restaurants/{restaurant_id}/approve")
+        dish_id = requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes",
+                                json={"name": "Idli", "type": "Breakfast", "price": 40}).json()['id']
+        if score is not None:
+            order_data = {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id}]}
+            order_id = requests.post(f"{BASE_URL}/api/v1/orders", json=order_data).json()['id']
+            requests.post(f"{BASE_URL}/api/v1/ratings", json={"order_id": order_id, "rating": score})
+
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/search?location=mysore&rating=4")
+    assert response.status_code == 200
+    assert [r['id'] for r in response.json()['restaurants']] == restaurant_ids[:1]
+    assert response.json()['restaurants'][0]['average_rating'] == 5
+
+    results = requests.get(f"{BASE_URL}/api/v1/restaurants/search?rating=3").json()['restaurants']
+    assert [r['id'] for r in results] == restaurant_ids[:2]
+    results = requests.get(f"{BASE_URL}/api/v1/restaurants/search?q=idli&rating=4").json()['restaurants']
+    assert [r['id'] for r in results] == restaurant_ids[:1]
+    assert requests.get(f"{BASE_URL}/api/v1/restaurants/search?location=mysore").json()['count'] == 3
+
+
+def test_recent_feedback_newest_first():
+    """Test recent feedback keeps only the latest ratings, newest first"""
+    user_data = {"name": "Recent User", "email": "recent@example.com", "password": "pass"}
+    user_id = requests.post(f"{BASE_URL}/api/v1/users/register", json=user_data).json()['id']
+    
+    restaurant_data = {"name": "Recent Restaurant", "category": "Cafe", "location": "Goa", "contact": "3434343434"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=restaurant_data).json()['id']
+    dish_data = {"name": "Espresso", "type": "Beverage", "price": 90}
+    dish_id = requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes", json=dish_data).json()['id']
+    
+    for i in range(22):
+        order_data = {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id}]}
+        order_id = requests.post(f"{BASE_URL}/api/v1/orders", json=order_data).json()['id']
+        requests.post(f"{BASE_URL}/api/v1/ratings", json={"order_id": order_id, "rating": 4, "comment": f"visit {i}"})
+    
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/recent-feedback")
+    assert response.status_code == 200
+    feedback = response.json()['feedback']
+    assert len(feedback) == 20
+    assert feedback[0]['comment'] == "visit 21"
+    assert feedback[-1]['comment'] == "visit 2"
+    assert feedback[0]['user_id'] == user_id
+    
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/recent-feedback?limit=2")
+    assert [entry['comment'] for entry in response.json()['feedback']] == ["visit 21", "visit 20"]
+    
+    response = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/recent-feedback?limit=0")
+    assert response.status_code == 400
+
+
+def test_delete_restaurant_cascades_restore_and_compact():
+    """Test deleting a restaurant hides its orders and feedback until restored, and compaction purges them"""
+    user_data = {"name": "Cascade User", "email": "cascade@example.com", "password": "pass"}
+    user_id = requests.post(f"{BASE_URL}/api/v1/users/register", json=user_data).json()['id']
+    
+    restaurant_data = {"name": "Cascade Restaurant", "category": "Cafe", "location": "Goa", "contact": "1212121212"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=restaurant_data).json()['id']
+    dish_data = {"name": "Filter Coffee", "type": "Beverage", "price": 60}
+    dish_id = requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes", json=dish_data).json()['id']
+    order_data = {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id}]}
+    order_id = requests.post(f"{BASE_URL}/api/v1/orders", json=order_data).json()['id']
+    requests.post(f"{BASE_URL}/api/v1/ratings", json={"order_id": order_id, "rating": 5, "comment": "Strong"})
+    
+    assert requests.delete(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}").status_code == 200
+    assert requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}").status_code == 404
+    assert requests.get(f"{BASE_URL}/api/v1/users/{user_id}/orders").json() == []
+    assert requests.get(f"{BASE_URL}/api/v1/admin/feedback").json() == []
+    
+    response = requests.post(f"{BASE_URL}/api/v1/admin/restaurants/{restaurant_id}/restore")
+    assert response.status_code == 200
+    assert [order['id'] for order in requests.get(f"{BASE_URL}/api/v1/users/{user_id}/orders").json()] == [order_id]
+    assert requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/rating-summary").json()['total_ratings'] == 1
+    
+    requests.delete(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}")
+    response = requests.post(f"{BASE_URL}/api/v1/admin/compact")
+    assert response.json()['purged'] == {"restaurants": 1, "dishes": 1, "orders": 1, "ratings": 1}
+    assert requests.post(f"{BASE_URL}/api/v1/admin/restaurants/{restaurant_id}/restore").status_code == 404
+
+
+def test_paginate_and_stream_user_orders():
+    """Test cursor pagination and NDJSON streaming of user orders"""
+    user_data = {"name": "Pager", "email": "pager@example.com", "password": "pass"}
+    user_id = requests.post(f"{BASE_URL}/api/v1/users/register", json=user_data).json()['id']
+    
+    restaurant_data = {"name": "Pager Restaurant", "category": "Any", "location": "Any", "contact": "7878787878"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=restaurant_data).json()['id']
+    dish_data = {"name": "Thali", "type": "Main Course", "price": 150}
+    dish_id = requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes", json=dish_data).json()['id']
+    
+    order_data = {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id}]}
+    order_ids = [requests.post(f"{BASE_URL}/api/v1/orders", json=order_data).json()['id'] for _ in range(5)]
+    
+    first_page = requests.get(f"{BASE_URL}/api/v1/users/{user_id}/orders?limit=2").json()
+    assert [o['id'] for o in first_page['orders']] == order_ids[:2]
+    
+    next_page = requests.get(
+        f"{BASE_URL}/api/v1/users/{user_id}/orders?limit=2&after_id={first_page['next_after_id']}").json()
+    assert [o['id'] for o in next_page['orders']] == order_ids[2:4]
+    
+    response = requests.get(f"{BASE_URL}/api/v1/users/{user_id}/orders?format=ndjson")
+    assert response.headers['Content-Type'].startswith('application/x-ndjson')
+    lines = response.text.strip().split('\n')
+    assert len(lines) == 5
+    
+    response = requests.get(f"{BASE_URL}/api/v1/admin/orders?limit=0")
+    assert response.status_code == 400
+
+
+def test_order_priced_server_side():
+    """Test order totals come from dish prices and unorderable dishes are rejected"""
+    user_data = {"name": "Pricing User", "email": "pricing@example.com", "password": "pass"}
+    user_id = requests.post(f"{BASE_URL}/api/v1/users/register", json=user_data).json()['id']
+    
+    restaurant_ids = []
+    for name in ["Pricing Kitchen", "Other Kitchen"]:
+        restaurant_data = {"name": name, "category": "Indian", "location": "Pune", "contact": "6767676767"}
+        restaurant_ids.append(requests.post(f"{BASE_URL}/api/v1/restaurants", json=restaurant_data).json()['id'])
+    
+    dish_ids = []
+    for restaurant_id, name, price in [(restaurant_ids[0], "Samosa", 20), (restaurant_ids[0], "Chai", 12.5),
+                                       (restaurant_ids[1], "Vada", 15)]:
+        dish_data = {"name": name, "type": "Snack", "price": price}
+        dish_ids.append(requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes", json=dish_data).json()['id'])
+    
+    order_data = {"user_id": user_id, "restaurant_id": restaurant_ids[0], "total": 1,
+                  "dishes": [{"dish_id": dish_ids[0], "quantity": 3}, {"dish_id": dish_ids[1], "quantity": 2}]}
+    order = requests.post(f"{BASE_URL}/api/v1/orders", json=order_data).json()
+    assert order['total'] == 85
+    assert [line['line_total'] for line in order['dishes']] == [60, 25]
+    assert order['dishes'][0]['name'] == "Samosa"
+    
+    # Price changes apply to the next order
+    requests.put(f"{BASE_URL}/api/v1/dishes/{dish_ids[0]}", json={"price": 25})
+    order_data['dishes'] = [{"dish_id": dish_ids[0]}]
+    assert requests.post(f"{BASE_URL}/api/v1/orders", json=order_data).json()['total'] == 25
+    
+    order_data['dishes'] = [{"dish_id": dish_ids[2]}]
+    response = requests.post(f"{BASE_URL}/api/v1/orders", json=order_data)
+    assert response.status_code == 400
+    assert "another restaurant" in response.json()['error']
+    
+    requests.put(f"{BASE_URL}/api/v1/dishes/{dish_ids[1]}/status", json={"enabled": False})
+    order_data['dishes'] = [{"dish_id": dish_ids[1]}]
+    response = requests.post(f"{BASE_URL}/api/v1/orders", json=order_data)
+    assert response.status_code == 400
+    assert "not available" in response.json()['error']
+
+
+def test_order_lifecycle_and_active_orders():
+    """Test status transitions are validated and the active view follows them"""
+    user_data = {"name": "Lifecycle User", "email": "lifecycle@example.com", "password": "pass"}
+    user_id = requests.post(f"{BASE_URL}/api/v1/users/register", json=user_data).json()['id']
+    restaurant_data = {"name": "Lifecycle Kitchen", "category": "Indian", "location": "Pune", "contact": "9090909090"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=restaurant_data).json()['id']
+    dish_data = {"name": "Poha", "type": "Breakfast", "price": 40}
+    dish_id = requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes", json=dish_data).json()['id']
+    
+    order_data = {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id}]}
+    order_ids = [requests.post(f"{BASE_URL}/api/v1/orders", json=order_data).json()['id'] for _ in range(3)]
+    
+    response = requests.put(f"{BASE_URL}/api/v1/orders/{order_ids[0]}/status", json={"status": "delivered"})
+    assert response.status_code == 409
+    
+    for status in ["accepted", "preparing"]:
+        response = requests.put(f"{BASE_URL}/api/v1/orders/{order_ids[0]}/status", json={"status": status})
+        assert response.status_code == 200
+        assert response.json()['status'] == status
+    requests.put(f"{BASE_URL}/api/v1/orders/{order_ids[1]}/status", json={"status": "cancelled"})
+    
+    active = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/orders/active").json()
+    assert active['count'] == 2
+    assert [o['id'] for o in active['orders']['pending']] == [order_ids[2]]
+    assert [o['id'] for o in active['orders']['preparing']] == [order_ids[0]]
+    
+    response = requests.put(f"{BASE_URL}/api/v1/orders/{order_ids[1]}/status", json={"status": "accepted"})
+    assert response.status_code == 409
+    response = requests.put(f"{BASE_URL}/api/v1/orders/{order_ids[2]}/status", json={"status": "lost"})
+    assert response.status_code == 400
+
+
+def test_order_feed_long_poll():
+    """Test the order feed returns new orders after the since cursor, waking a waiting poll"""
+    import threading
+    
+    user_data = {"name": "Feed User", "email": "feed@example.com", "password": "pass"}
+    user_id = requests.post(f"{BASE_URL}/api/v1/users/register", json=user_data).json()['id']
+    restaurant_data = {"name": "Feed Kitchen", "category": "Indian", "location": "Pune", "contact": "8181818181"}
+    restaurant_id = requests.post(f"{BASE_URL}/api/v1/restaurants", json=restaurant_data).json()['id']
+    dish_data = {"name": "Idli", "type": "Breakfast", "price": 30}
+    dish_id = requests.post(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/dishes", json=dish_data).json()['id']
+    order_data = {"user_id": user_id, "restaurant_id": restaurant_id, "dishes": [{"dish_id": dish_id}]}
+    
+    first_id = requests.post(f"{BASE_URL}/api/v1/orders", json=order_data).json()['id']
+    feed = requests.get(f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/orders/feed?since=0&timeout=0").json()
+    assert [e['order']['id'] for e in feed['events']] == [first_id]
+    assert feed['events'][0]['type'] == "order_created"
+    
+    # A poll at the cursor waits until the next event arrives
+    result = {}
+    poll = threading.Thread(target=lambda: result.update(requests.get(
+        f"{BASE_URL}/api/v1/restaurants/{restaurant_id}/orders/feed?since={feed['next_since']}&timeout=10").json()))
+    poll.start()
+    requests.put(f"{BASE_URL}/api/v1/orders/{first_id}/status", json={"status": "accepted"})
+    poll.join(timeout=10)
+    assert [(e['type'], e['order']['status']) for e in result['events']] == [("order_status", "accepted")]
@@ -1,7 +1,19 @@
+import importlib.util
+import os
+
 from flask import Flask, jsonify, request, render_template_string
 from datetime import datetime
 
+# The Foodie app's FastJSONProvider, loaded from its file so the app package itself is not imported
+_provider_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "FoodieApp", "app", "services",
+                              "json_provider.py")
+_spec = importlib.util.spec_from_file_location("foodie_json_provider", _provider_path)
+json_provider = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(json_provider)
+
+
 app = Flask(__name__)
+app.json = json_provider.FastJSONProvider(app)
 
 # In-memory patient database
 patients = [
@@ -1,7 +1,17 @@
+import importlib.util
 import json
+import os
 
 from flask import Flask, request, jsonify
 
+# The Foodie app's FastJSONProvider, loaded from its file so the app package itself is not imported
+_provider_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "FoodieApp", "app", "services",
+                              "json_provider.py")
+_spec = importlib.util.spec_from_file_location("foodie_json_provider", _provider_path)
+json_provider = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(json_provider)
+
+
 # with open("Users.json", "r") as file:
 
 #     users_data = json.load(file)
@@ -46,7 +56,7 @@ users_data = [
 
 app = Flask(__name__)
 
-app.json.sort_keys = False
+app.json = json_provider.FastJSONProvider(app)
 
 
 @app.route("/", methods=["GET"])